@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Customer
+from .models import Customer, OutgoingEmail
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ['first_name','last_name','phone', 'address']
     def first_name(self, obj):
@@ -8,3 +8,9 @@ class CustomerAdmin(admin.ModelAdmin):
         return obj.user.last_name
 
 admin.site.register(Customer, CustomerAdmin)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
@@ -0,0 +1,57 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import alogin
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from .hashers import HashingBusy, acheck_user_password, adummy_hash
+from .profiles import atoken_of, login_payload, profile_queryset
+from .serializers import UserLoginSerializer
+
+
+# UserLoginApiView for ASGI deployments. The password hash runs in the bounded hashing pool
+# (customers/hashers.py) instead of on the event loop, and a login arriving while the pool's queue is
+# full gets 503 with Retry-After straight away. Same payloads and status codes as the sync view.
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    async def post(self, request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            data = request.POST
+        serializer = UserLoginSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        username = serializer.validated_data['username']
+        password = serializer.validated_data['password']
+
+        user = await profile_queryset().filter(username=username).afirst()
+        try:
+            if user is None:
+                await adummy_hash(password)
+            elif not (await acheck_user_password(user, password) and user.is_active):
+                user = None
+        except HashingBusy:
+            response = JsonResponse(
+                {'error': "Too many logins in progress, please try again"}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response['Retry-After'] = '1'
+            return response
+        if user is None:
+            return JsonResponse({'error': "Invalid Credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        token = await atoken_of(user)
+        if settings.AUTH_MODE != 'jwt':
+            await alogin(request, user)
+        response_data = login_payload(user, token)
+        if settings.AUTH_MODE == 'jwt':
+            from .tokens import issue_tokens
+            response_data.update(issue_tokens(user))
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
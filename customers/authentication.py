@@ -0,0 +1,207 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodstore.lru import LRUCache
+
+# Token -> user cache in front of DRF's token lookup, the most frequent query we run. Two tiers:
+#   - an in-process LRU of MAX_ENTRIES, each entry kept for TTL seconds
+#   - optionally the SHARED_CACHE alias of CACHES (e.g. Redis), kept for SHARED_TTL seconds, so a new
+#     worker does not have to go back to the database for every client
+# Deleting a token (logout) or saving/deactivating its user clears both tiers in this process and the
+# shared tier everywhere; other processes' LRUs drop the entry within TTL, which bounds how long a
+# revoked token keeps working there.
+DEFAULTS = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 30,
+    'SHARED_CACHE': None,
+    'SHARED_TTL': 300,
+}
+
+# Never the password hash: it has no place in a shared cache, and a user rebuilt without it loads it on first access
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+TOKEN_FIELDS = [field.attname for field in Token._meta.concrete_fields]
+
+
+def token_cache_setting(name):
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+# Token keys are credentials, so only their hash goes into a cache key
+def token_cache_key(key):
+    return 'auth-token:v2:' + hashlib.sha256(key.encode()).hexdigest()  # v2: entries without the password
+
+
+# Plain field values, so entries pickle cheaply into the shared tier
+def cache_entry(token):
+    return (
+        tuple(getattr(token, name) for name in TOKEN_FIELDS),
+        tuple(getattr(token.user, name) for name in USER_FIELDS),
+    )
+
+
+class TokenCache:
+    def __init__(self, max_entries, ttl, shared=None, shared_ttl=None):
+        self.local = LRUCache(max_entries=max_entries)
+        self.ttl = ttl
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # The cached (token values, user values) for `key`, or None
+    def get(self, key):
+        cache_key = token_cache_key(key)
+        entry = self.local.get(cache_key)
+        if entry is not None:
+            self.count('local_hits')
+            return entry
+        if self.shared is not None:
+            entry = self.shared.get(cache_key)
+            if entry is not None:
+                self.count('shared_hits')
+                self.local.set(cache_key, entry, self.ttl)
+                return entry
+        self.count('misses')
+        return None
+
+    async def aget(self, key):
+        cache_key = token_cache_key(key)
+        entry = self.local.get(cache_key)
+        if entry is not None:
+            self.count('local_hits')
+            return entry
+        if self.shared is not None:
+            entry = await self.shared.aget(cache_key)
+            if entry is not None:
+                self.count('shared_hits')
+                self.local.set(cache_key, entry, self.ttl)
+                return entry
+        self.count('misses')
+        return None
+
+    def set(self, token):
+        cache_key, entry = token_cache_key(token.key), cache_entry(token)
+        self.local.set(cache_key, entry, self.ttl)
+        if self.shared is not None:
+            self.shared.set(cache_key, entry, self.shared_ttl)
+
+    async def aset(self, token):
+        cache_key, entry = token_cache_key(token.key), cache_entry(token)
+        self.local.set(cache_key, entry, self.ttl)
+        if self.shared is not None:
+            await self.shared.aset(cache_key, entry, self.shared_ttl)
+
+    def invalidate(self, key):
+        cache_key = token_cache_key(key)
+        self.count('invalidations')
+        self.local.delete(cache_key)
+        if self.shared is not None:
+            self.shared.delete(cache_key)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['local_hits'] + counters['shared_hits'] + counters['misses']
+        hits = counters['local_hits'] + counters['shared_hits']
+        return dict(counters, entries=len(self.local), hit_rate=round(hits / lookups, 4) if lookups else None)
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    with _token_cache_lock:
+        if _token_cache is None:
+            alias = token_cache_setting('SHARED_CACHE')
+            _token_cache = TokenCache(
+                token_cache_setting('MAX_ENTRIES'), token_cache_setting('TTL'),
+                shared=caches[alias] if alias else None, shared_ttl=token_cache_setting('SHARED_TTL'),
+            )
+        return _token_cache
+
+
+# Fresh instances on every request, so one request's changes to request.user never leak into another's.
+# from_db() leaves the fields missing from USER_FIELDS deferred.
+def rebuild(entry):
+    token_values, user_values = entry
+    token = Token.from_db(DEFAULT_DB_ALIAS, TOKEN_FIELDS, token_values)
+    token.user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, user_values)
+    return token
+
+
+# The active user's token for `key` (with .user set), from the cache or one query. Raises AuthenticationFailed.
+def cached_token(key):
+    cache = get_token_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        return rebuild(entry)
+    token = check_token(Token.objects.select_related('user').filter(key=key).first())
+    cache.set(token)
+    return token
+
+
+async def acached_token(key):
+    cache = get_token_cache()
+    entry = await cache.aget(key)
+    if entry is not None:
+        return rebuild(entry)
+    token = check_token(await Token.objects.select_related('user').filter(key=key).afirst())
+    await cache.aset(token)
+    return token
+
+
+# Misses and inactive users are not cached: a token created a moment later must work straight away
+def check_token(token):
+    if token is None:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    return token
+
+
+# Drop-in for DRF's TokenAuthentication
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        token = cached_token(key)
+        return (token.user, token)
+
+
+# Logout deletes the token; a user deleted outright takes its token with it
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    get_token_cache().invalidate(instance.key)
+
+
+# Deactivation, password, permission and profile changes all go through a User save. login() saves
+# last_login alone, which changes nothing the cached user is used for.
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    cache = get_token_cache()
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        cache.invalidate(key)
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting in ('TOKEN_AUTH_CACHE', 'CACHES'):
+        _token_cache = None
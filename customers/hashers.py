@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher, check_password, get_hasher, identify_hasher, make_password,
+)
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Password hashing cost and the pool the async login view hashes in:
+#   ITERATIONS  PBKDF2 work factor (None: Django's default). A stored hash with a different count is
+#               rehashed on the user's next successful login, so raising or lowering it needs no migration.
+#   WORKERS     threads hashing at once for async views. hashlib releases the GIL while it hashes, so
+#               threads use separate cores; more workers than cores only adds latency.
+#   QUEUE       hashes allowed to wait for a worker. Beyond WORKERS + QUEUE a login is refused with 503 at
+#               once, rather than piling up behind a backlog that would time out anyway.
+DEFAULTS = {
+    'ITERATIONS': None,
+    'WORKERS': 4,
+    'QUEUE': 64,
+}
+
+
+def hashing_setting(name):
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+# Django's PBKDF2 hasher with PASSWORD_HASHING['ITERATIONS']. It keeps the pbkdf2_sha256 name, so it reads
+# every existing hash, and its must_update() triggers the rehash whenever the stored count differs.
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return hashing_setting('ITERATIONS') or PBKDF2PasswordHasher.iterations
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    # Run `func(*args)` in the pool. Raises HashingBusy when WORKERS + QUEUE hashes are already in flight.
+    async def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.slots.release()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(hashing_setting('WORKERS'), hashing_setting('QUEUE'))
+        return _pool
+
+
+# user.check_password() for async code: the hash runs in the pool, and an outdated hash is replaced the way
+# the sync check_password() does it, with the save on the async ORM. Raises HashingBusy.
+async def acheck_user_password(user, password):
+    pool = get_hashing_pool()
+    if not await pool.run(check_password, password, user.password):
+        return False
+    preferred = get_hasher()
+    if identify_hasher(user.password).algorithm != preferred.algorithm or preferred.must_update(user.password):
+        user.password = await pool.run(make_password, password)
+        await user.asave(update_fields=['password'])
+    return True
+
+
+# Hash anyway for a username that does not exist, so it takes as long as a wrong password (Django #20760)
+async def adummy_hash(password):
+    await get_hashing_pool().run(make_password, password)
+
+
+@receiver(setting_changed)
+def reset_hashing_pool(setting, **kwargs):
+    global _pool
+    if setting == 'PASSWORD_HASHING' and _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from customers.outbox import deliver_batch, outbox_setting, queue_stats
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outgoing email in batches over one SMTP connection, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Defaults to EMAIL_OUTBOX['BATCH_SIZE']")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting once the queue is drained")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep between polls when idle")
+        parser.add_argument('--stats', action='store_true', help="Print the queue depth and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(", ".join(f"{name}: {value}" for name, value in queue_stats().items()))
+            return
+
+        batch_size = options['batch_size'] or outbox_setting('BATCH_SIZE')
+        while True:
+            sent, failed = deliver_batch(batch_size)
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+            # A full batch means more is probably waiting, so only sleep once a batch comes back short
+            if sent + failed < batch_size:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
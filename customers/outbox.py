@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+DEFAULTS = {
+    'BATCH_SIZE': 50,       # Messages sent per SMTP connection
+    'MAX_ATTEMPTS': 5,      # After this many failures a message is marked failed
+    'RETRY_BACKOFF': 30,    # Seconds before the first retry; doubles with every attempt
+    'LEASE': 300,           # Seconds a claimed batch stays hidden from other workers
+}
+
+
+def outbox_setting(name):
+    return getattr(settings, 'EMAIL_OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+# Queue an email for the delivery worker. Call it inside the transaction that creates whatever the
+# email is about, so the message is committed (or rolled back) together with it.
+def enqueue_email(subject, to, body='', html_body=''):
+    return OutgoingEmail.objects.create(subject=subject, to=list(to), body=body, html_body=html_body)
+
+
+# Take up to `batch_size` due messages and push their next_attempt_at past the lease, so concurrent
+# workers skip them. A worker that dies mid-batch leaves them to be picked up again once the lease ends.
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now)
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        OutgoingEmail.objects.filter(pk__in=[message.pk for message in batch]).update(
+            next_attempt_at=now + timedelta(seconds=outbox_setting('LEASE'))
+        )
+    return batch
+
+
+def build_message(message, smtp):
+    email = EmailMultiAlternatives(message.subject, message.body, to=message.to, connection=smtp)
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def record_failure(message, error):
+    message.attempts += 1
+    message.last_error = str(error)
+    if message.attempts >= outbox_setting('MAX_ATTEMPTS'):
+        message.status = OutgoingEmail.FAILED
+    else:
+        backoff = outbox_setting('RETRY_BACKOFF') * 2 ** (message.attempts - 1)
+        message.next_attempt_at = timezone.now() + timedelta(seconds=backoff)
+    message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+# Send one claimed batch over a single SMTP connection. Each message succeeds or fails on its own;
+# if the connection cannot be opened at all, every message in the batch is retried later.
+# Returns (sent, failed).
+def deliver_batch(batch_size=None):
+    batch = claim_batch(batch_size or outbox_setting('BATCH_SIZE'))
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    smtp = get_connection()
+    try:
+        smtp.open()
+    except Exception as error:
+        for message in batch:
+            record_failure(message, error)
+        return 0, len(batch)
+
+    try:
+        for message in batch:
+            try:
+                build_message(message, smtp).send()
+            except Exception as error:
+                record_failure(message, error)
+                failed += 1
+            else:
+                message.attempts += 1
+                message.status = OutgoingEmail.SENT
+                message.sent_at = timezone.now()
+                message.last_error = ''
+                message.save(update_fields=['attempts', 'status', 'sent_at', 'last_error'])
+                sent += 1
+    finally:
+        smtp.close()
+    return sent, failed
+
+
+# Queue depth for monitoring: counts per status plus how long the oldest pending message has waited
+def queue_stats():
+    counts = dict(OutgoingEmail.objects.order_by().values_list('status').annotate(n=Count('pk')))
+    oldest = OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING).aggregate(oldest=Min('created_at'))['oldest']
+    now = timezone.now()
+    return {
+        'pending': counts.get(OutgoingEmail.PENDING, 0),
+        'due': OutgoingEmail.objects.filter(status=OutgoingEmail.PENDING, next_attempt_at__lte=now).count(),
+        'sent': counts.get(OutgoingEmail.SENT, 0),
+        'failed': counts.get(OutgoingEmail.FAILED, 0),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else None,
+    }
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import Customer
+
+# Optional cache of the UserProfileView document: CACHE names a CACHES alias (None turns it off).
+# Saving or deleting the User or its Customer drops the entry.
+DEFAULTS = {
+    'CACHE': None,
+    'TIMEOUT': 300,
+}
+
+
+def profile_setting(name):
+    return getattr(settings, 'PROFILE_CACHE', {}).get(name, DEFAULTS[name])
+
+
+# A user with their customer row and API token, in one query
+def profile_queryset():
+    return User.objects.select_related('customer', 'auth_token')
+
+
+def load_profile(user_id):
+    return profile_queryset().filter(pk=user_id).first()
+
+
+# The user's Customer, or None; free on a user from profile_queryset()
+def customer_of(user):
+    try:
+        return user.customer
+    except Customer.DoesNotExist:
+        return None
+
+
+# The user's API token, created on first use
+def token_of(user):
+    try:
+        return user.auth_token
+    except Token.DoesNotExist:
+        return Token.objects.get_or_create(user=user)[0]
+
+
+async def atoken_of(user):
+    try:
+        return user.auth_token
+    except Token.DoesNotExist:
+        return (await Token.objects.aget_or_create(user=user))[0]
+
+
+# The UserProfileView payload, or None for a user who is neither an admin nor a customer
+def profile_document(user):
+    document = {
+        "id": user.id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+    }
+    if user.is_superuser:
+        return dict(document, role="admin")
+    customer = customer_of(user)
+    if customer is None:
+        return None
+    return dict(document, id=customer.id, phone=customer.phone, address=customer.address, role="customer")
+
+
+# The login response for a user from profile_queryset()
+def login_payload(user, token):
+    customer = customer_of(user)
+    payload = {
+        'token': token.key,
+        'user_id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'is_admin': user.is_superuser,
+        'is_customer': customer is not None,
+    }
+    # Add customer-specific data if the user is a customer
+    if customer is not None:
+        payload['phone'] = customer.phone
+        payload['address'] = customer.address
+    return payload
+
+
+def profile_cache_key(user_id):
+    return f'profile:{user_id}'
+
+
+# (found, document) for `user_id`; found is False for a missing user. Read through PROFILE_CACHE when enabled.
+def cached_profile_document(user_id):
+    alias = profile_setting('CACHE')
+    if alias:
+        document = caches[alias].get(profile_cache_key(user_id))
+        if document is not None:
+            return True, document
+    user = load_profile(user_id)
+    if user is None:
+        return False, None
+    document = profile_document(user)
+    if alias and document is not None:
+        caches[alias].set(profile_cache_key(user_id), document, profile_setting('TIMEOUT'))
+    return True, document
+
+
+# ModelBackend that loads the user with profile_queryset(), so the login response needs no further reads
+class ProfileBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = profile_queryset().filter(**{User.USERNAME_FIELD: username}).first()
+        if user is None:
+            # Hash anyway, so a missing user takes as long as a wrong password (Django #20760)
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def invalidate_profile(user_id):
+    alias = profile_setting('CACHE')
+    if alias:
+        caches[alias].delete(profile_cache_key(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.user_id)
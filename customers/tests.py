@@ -1,3 +1,308 @@
-from django.test import TestCase
+from datetime import timedelta
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from foodstore.auth import auth_settings
+
+from .authentication import CachedTokenAuthentication, get_token_cache, token_cache_key
+from .hashers import get_hashing_pool
+from .models import Customer, OutgoingEmail
+from .outbox import deliver_batch, enqueue_email, queue_stats
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX={'BATCH_SIZE': 2, 'MAX_ATTEMPTS': 2, 'RETRY_BACKOFF': 10, 'LEASE': 60},
+)
+class OutboxTests(TestCase):
+    def test_registration_queues_confirmation_instead_of_sending(self):
+        response = APIClient().post('/customer/register/', {
+            'username': 'bob', 'first_name': 'Bob', 'last_name': 'Smith', 'email': 'bob@example.com',
+            'password': 'secret-pass', 'confirm_password': 'secret-pass', 'phone': '0170', 'address': 'Dhaka',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutgoingEmail.objects.get()
+        self.assertEqual(message.to, ['bob@example.com'])
+        self.assertIn('/customer/active/', message.html_body)
+
+        self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutgoingEmail.SENT)
+
+    def test_batches_share_one_connection(self):
+        for i in range(3):
+            enqueue_email('Hi', [f'user{i}@example.com'], body='Hello')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as opened:
+            self.assertEqual(deliver_batch(), (2, 0))
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(deliver_batch(), (1, 0))
+        self.assertEqual(deliver_batch(), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failures_back_off_then_give_up(self):
+        message = enqueue_email('Hi', ['a@example.com'], body='Hello')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused')):
+            self.assertEqual(deliver_batch(), (0, 1))
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts, message.last_error), (OutgoingEmail.PENDING, 1, 'refused'))
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=5))
+            self.assertEqual(deliver_batch(), (0, 0))  # Not due yet
+
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_batch(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutgoingEmail.FAILED)
+
+    def test_queue_stats(self):
+        enqueue_email('Hi', ['a@example.com'])
+        sent = enqueue_email('Hi', ['b@example.com'])
+        OutgoingEmail.objects.filter(pk=sent.pk).update(status=OutgoingEmail.SENT)
+        stats = queue_stats()
+        self.assertEqual((stats['pending'], stats['due'], stats['sent'], stats['failed']), (1, 1, 1, 0))
+
+        client = APIClient()
+        self.assertEqual(client.get('/customer/outbox/').status_code, 403)
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        self.assertEqual(client.get('/customer/outbox/').json()['pending'], 1)
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+        self.enterContext(override_settings(TOKEN_AUTH_CACHE={}))  # A fresh cache, with zeroed counters
+
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.token.key)
+
+    def test_repeat_lookups_skip_the_database(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual((user.pk, user.username, token.key), (self.user.pk, 'alice', self.token.key))
+        self.assertIsNot(self.authenticate()[0], user)  # Every request gets its own instance
+        self.assertEqual(get_token_cache().stats()['local_hits'], 2)
+
+    def test_logout_revokes_the_cached_token(self):
+        self.authenticate()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(client.get('/customer/logout/').status_code, 302)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivation_revokes_the_cached_token(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_login_does_not_invalidate(self):
+        self.authenticate()
+        APIClient().post('/customer/login/', {'username': 'alice', 'password': 'secret'})
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE={'SHARED_CACHE': 'default'})
+    def test_shared_tier_refills_a_cold_worker(self):
+        self.authenticate()
+        get_token_cache().local.clear()
+        with self.assertNumQueries(0):
+            self.authenticate()
+        self.assertEqual(get_token_cache().stats()['shared_hits'], 1)
+        # The shared tier never holds the password hash; a rebuilt user loads it when asked
+        self.assertNotIn(self.user.password, cache.get(token_cache_key(self.token.key))[1])
+        user = self.authenticate()[0]
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('secret'))
+
+        key = self.token.key
+        self.token.delete()
+        get_token_cache().local.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_stats_are_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get('/customer/token-cache/').status_code, 403)
+        client.force_authenticate(User.objects.create_superuser('root', 'root@example.com', 'secret'))
+        self.assertEqual(set(client.get('/customer/token-cache/').json()), {
+            'local_hits', 'shared_hits', 'misses', 'invalidations', 'entries', 'hit_rate',
+        })
+
+
+class AuthModeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret', email='alice@example.com')
+
+    def login(self, client):
+        response = client.post('/customer/login/', {'username': 'alice', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_modes(self):
+        self.assertEqual(auth_settings('db-session')['SESSION_ENGINE'], 'django.contrib.sessions.backends.db')
+        self.assertEqual(auth_settings('signed-cookie')['AUTHENTICATION_CLASSES'][0],
+                         'rest_framework.authentication.SessionAuthentication')
+        with self.assertRaises(ImproperlyConfigured):
+            auth_settings('memcached')
+        with self.assertRaises(ImproperlyConfigured):
+            auth_settings('jwt')  # Without simplejwt, or without a signing key
+        if find_spec('rest_framework_simplejwt'):
+            self.assertEqual(auth_settings('jwt', signing_key='k')['SIMPLE_JWT']['SIGNING_KEY'], 'k')
+
+    def test_middleware_runs_once(self):
+        self.assertEqual(len(settings.MIDDLEWARE), len(set(settings.MIDDLEWARE)))
+
+    @override_settings(AUTH_MODE='signed-cookie', SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions_skip_the_session_table(self):
+        client = APIClient()
+        self.login(client)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/cart/').status_code, 200)
+        self.assertFalse(any('django_session' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(Session.objects.exists())
+
+    @skipUnless(find_spec('rest_framework_simplejwt'), "djangorestframework-simplejwt is not installed")
+    def test_jwt_requests_skip_the_user_table(self):
+        config = auth_settings('jwt', signing_key='test-signing-key')
+        classes = [import_string(path) for path in config['AUTHENTICATION_CLASSES']]
+        with override_settings(AUTH_MODE='jwt', SIMPLE_JWT=config['SIMPLE_JWT']), \
+                mock.patch.object(APIView, 'authentication_classes', classes):
+            tokens = self.login(APIClient())
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get('/api/cart/').status_code, 200)
+            self.assertFalse(any('"auth_user"' in query['sql'] for query in queries.captured_queries))
+            self.assertEqual(client.get('/api/async/cart/').status_code, 200)
+            client.credentials(HTTP_AUTHORIZATION='Bearer forged')
+            self.assertEqual(client.get('/api/async/cart/').status_code, 401)
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+
+            from .tokens import refresh_tokens
+            self.assertIn('access', refresh_tokens(tokens['refresh']))
+            self.user.is_active = False
+            self.user.save()
+            with self.assertRaises(AuthenticationFailed):
+                refresh_tokens(tokens['refresh'])
+
+
+class ProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret', email='alice@example.com')
+        self.customer = Customer.objects.create(user=self.user, phone='0170', address='Dhaka')
+        Token.objects.create(user=self.user)
+        self.client = APIClient()
+        cache.clear()
+
+    def test_login_loads_user_customer_and_token_in_one_query(self):
+        with self.assertNumQueries(2):  # The profile, and login()'s last_login update
+            response = self.client.post('/customer/login/', {'username': 'alice', 'password': 'secret'}, format='json')
+        self.assertEqual(response.json(), {
+            'token': self.user.auth_token.key, 'user_id': self.user.pk, 'username': 'alice', 'email': 'alice@example.com',
+            'is_admin': False, 'is_customer': True, 'phone': '0170', 'address': 'Dhaka',
+        })
+        response = self.client.post('/customer/login/', {'username': 'alice', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_creates_a_missing_token(self):
+        Token.objects.all().delete()
+        response = self.client.post('/customer/login/', {'username': 'alice', 'password': 'secret'}, format='json')
+        self.assertEqual(response.json()['token'], Token.objects.get(user=self.user).key)
+
+    def test_profile_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/customer/details/{self.user.pk}/')
+        self.assertEqual(response.json(), {
+            'id': self.customer.pk, 'username': 'alice', 'first_name': '', 'last_name': '', 'email': 'alice@example.com',
+            'phone': '0170', 'address': 'Dhaka', 'role': 'customer',
+        })
+        admin = User.objects.create_superuser('root', 'root@example.com', 'secret')
+        self.assertEqual(self.client.get(f'/customer/details/{admin.pk}/').json()['role'], 'admin')
+        plain = User.objects.create_user('bob')
+        self.assertEqual(self.client.get(f'/customer/details/{plain.pk}/').status_code, 404)
+        self.assertEqual(self.client.get('/customer/details/999/').status_code, 404)
+
+    @override_settings(PROFILE_CACHE={'CACHE': 'default'})
+    def test_cached_profile_is_invalidated_on_save(self):
+        self.client.get(f'/customer/details/{self.user.pk}/')
+        with self.assertNumQueries(0):
+            self.client.get(f'/customer/details/{self.user.pk}/')
+        self.customer.phone = '0180'
+        self.customer.save()
+        self.assertEqual(self.client.get(f'/customer/details/{self.user.pk}/').json()['phone'], '0180')
+        self.user.first_name = 'Alice'
+        self.user.save()
+        self.assertEqual(self.client.get(f'/customer/details/{self.user.pk}/').json()['first_name'], 'Alice')
+
+
+@override_settings(PASSWORD_HASHING={'ITERATIONS': 1000, 'WORKERS': 2, 'QUEUE': 0})
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret', email='alice@example.com')
+        Customer.objects.create(user=self.user, phone='0170', address='Dhaka')
+        self.client = APIClient()
+
+    def login(self, path, password='secret'):
+        return self.client.post(path, {'username': 'alice', 'password': password}, format='json')
+
+    def stored_iterations(self):
+        self.user.refresh_from_db()
+        return int(self.user.password.split('$')[1])
+
+    def test_iterations_are_configurable_and_rehashed_on_login(self):
+        self.assertEqual(self.stored_iterations(), 1000)
+        with override_settings(PASSWORD_HASHING={'ITERATIONS': 2000}):
+            self.assertEqual(self.login('/customer/login/', password='wrong').status_code, 401)
+            self.assertEqual(self.stored_iterations(), 1000)
+            self.assertEqual(self.login('/customer/login/').status_code, 200)
+            self.assertEqual(self.stored_iterations(), 2000)
+        self.assertEqual(self.login('/customer/async/login/').status_code, 200)
+        self.assertEqual(self.stored_iterations(), 1000)
+
+    def test_async_login_matches_the_sync_view(self):
+        response = self.login('/customer/async/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), self.login('/customer/login/').json())
+        self.assertEqual(self.client.get('/api/cart/').status_code, 200)  # Logged in to the session
+        self.assertEqual(self.login('/customer/async/login/', password='wrong').status_code, 401)
+        self.assertEqual(self.client.post('/customer/async/login/', {'username': 'nobody', 'password': 'x'},
+                                          format='json').status_code, 401)
+        self.assertEqual(self.client.post('/customer/async/login/', {}, format='json').status_code, 400)
+
+    def test_full_hashing_queue_is_refused(self):
+        pool = get_hashing_pool()
+        for _ in range(2):
+            pool.slots.acquire()
+        try:
+            response = self.login('/customer/async/login/')
+        finally:
+            for _ in range(2):
+                pool.slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.login('/customer/async/login/').status_code, 200)
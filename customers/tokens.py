@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# JWT support for AUTH_MODE='jwt' (see foodstore/auth.py). Only imported in that mode.
+
+# User fields carried in every token, enough for the views to authorise a request without loading the user
+CLAIM_FIELDS = ('username', 'email', 'is_staff', 'is_superuser')
+
+
+# {'access': ..., 'refresh': ...} for `user`. The access token inherits the refresh token's claims.
+def issue_tokens(user):
+    refresh = RefreshToken.for_user(user)
+    for name in CLAIM_FIELDS:
+        refresh[name] = getattr(user, name)
+    return {'access': str(refresh.access_token), 'refresh': str(refresh)}
+
+
+# New tokens for a refresh token, with the claims re-read from the database: one query per ACCESS_TOKEN_LIFETIME,
+# which is also how soon a deactivation or a change of rights reaches a signed-in client
+def refresh_tokens(raw_refresh):
+    try:
+        refresh = RefreshToken(raw_refresh)
+    except TokenError as exc:
+        raise exceptions.AuthenticationFailed(str(exc))
+    user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+    if user is None:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    return issue_tokens(user)
+
+
+# JWTAuthentication without its per-request user query: request.user is a User built from the claims.
+# Other fields are deferred, and load on first access like any deferred field.
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            claims = {name: validated_token[name] for name in CLAIM_FIELDS}
+            claims.update(id=validated_token[api_settings.USER_ID_CLAIM], is_active=True)
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+        # from_db() wants the loaded fields in model order
+        names = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+        return User.from_db(DEFAULT_DB_ALIAS, names, [claims[name] for name in names])
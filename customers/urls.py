@@ -1,6 +1,8 @@
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from django.urls import path, include
 from . import views
+from .async_views import AsyncLoginView
 router = DefaultRouter() 
 
 router.register('list', views.CustomerViewset) 
@@ -8,8 +10,14 @@ urlpatterns = [
     path('', include(router.urls)),
     path('register/', views.UserRegistrationApiView.as_view(), name='register'),
     path('login/', views.UserLoginApiView.as_view(), name='login'),
+    path('async/login/', AsyncLoginView.as_view(), name='async-login'),  # For ASGI deployments
     path('logout/', views.UserLogoutView.as_view(), name='logout'),
     path('active/<uid64>/<token>/', views.ActivateAccountView.as_view(), name = 'activate'),
     path('details/<int:user_id>/', views.UserProfileView.as_view(), name='user-profile'),
+    path('outbox/', views.OutboxStatsView.as_view(), name='outbox-stats'),  # Admin-only
+    path('token-cache/', views.TokenCacheStatsView.as_view(), name='token-cache-stats'),  # Admin-only
     # path('api/user-id/', views.UserIDView.as_view(), name='customer-list'),
-]
\ No newline at end of file
+]
+
+if settings.AUTH_MODE == 'jwt':
+    urlpatterns.append(path('token/refresh/', views.TokenRefreshView.as_view(), name='token-refresh'))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render
 from rest_framework import viewsets
 from . import models
@@ -11,8 +12,12 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from rest_framework.authtoken.models import Token
 # for sending email
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
+from django.db import transaction
+from .authentication import get_token_cache
+from .outbox import enqueue_email, queue_stats
+from .profiles import cached_profile_document, login_payload, token_of
+from rest_framework.permissions import IsAdminUser
 from django.shortcuts import redirect
 from rest_framework import status
 from customers.models import Customer
@@ -29,19 +34,16 @@ class UserRegistrationApiView(APIView):
         serializer = self.serializer_class(data=request.data)
         
         if serializer.is_valid():
-            user = serializer.save()
-            print(user)
-            token = default_token_generator.make_token(user)
-            print("token ", token)
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            print("uid ", uid)
-            confirm_link = f"https://foodie-delight-backend-eta.vercel.app/customer/active/{uid}/{token}"
-            email_subject = "Confirm Your Email"
-            email_body = render_to_string('confirm_email.html', {'confirm_link' : confirm_link})
-            
-            email = EmailMultiAlternatives(email_subject , '', to=[user.email])
-            email.attach_alternative(email_body, "text/html")
-            email.send()
+            # The confirmation email is queued in the same transaction as the account and sent by
+            # `manage.py send_queued_email`, so the response never waits on SMTP
+            with transaction.atomic():
+                user = serializer.save()
+                token = default_token_generator.make_token(user)
+                uid = urlsafe_base64_encode(force_bytes(user.pk))
+                confirm_link = f"https://foodie-delight-backend-eta.vercel.app/customer/active/{uid}/{token}"
+                email_subject = "Confirm Your Email"
+                email_body = render_to_string('confirm_email.html', {'confirm_link' : confirm_link})
+                enqueue_email(email_subject, [user.email], html_body=email_body)
             return Response("Check your mail for confirmation")
         return Response(serializer.errors)
 
@@ -71,32 +73,19 @@ class UserLoginApiView(APIView):
             username = serializer.validated_data['username']
             password = serializer.validated_data['password']
 
+            # ProfileBackend loads the customer and token with the user (see customers/profiles.py)
             user = authenticate(username=username, password=password)
             if user:
-                token, _ = Token.objects.get_or_create(user=user)
-                login(request, user)
-
-                # Check if the user is an admin (superuser)
-                is_admin = user.is_superuser
-
-                # Check if the user is a customer
-                is_customer = hasattr(user, 'customer')
-
-                # Prepare the response data
-                response_data = {
-                    'token': token.key,
-                    'user_id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'is_admin': is_admin,
-                    'is_customer': is_customer,
-                }
-
-                # Add customer-specific data if the user is a customer
-                if is_customer:
-                    customer = Customer.objects.get(user=user)
-                    response_data['phone'] = customer.phone
-                    response_data['address'] = customer.address
+                token = token_of(user)
+                if settings.AUTH_MODE != 'jwt':
+                    login(request, user)
+
+                response_data = login_payload(user, token)
+
+                # Stateless Bearer tokens instead of a session (see foodstore/auth.py)
+                if settings.AUTH_MODE == 'jwt':
+                    from .tokens import issue_tokens
+                    response_data.update(issue_tokens(user))
 
                 return Response(response_data, status=status.HTTP_200_OK)
             else:
@@ -105,6 +94,18 @@ class UserLoginApiView(APIView):
     
     
     
+# New access and refresh tokens for a refresh token, in AUTH_MODE='jwt'
+class TokenRefreshView(APIView):
+    authentication_classes = []
+
+    def post(self, request):
+        from .tokens import refresh_tokens
+        refresh = request.data.get('refresh')
+        if not refresh:
+            return Response({'refresh': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(refresh_tokens(refresh), status=status.HTTP_200_OK)
+
+
 class UserLogoutView(APIView):
     def get(self, request):
         request.user.auth_token.delete()
@@ -117,44 +118,28 @@ class UserLogoutView(APIView):
 class UserProfileView(APIView):
     # permission_classes = [IsAuthenticated]
 
+    # One query for the user and their customer row, or none with PROFILE_CACHE enabled
     def get(self, request, user_id):
-        try:
-            # Fetch the user by user_id
-            user = User.objects.get(id=user_id)
-            
-            # Check if the user is an admin (superuser)
-            if user.is_superuser:
-                profile_data = {
-                    "id": user.id,
-                    "username": user.username,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "email": user.email,
-                    "role": "admin",
-                }
-                return Response(profile_data, status=status.HTTP_200_OK)
-            
-            # Check if the user is a customer
-            elif hasattr(user, 'customer'):
-                customer = user.customer
-                profile_data = {
-                    "id": customer.id,
-                    "username": user.username,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "email": user.email,
-                    "phone": customer.phone,
-                    "address": customer.address,
-                    "role": "customer",
-                }
-                return Response(profile_data, status=status.HTTP_200_OK)
-            
-            # If the user is neither admin nor customer
-            else:
-                return Response({"detail": "User profile not found."}, status=status.HTTP_404_NOT_FOUND)
-        
-        except User.DoesNotExist:
+        found, profile_data = cached_profile_document(user_id)
+        if not found:
             return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
-    
+        # If the user is neither admin nor customer
+        if profile_data is None:
+            return Response({"detail": "User profile not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(profile_data, status=status.HTTP_200_OK)
+
+
+# Outgoing email queue depth, for monitoring the delivery worker
+class OutboxStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(queue_stats(), status=status.HTTP_200_OK)
+
 
-    
\ No newline at end of file
+# Token authentication cache hit/miss counters (see customers/authentication.py)
+class TokenCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_token_cache().stats(), status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, FoodItem, Order, OrderItem, Review, CartItem
+from .models import Category, FoodItem, Order, OrderItem, OrderStatusEvent, Review, CartItem
 
 # Category Admin
 @admin.register(Category)
@@ -17,6 +17,12 @@ class FoodItemAdmin(admin.ModelAdmin):
 # Order Item Inline (To show order items inside an order)
 admin.site.register(OrderItem)
 admin.site.register(Order)
+
+# Order status history (append-only)
+@admin.register(OrderStatusEvent)
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    list_display = ('order', 'from_status', 'to_status', 'source', 'actor', 'created_at')
+    list_filter = ('to_status', 'source')
 # Review Admin
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
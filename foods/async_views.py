@@ -0,0 +1,140 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+
+from customers.authentication import acached_token
+from foodstore.routers import aread_from_replica
+
+from .cache import get_menu_cache
+from .models import Category, FoodItem, Order
+from .fast_serializers import CompactJSONRenderer, food_item_plan
+from .serializers import CategorySerializer, OrderSerializer
+from .services import acart_summary
+from .views import FoodItemListAPIView, menu_sort, order_validators, set_validators, sort_food_items
+
+# Async-native counterparts of the read-heavy views in views.py, mounted under /api/async/.
+# They use the async ORM and cache APIs end to end, so under ASGI a request is not handed to the
+# sync thread pool as a whole. Payloads, status codes and validators match the sync views.
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(CompactJSONRenderer().render(data), content_type='application/json', status=status_code)
+
+
+# Token, Bearer (AUTH_MODE='jwt') or session authentication without leaving the event loop.
+# Returns (user, error_response).
+async def aauthenticate(request):
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) == 2 and auth[0].lower() == 'bearer' and settings.AUTH_MODE == 'jwt':
+        from customers.tokens import StatelessJWTAuthentication
+        try:
+            # Signature and claims only, no query (see customers/tokens.py)
+            user, _ = StatelessJWTAuthentication().authenticate(request)
+        except AuthenticationFailed as exc:
+            return None, json_response({'detail': exc.detail}, status.HTTP_401_UNAUTHORIZED)
+        return user, None
+    if len(auth) == 2 and auth[0].lower() == 'token':
+        try:
+            token = await acached_token(auth[1])
+        except AuthenticationFailed as exc:
+            return None, json_response({'detail': exc.detail}, status.HTTP_401_UNAUTHORIZED)
+        return token.user, None
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None, json_response(
+            {'detail': 'Authentication credentials were not provided.'}, status.HTTP_403_FORBIDDEN
+        )
+    return user, None
+
+
+# Async cached_menu_response(): `abuild` is a coroutine function returning the data to render
+async def acached_menu_response(request, parts, abuild):
+    cache = get_menu_cache()
+    version = await cache.aversion()
+    last_modified = await cache.alast_modified(version=version)
+
+    async def render():
+        return CompactJSONRenderer().render(await abuild())
+    etag, body = await cache.aget_or_render(parts, render, version=version)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json', status=status.HTTP_200_OK)
+    return set_validators(response, etag, last_modified)
+
+
+class AsyncCategoryListView(View):
+    async def get(self, request):
+        async def abuild():
+            categories = [category async for category in Category.objects.all()]
+            return CategorySerializer(categories, many=True).data
+        async with aread_from_replica('menu'):
+            return await acached_menu_response(request, ('categories',), abuild)
+
+
+sync_search_view = sync_to_async(FoodItemListAPIView.as_view())
+
+
+class AsyncFoodItemListView(View):
+    async def get(self, request):
+        category_slug = request.GET.get('category') or ""
+        sort = menu_sort(request)
+
+        # The search backends are synchronous; hand ranked searches to the sync view
+        if request.GET.get('search', "").strip():
+            return await sync_search_view(request)
+
+        async def abuild():
+            food_items = FoodItem.objects.all()
+            if category_slug:
+                food_items = food_items.filter(category__slug=category_slug)
+            return await food_item_plan().aserialize(sort_food_items(food_items, sort))
+        async with aread_from_replica('menu'):
+            return await acached_menu_response(request, ('food-items', category_slug, sort), abuild)
+
+
+class AsyncSpecialsListView(View):
+    async def get(self, request):
+        sort = menu_sort(request)
+
+        async def abuild():
+            specials = sort_food_items(FoodItem.objects.filter(is_special=True), sort)
+            return await food_item_plan().aserialize(specials)
+        async with aread_from_replica('menu'):
+            return await acached_menu_response(request, ('specials', sort), abuild)
+
+
+# Only the caller's own orders: anyone else's are a 404, same as a missing one
+class AsyncOrderDetailView(View):
+    async def get(self, request, pk):
+        user, error = await aauthenticate(request)
+        if error is not None:
+            return error
+        orders = Order.objects.filter(pk=pk, customer=user)
+        updated_at = await orders.values_list('updated_at', flat=True).afirst()
+        if updated_at is None:
+            return json_response({'detail': 'No Order matches the given query.'}, status.HTTP_404_NOT_FOUND)
+        cache = get_menu_cache()
+        version = await cache.aversion()
+        etag, last_modified = order_validators(pk, updated_at, version, await cache.alast_modified(version=version))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
+        try:
+            order = await Order.objects.with_details().filter(customer=user).aget(pk=pk)
+        except Order.DoesNotExist:
+            return json_response({'detail': 'No Order matches the given query.'}, status.HTTP_404_NOT_FOUND)
+        return set_validators(json_response(OrderSerializer(order).data), etag, last_modified)
+
+
+class AsyncCartView(View):
+    async def get(self, request):
+        user, error = await aauthenticate(request)
+        if error is not None:
+            return error
+        return json_response(await acart_summary(user))
@@ -0,0 +1,188 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import Max
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from foodstore.lru import LRUCache
+from foodstore.routers import pin_primary
+
+
+# In-process backend (see foodstore/lru.py).
+# Single-process only: every worker keeps its own entries and its own menu version, so a change made
+# through one worker is not seen by the others until their entries expire. Use RedisMenuBackend when
+# running more than one worker process.
+class LocMemMenuBackend(LRUCache):
+    # Nothing here blocks, so async callers can use the sync methods directly
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, timeout=None):
+        self.set(key, value, timeout)
+
+
+# Redis backend. Any client exposing get/set(ex=)/incr/delete works, so tests can pass in a fake.
+class RedisMenuBackend:
+    def __init__(self, client=None, url='redis://localhost:6379/0', prefix='foodstore'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(f'{self.prefix}:{key}')
+
+    def set(self, key, value, timeout=None):
+        self.client.set(f'{self.prefix}:{key}', value, ex=timeout or None)
+
+    def incr(self, key):
+        return int(self.client.incr(f'{self.prefix}:{key}'))
+
+    def clear(self):
+        self.client.delete(f'{self.prefix}:{MenuCache.version_key}')
+
+    async def aget(self, key):
+        return await sync_to_async(self.get, thread_sensitive=False)(key)
+
+    async def aset(self, key, value, timeout=None):
+        await sync_to_async(self.set, thread_sensitive=False)(key, value, timeout)
+
+
+# Newest of some updated_at values as cacheable bytes (empty when there are none)
+def encode_newest(values):
+    newest = [value for value in values if value is not None]
+    return str(int(max(newest).timestamp())).encode() if newest else b''
+
+
+# Read-through cache of rendered menu responses.
+# Every key embeds the current menu version, so bumping the version invalidates all entries at once
+# and stale ones simply age out of the backend.
+class MenuCache:
+    version_key = 'menu:version'
+
+    def __init__(self, backend, timeout=300):
+        self.backend = backend
+        self.timeout = timeout
+
+    def version(self):
+        return int(self.backend.get(self.version_key) or 0)
+
+    async def aversion(self):
+        return int(await self.backend.aget(self.version_key) or 0)
+
+    def bump(self):
+        return self.backend.incr(self.version_key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def make_key(self, *parts, version=None):
+        if version is None:
+            version = self.version()
+        digest = hashlib.md5('\x00'.join(str(part) for part in parts).encode()).hexdigest()
+        return f'menu:v{version}:{digest}'
+
+    # Strong validator for a rendered body: equal bytes give equal tags, whichever process rendered them
+    @staticmethod
+    def etag(body):
+        return '"menu-%s"' % hashlib.md5(body).hexdigest()
+
+    # Return cached bytes for `parts`, calling `build()` to produce and store them on a miss
+    def get_or_build(self, parts, build, version=None):
+        key = self.make_key(*parts, version=version)
+        body = self.backend.get(key)
+        if body is None:
+            body = build()
+            self.backend.set(key, body, self.timeout)
+        return body
+
+    # Async get_or_build(); `abuild` is a coroutine function
+    async def aget_or_build(self, parts, abuild, version=None):
+        key = self.make_key(*parts, version=version)
+        body = await self.backend.aget(key)
+        if body is None:
+            body = await abuild()
+            await self.backend.aset(key, body, self.timeout)
+        return body
+
+    # (etag, body) for `parts`, calling `render()` for the body on a miss. The body's hash is cached
+    # in front of it (32 hex digits), so a hit answers a conditional request without rehashing.
+    def get_or_render(self, parts, render, version=None):
+        def build():
+            body = render()
+            return hashlib.md5(body).hexdigest().encode() + body
+        return self.split_entry(self.get_or_build(parts, build, version=version))
+
+    async def aget_or_render(self, parts, arender, version=None):
+        async def abuild():
+            body = await arender()
+            return hashlib.md5(body).hexdigest().encode() + body
+        return self.split_entry(await self.aget_or_build(parts, abuild, version=version))
+
+    @staticmethod
+    def split_entry(entry):
+        return '"menu-%s"' % entry[:32].decode(), entry[32:]
+
+    # Unix timestamp of the newest menu change, aggregated once per menu version
+    def last_modified(self, version=None):
+        from .models import Category, FoodItem
+
+        def build():
+            return encode_newest([
+                FoodItem.objects.aggregate(newest=Max('updated_at'))['newest'],
+                Category.objects.aggregate(newest=Max('updated_at'))['newest'],
+            ])
+
+        value = self.get_or_build(('last-modified',), build, version=version)
+        return int(value) if value else None
+
+    async def alast_modified(self, version=None):
+        from .models import Category, FoodItem
+
+        async def abuild():
+            return encode_newest([
+                (await FoodItem.objects.aaggregate(newest=Max('updated_at')))['newest'],
+                (await Category.objects.aaggregate(newest=Max('updated_at')))['newest'],
+            ])
+
+        value = await self.aget_or_build(('last-modified',), abuild, version=version)
+        return int(value) if value else None
+
+
+_menu_cache = None
+
+
+def get_menu_cache():
+    global _menu_cache
+    if _menu_cache is None:
+        config = getattr(settings, 'MENU_CACHE', {})
+        backend_class = import_string(config.get('BACKEND', 'foods.cache.LocMemMenuBackend'))
+        backend = backend_class(**config.get('OPTIONS', {}))
+        _menu_cache = MenuCache(backend, timeout=config.get('TIMEOUT', 300))
+    return _menu_cache
+
+
+# Bump the menu version now, and again once the surrounding transaction commits so that a reader
+# who re-cached pre-commit data under the first bump cannot keep serving it
+def invalidate_menu():
+    cache = get_menu_cache()
+
+    def bump():
+        cache.bump()
+        pin_primary('menu')  # Until the replicas have the change, rebuild menu payloads from the primary
+
+    bump()
+    if not transaction.get_autocommit():
+        transaction.on_commit(bump)
+
+
+@receiver(setting_changed)
+def reset_menu_cache(setting, **kwargs):
+    global _menu_cache
+    if setting == 'MENU_CACHE':
+        _menu_cache = None
@@ -0,0 +1,141 @@
+from functools import cache
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from .models import CartItem, OrderItem
+from .serializers import CartItemSerializer, FoodItemSerializer, ImageSrcsetField, OrderItemSerializer
+
+# Fast path for the serializers on the menu, cart and order hot paths.
+# A RowPlan walks a serializer's fields once and records, for every output key, the .values_list() column
+# it comes from and how to convert it. Serializing a queryset is then one flat SELECT plus a dict per row,
+# instead of model instances, per-field get_attribute() calls and OrderedDicts. The output renders to the
+# same bytes as the serializer's; the differential tests in foods/tests.py hold the two together.
+
+# Fields whose representation of a database value is the value itself
+IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ReadOnlyField)
+
+
+class RowPlan:
+    def __init__(self, serializer_class, model=None):
+        self.columns = []
+        self.model = model or serializer_class.Meta.model
+        self.entries = self._plan(serializer_class(), self.model, '')
+
+    def _plan(self, serializer, model, prefix):
+        entries = []
+        for name, field in serializer.fields.items():
+            if getattr(field, 'write_only', False):
+                continue
+            source = field.source.replace('.', '__')
+            if isinstance(field, serializers.BaseSerializer):
+                if isinstance(field, serializers.ListSerializer):
+                    raise ValueError(f"{type(serializer).__name__}.{name}: many=True is not supported by the fast path")
+                related = model._meta.get_field(source).related_model
+                nested = self._plan(field, related, f'{prefix}{source}__')
+                entries.append((name, self._column(f'{prefix}{source}'), nested))
+            else:
+                entries.append((name, self._column(prefix + source), self._converter(serializer, name, field, model, source)))
+        return entries
+
+    def _column(self, column):
+        self.columns.append(column)
+        return len(self.columns) - 1
+
+    def _converter(self, serializer, name, field, model, source):
+        if isinstance(field, serializers.FileField):
+            storage = model._meta.get_field(source).storage
+            # FileField.to_representation: no URL for an empty name, relative URL without a request
+            return lambda value: storage.url(value) if value else None
+        if isinstance(field, serializers.FloatField):
+            return float
+        if isinstance(field, (serializers.DecimalField, ImageSrcsetField)):
+            return field.to_representation
+        if isinstance(field, IDENTITY_FIELDS):
+            return None
+        raise ValueError(f"{type(serializer).__name__}.{name}: {type(field).__name__} is not supported by the fast path")
+
+    # One output dict from one values_list() row. A nested serializer whose FK column is NULL becomes None,
+    # and NULL columns stay None without going through their converter, as in Serializer.to_representation.
+    def _build(self, entries, row):
+        data = {}
+        for name, index, convert in entries:
+            value = row[index]
+            if value is None:
+                data[name] = None
+            elif convert is None:
+                data[name] = value
+            elif isinstance(convert, list):
+                data[name] = self._build(convert, row)
+            else:
+                data[name] = convert(value)
+        return data
+
+    def serialize(self, queryset):
+        return [self._build(self.entries, row) for row in queryset.values_list(*self.columns)]
+
+    async def aserialize(self, queryset):
+        return [self._build(self.entries, row) async for row in queryset.values_list(*self.columns)]
+
+    # (data, extras) per row, where extras are the values of `annotations` selected alongside the plan's columns
+    def rows(self, queryset, *annotations):
+        for row in queryset.values_list(*self.columns, *annotations):
+            yield self._build(self.entries, row), row[len(self.columns):]
+
+    async def arows(self, queryset, *annotations):
+        async for row in queryset.values_list(*self.columns, *annotations):
+            yield self._build(self.entries, row), row[len(self.columns):]
+
+
+@cache
+def food_item_plan():
+    return RowPlan(FoodItemSerializer)
+
+
+@cache
+def cart_item_plan():
+    return RowPlan(CartItemSerializer, CartItem)
+
+
+@cache
+def order_item_plan():
+    return RowPlan(OrderItemSerializer, OrderItem)
+
+
+# FoodItemSerializer(queryset, many=True).data, the fast way
+def food_item_data(queryset):
+    return food_item_plan().serialize(queryset)
+
+
+def cart_item_data(queryset):
+    return cart_item_plan().serialize(queryset)
+
+
+def order_item_data(queryset):
+    return order_item_plan().serialize(queryset)
+
+
+# JSONRenderer with the encoder built once instead of per call. Its output is byte-for-byte the same;
+# indented rendering (?format=api, Accept: ...; indent=N) is left to JSONRenderer.
+class CompactJSONRenderer(JSONRenderer):
+    _encoder = None
+
+    @classmethod
+    def encoder(cls):
+        if cls._encoder is None:
+            cls._encoder = cls.encoder_class(
+                ensure_ascii=cls.ensure_ascii, allow_nan=not cls.strict,
+                separators=(',', ':') if cls.compact else (', ', ': '),
+            )
+        return cls._encoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, keeping the output a strict JavaScript subset
+        ret = self.encoder().encode(data)
+        if '\u2028' in ret or '\u2029' in ret:
+            ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
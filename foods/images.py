@@ -0,0 +1,169 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import invalidate_menu
+from .imaging import image_width, render_variants, supported_formats, variant_widths
+from .models import FoodItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WIDTHS': (160, 320, 640, 1280),
+    'FORMATS': ('avif', 'webp'),    # Formats this Pillow build cannot write are skipped
+    'QUALITY': 80,
+    'WORKERS': 2,                   # Size of the process pool that renders variants
+    'EAGER': False,                 # Render inline instead of in the pool (tests, management commands)
+}
+
+VARIANT_DIR = 'food_images/variants'
+
+
+def variant_setting(name):
+    return getattr(settings, 'IMAGE_VARIANTS', {}).get(name, DEFAULTS[name])
+
+
+# Variants live under the hash of the original's bytes, so their URLs never change meaning
+# and can be cached forever; a new upload gets a new hash and new URLs.
+def variant_path(digest, width, fmt):
+    return f'{VARIANT_DIR}/{digest}/{width}.{fmt}'
+
+
+def variant_url(digest, width, fmt):
+    return reverse('image-variant', kwargs={'digest': digest, 'width': width, 'fmt': fmt})
+
+
+# {'webp': '/api/images/<hash>/160.webp 160w, ...', ...} for a FoodItem.image_variants manifest
+def srcset(manifest):
+    if not manifest:
+        return None
+    return _srcset(manifest['hash'], tuple(manifest['widths']), tuple(manifest['formats']))
+
+
+# Menu payloads are rebuilt on every version bump; reverse() once per image, not per item per rebuild
+@lru_cache(maxsize=4096)
+def _srcset(digest, widths, formats):
+    return {
+        fmt: ', '.join(f"{variant_url(digest, width, fmt)} {width}w" for width in widths)
+        for fmt in formats
+    }
+
+
+def read_image(food_item):
+    food_item.image.open('rb')
+    try:
+        return food_item.image.read()
+    finally:
+        food_item.image.close()
+
+
+# Hash the current image and record which variants it will have. The manifest is written straight away,
+# so srcset URLs are served immediately; ImageVariantView renders any variant requested before the pool has.
+def plan_variants(food_item):
+    data = read_image(food_item)
+    manifest = {
+        'source': food_item.image.name,
+        'hash': hashlib.sha256(data).hexdigest()[:32],
+        'widths': variant_widths(image_width(data), variant_setting('WIDTHS')),
+        'formats': supported_formats(variant_setting('FORMATS')),
+    }
+    # update() skips auto_now and the signals, and every menu payload carries the srcset, so move
+    # updated_at (the menu's Last-Modified) forward and invalidate the cached menu here
+    updated_at = timezone.now()
+    FoodItem.objects.filter(pk=food_item.pk).update(image_variants=manifest, updated_at=updated_at)
+    food_item.image_variants, food_item.updated_at = manifest, updated_at
+    invalidate_menu()
+    return data, manifest
+
+
+def render_manifest(data, manifest):
+    return render_variants(data, manifest['widths'], manifest['formats'], variant_setting('QUALITY'))
+
+
+def variant_storage():
+    return FoodItem._meta.get_field('image').storage
+
+
+def store_variants(digest, variants):
+    storage = variant_storage()
+    for filename, content in variants.items():
+        width, fmt = filename.split('.')
+        path = variant_path(digest, width, fmt)
+        if not storage.exists(path):
+            storage.save(path, ContentFile(content))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn' keeps the workers free of the parent's threads, locks and database connections
+            _executor = ProcessPoolExecutor(
+                max_workers=variant_setting('WORKERS'), mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+
+# Plan the variants of `food_item`'s image and render them in the process pool, so the request that
+# uploaded it returns without waiting on Pillow. With EAGER the rendering happens inline.
+def schedule_variants(food_item):
+    data, manifest = plan_variants(food_item)
+    if variant_setting('EAGER'):
+        store_variants(manifest['hash'], render_manifest(data, manifest))
+        return
+
+    future = get_executor().submit(
+        render_variants, data, manifest['widths'], manifest['formats'], variant_setting('QUALITY')
+    )
+
+    # Runs on the executor's result thread
+    def done(future):
+        try:
+            store_variants(manifest['hash'], future.result())
+        except Exception:
+            logger.exception("Rendering image variants for food item %s failed", food_item.pk)
+    future.add_done_callback(done)
+
+
+# Render one variant of a planned image on demand: the lazy path behind ImageVariantView, for variants
+# requested before the pool got to them (or whose files were lost). Returns the storage path, or None
+# when no food item's manifest lists the variant.
+def ensure_variant(digest, width, fmt):
+    path = variant_path(digest, width, fmt)
+    storage = variant_storage()
+    if storage.exists(path):
+        return path
+    for food_item in FoodItem.objects.filter(image_variants__hash=digest).exclude(image=''):
+        manifest = food_item.image_variants
+        if width not in manifest['widths'] or fmt not in manifest['formats']:
+            return None
+        data = read_image(food_item)
+        if hashlib.sha256(data).hexdigest()[:32] != digest:
+            continue  # Replaced since it was planned; its own signal re-plans it
+        store_variants(digest, render_variants(data, [width], [fmt], variant_setting('QUALITY')))
+        return path
+    return None
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'IMAGE_VARIANTS' and _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    if setting == 'ROOT_URLCONF':
+        _srcset.cache_clear()
@@ -0,0 +1,44 @@
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+# Pure Pillow helpers for foods/images.py. No Django imports: render_variants() runs in worker
+# processes started with the 'spawn' method, which import this module and nothing else.
+
+PIL_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF', 'jpeg': 'JPEG'}
+
+
+def supported_formats(formats):
+    return [fmt for fmt in formats if fmt == 'jpeg' or features.check(fmt)]
+
+
+# Widths to render for an image `image_width` pixels wide: never upscaled, so every srcset width is real
+def variant_widths(image_width, widths):
+    return sorted({min(width, image_width) for width in widths})
+
+
+def image_width(data):
+    with Image.open(BytesIO(data)) as image:
+        return ImageOps.exif_transpose(image).width
+
+
+# Render every width x format variant of the image in `data`. Returns {'<width>.<format>': bytes}.
+def render_variants(data, widths, formats, quality=80):
+    variants = {}
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                # JPEG has no alpha channel; flatten onto white rather than black
+                frame = resized
+                if fmt == 'jpeg' and has_alpha:
+                    frame = Image.new('RGB', resized.size, 'white')
+                    frame.paste(resized, mask=resized.getchannel('A'))
+                buffer = BytesIO()
+                frame.save(buffer, format=PIL_FORMATS[fmt], quality=quality)
+                variants[f'{width}.{fmt}'] = buffer.getvalue()
+    return variants
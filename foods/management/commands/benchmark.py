@@ -0,0 +1,76 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodstore.benchmark import (
+    LATENCY_NOISE_MS, LATENCY_TOLERANCE, MEMORY_TOLERANCE, BenchmarkRunner, build_scenarios, compare, load_baseline,
+    seeded_database, server_errors,
+)
+
+from .seed_benchmark import add_seed_arguments, seed_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite database, drive every API endpoint through the test client and report "
+        "p50/p95 latency, query counts and peak memory as JSON. Fails when an endpoint answers with a 5xx, when a "
+        "result regresses against the baseline, or when there is no baseline. "
+        "Run with --settings=foodstore.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint")
+        parser.add_argument('--only', nargs='*', default=None, help="Only run these scenarios")
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmark_baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help="Write this run to --baseline instead of comparing")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE)
+        parser.add_argument('--latency-noise-ms', type=float, default=LATENCY_NOISE_MS)
+        parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Benchmarks run against SQLite; use --settings=foodstore.settings_benchmark")
+        baseline = None
+        if not options['save_baseline']:
+            try:
+                baseline = load_baseline(options['baseline'])
+            except FileNotFoundError:
+                raise CommandError(f"No baseline at {options['baseline']}; run with --save-baseline to record one")
+
+        with seeded_database(**seed_options(options)) as counts:
+            runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'])
+            results = runner.run(build_scenarios(), only=options['only'])
+
+        report = {
+            'dataset': counts,
+            'iterations': options['iterations'],
+            'results': results,
+            'regressions': server_errors(results),
+        }
+        if baseline is not None:
+            report['regressions'] += compare(
+                results, baseline,
+                latency_tolerance=options['latency_tolerance'],
+                latency_noise_ms=options['latency_noise_ms'],
+                memory_tolerance=options['memory_tolerance'],
+            )
+
+        rendered = json.dumps(report, indent=2)
+        self.stdout.write(rendered)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(rendered + '\n')
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as f:
+                f.write(rendered + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Saved baseline to {options['baseline']}"))
+
+        if report['regressions']:
+            raise CommandError(
+                f"{len(report['regressions'])} benchmark regression(s):\n  " + "\n  ".join(report['regressions'])
+            )
@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodstore.benchmark import build_async_pairs, compare_async, seeded_database
+
+from .seed_benchmark import add_seed_arguments, seed_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite database and compare requests/sec and tail latency of the sync views against "
+        "their async-native versions under concurrent load through the ASGI handler. "
+        "Run with --settings=foodstore.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and version")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Benchmarks run against SQLite; use --settings=foodstore.settings_benchmark")
+
+        with seeded_database(**seed_options(options)) as counts:
+            results = asyncio.run(compare_async(
+                build_async_pairs(), requests=options['requests'], concurrency=options['concurrency'],
+            ))
+
+        rendered = json.dumps({
+            'dataset': counts,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2)
+        self.stdout.write(rendered)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(rendered + '\n')
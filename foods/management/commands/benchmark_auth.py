@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodstore.auth import AUTH_MODES
+from foodstore.benchmark import auth_benchmark, seeded_database
+
+from .seed_benchmark import BENCHMARK_PASSWORD, add_seed_arguments, seed_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite database and compare the per-request cost of each AUTH_MODE, and of the old "
+        "duplicated middleware stack, for a logged-in user. Run with --settings=foodstore.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--modes', default=None,
+            help="Comma-separated modes (default: all of them, jwt only when simplejwt is installed)",
+        )
+        parser.add_argument('--path', default='/api/cart/')
+        parser.add_argument('--logins', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Benchmarks run against SQLite; use --settings=foodstore.settings_benchmark")
+        if options['modes']:
+            modes = options['modes'].split(',')
+        else:
+            modes = [mode for mode in AUTH_MODES if mode != 'jwt' or simplejwt_installed()]
+
+        with seeded_database(**seed_options(options)) as counts:
+            results = auth_benchmark(
+                modes, 'bench0', BENCHMARK_PASSWORD,
+                requests=options['requests'], path=options['path'], logins=options['logins'],
+            )
+        self.stdout.write(json.dumps({'dataset': counts, 'path': options['path'], 'results': results}, indent=2))
+
+
+def simplejwt_installed():
+    try:
+        import rest_framework_simplejwt  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from foodstore.benchmark import connection_benchmark
+from foodstore.db import CONNECTION_MODES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request database connection overhead across DB_CONNECTION_MODEs by timing sequential "
+        "GET /api/health/ requests. Needs no data: run it with --settings=foodstore.settings_benchmark "
+        "(SQLite, add --connect-delay to model a remote handshake) or against a local Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--modes', default=None,
+            help="Comma-separated modes (default: per-request,persistent, plus pool on Postgres)",
+        )
+        parser.add_argument('--connect-delay', type=float, default=0.0, help="Milliseconds added to every new connection")
+        parser.add_argument('--path', default='/api/health/')
+
+    def handle(self, *args, **options):
+        if options['modes']:
+            modes = options['modes'].split(',')
+        else:
+            modes = [mode for mode in CONNECTION_MODES if mode != 'pool' or connection.vendor == 'postgresql']
+        results = connection_benchmark(
+            modes, requests=options['requests'], path=options['path'], connect_delay=options['connect_delay'] / 1000,
+        )
+        self.stdout.write(json.dumps({
+            'database': connection.vendor, 'connect_delay_ms': options['connect_delay'], 'results': results,
+        }, indent=2))
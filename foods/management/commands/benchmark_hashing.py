@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodstore.benchmark import hashing_benchmark, seeded_database
+
+from .seed_benchmark import BENCHMARK_PASSWORD, add_seed_arguments, seed_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite database and measure logins/sec per core at several PBKDF2 iteration counts, "
+        "through the hashing pool and through the sync and async login views. "
+        "Run with --settings=foodstore.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--iterations', default='260000,600000,1000000', help="Comma-separated PBKDF2 iteration counts")
+        parser.add_argument('--workers', type=int, default=None, help="Hashing pool threads (default: available cores)")
+        parser.add_argument('--hashes', type=int, default=40, help="Verifications through the pool per count")
+        parser.add_argument('--requests', type=int, default=40, help="Logins per view per count")
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Benchmarks run against SQLite; use --settings=foodstore.settings_benchmark")
+        iteration_counts = [int(count) for count in options['iterations'].split(',')]
+
+        with seeded_database(**seed_options(options)) as counts:
+            results = hashing_benchmark(
+                iteration_counts, 'bench0', BENCHMARK_PASSWORD, workers=options['workers'],
+                hashes=options['hashes'], requests=options['requests'], concurrency=options['concurrency'],
+            )
+        self.stdout.write(json.dumps({'dataset': counts, 'results': results}, indent=2))
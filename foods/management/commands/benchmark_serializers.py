@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodstore.benchmark import seeded_database, serializer_microbenchmark
+
+from .seed_benchmark import add_seed_arguments, seed_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite database and time FoodItemSerializer, CartItemSerializer and OrderItemSerializer "
+        "against their fast paths in foods/fast_serializers.py. Run with --settings=foodstore.settings_benchmark."
+    )
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=1000, help="Rows serialized per round")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Benchmarks run against SQLite; use --settings=foodstore.settings_benchmark")
+
+        with seeded_database(**seed_options(options)) as counts:
+            results = serializer_microbenchmark(rounds=options['rounds'], limit=options['limit'])
+        self.stdout.write(json.dumps({'dataset': counts, 'rounds': options['rounds'], 'results': results}, indent=2))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from foods.images import get_executor, plan_variants, render_variants, store_variants, variant_setting
+from foods.models import FoodItem
+
+
+class Command(BaseCommand):
+    help = "Render the sized WebP/AVIF variants of food item images that do not have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('food_item_ids', nargs='*', type=int, help="Only process these food items")
+        parser.add_argument('--force', action='store_true', help="Re-render items that already have variants")
+
+    def handle(self, *args, **options):
+        food_items = FoodItem.objects.exclude(image='').exclude(image__isnull=True)
+        if options['food_item_ids']:
+            food_items = food_items.filter(pk__in=options['food_item_ids'])
+
+        # Plan sequentially (it writes each manifest), render in the process pool, store as results arrive
+        jobs = []
+        rendered = failed = 0
+        for food_item in food_items.iterator():
+            manifest = food_item.image_variants
+            if manifest and manifest['source'] == food_item.image.name and not options['force']:
+                continue
+            try:
+                data, manifest = plan_variants(food_item)
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Food item {food_item.pk}: {exc}")
+                continue
+            future = get_executor().submit(
+                render_variants, data, manifest['widths'], manifest['formats'], variant_setting('QUALITY')
+            )
+            jobs.append((food_item, manifest, future))
+
+        for food_item, manifest, future in jobs:
+            try:
+                store_variants(manifest['hash'], future.result())
+                rendered += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Food item {food_item.pk}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Rendered image variants for {rendered} food items ({failed} failed)"))
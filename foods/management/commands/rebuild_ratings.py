@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from foods.models import FoodItem
+from foods.services import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute FoodItem rating_count/rating_sum/rating_avg from the reviews table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('food_item_ids', nargs='*', type=int, help="Only rebuild these food items")
+
+    def handle(self, *args, **options):
+        food_items = FoodItem.objects.all()
+        if options['food_item_ids']:
+            food_items = food_items.filter(pk__in=options['food_item_ids'])
+        updated = rebuild_ratings(food_items)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {updated} food items"))
@@ -0,0 +1,141 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from customers.models import Customer
+from foods.models import CartItem, Category, FoodItem, Order, OrderItem, Review
+from foods.search import food_item_search_vector
+from foods.services import rebuild_ratings
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+WORDS = (
+    'spicy', 'grilled', 'crispy', 'cheesy', 'smoked', 'classic', 'double', 'garlic', 'honey', 'tandoori',
+    'burger', 'pizza', 'pasta', 'wrap', 'salad', 'chicken', 'beef', 'paneer', 'noodles', 'fries',
+)
+
+SEED_OPTIONS = (
+    'categories', 'food_items', 'users', 'orders', 'items_per_order', 'reviews', 'cart_items', 'seed', 'batch_size',
+)
+
+
+# Shared with `manage.py benchmark`, which seeds its own throwaway database
+def add_seed_arguments(parser):
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--food-items', type=int, default=500)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--items-per-order', type=int, default=3)
+    parser.add_argument('--reviews', type=int, default=2000)
+    parser.add_argument('--cart-items', type=int, default=3, help="Cart lines per user")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=1000)
+
+
+def seed_options(options):
+    return {key: options[key] for key in SEED_OPTIONS}
+
+
+class Command(BaseCommand):
+    help = "Seed the database with a reproducible synthetic dataset for `manage.py benchmark`, using bulk inserts"
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+
+    def handle(self, *args, **options):
+        if FoodItem.objects.exists() or User.objects.filter(username__startswith='bench').exists():
+            raise CommandError("Refusing to seed a database that already has menu or benchmark data")
+        with transaction.atomic():
+            counts = seed(**seed_options(options))
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items())
+        ))
+
+
+def seed(categories, food_items, users, orders, items_per_order, reviews, cart_items, seed=42, batch_size=1000):
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    category_rows = Category.objects.bulk_create(
+        [Category(name=f'Category {i}', slug=f'category-{i}') for i in range(categories)], batch_size=batch_size
+    )
+
+    food_rows = []
+    for i in range(food_items):
+        words = rng.sample(WORDS, 3)
+        price = Decimal(rng.randint(150, 2500)) / 100
+        food_rows.append(FoodItem(
+            category=category_rows[i % categories],
+            name=f"{words[0].title()} {words[1].title()} {words[2].title()} {i}",
+            description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))),
+            price=price,
+            pre_discount_price=price + Decimal(rng.randint(0, 300)) / 100 if rng.random() < 0.3 else None,
+            is_special=rng.random() < 0.1,
+        ))
+    food_rows = FoodItem.objects.bulk_create(food_rows, batch_size=batch_size)
+    # bulk_create skips the post_save signal that maintains the stored search document
+    if connection.vendor == 'postgresql':
+        FoodItem.objects.update(search_vector=food_item_search_vector())
+
+    # Hash once and share it: hashing thousands of passwords would dominate the seeding time
+    password = make_password(BENCHMARK_PASSWORD)
+    user_rows = User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password, first_name='Bench', last_name=str(i))
+        for i in range(users)
+    ], batch_size=batch_size)
+    User.objects.bulk_create(
+        [User(username='bench-admin', email='admin@example.com', password=password, is_staff=True, is_superuser=True)]
+    )
+    Customer.objects.bulk_create(
+        [Customer(user=user, phone='01700000000', address=f'{i} Bench Street') for i, user in enumerate(user_rows)],
+        batch_size=batch_size,
+    )
+    Token.objects.bulk_create(
+        [Token(user=user, key=Token.generate_key()) for user in User.objects.filter(username__startswith='bench')],
+        batch_size=batch_size,
+    )
+
+    order_rows = Order.objects.bulk_create([
+        Order(customer=user_rows[i % users], status=rng.choice(['Pending', 'Paid', 'Processing', 'Delivered']))
+        for i in range(orders)
+    ], batch_size=batch_size)
+    line_rows = []
+    for order in order_rows:
+        for food_item in rng.sample(food_rows, items_per_order):
+            line_rows.append(OrderItem(order=order, food_item=food_item, quantity=rng.randint(1, 4)))
+    OrderItem.objects.bulk_create(line_rows, batch_size=batch_size)
+    # Spread created_at so the keyset indexes see realistic, mostly distinct values
+    for i, order in enumerate(order_rows):
+        order.created_at = now - timedelta(minutes=i)
+        order.total_price = Decimal('0')
+    for line in line_rows:
+        line.order.total_price += line.food_item.price * line.quantity
+    Order.objects.bulk_update(order_rows, ['created_at', 'total_price'], batch_size=batch_size)
+
+    review_pairs = set()
+    while len(review_pairs) < min(reviews, users * food_items):
+        review_pairs.add((rng.randrange(users), rng.randrange(food_items)))
+    Review.objects.bulk_create([
+        Review(customer=user_rows[u], food_item=food_rows[f], rating=rng.randint(1, 5), comment='Tasty')
+        for u, f in sorted(review_pairs)
+    ], batch_size=batch_size)
+    rebuild_ratings()  # Also invalidates the menu cache
+
+    CartItem.objects.bulk_create([
+        CartItem(user=user, food_item=food_item, quantity=rng.randint(1, 3))
+        for user in user_rows
+        for food_item in rng.sample(food_rows, cart_items)
+    ], batch_size=batch_size)
+
+    return {
+        'categories': len(category_rows), 'food items': len(food_rows), 'users': len(user_rows),
+        'orders': len(order_rows), 'order lines': len(line_rows), 'reviews': len(review_pairs),
+        'cart items': users * cart_items,
+    }
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:05
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# The GIN indexes and the backfill only make sense on Postgres; other backends search in-process
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.search import SearchVector
+
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS fooditem_search_vector_gin ON foods_fooditem USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS fooditem_name_trgm_gin ON foods_fooditem USING gin (name gin_trgm_ops)'
+    )
+    FoodItem = apps.get_model('foods', 'FoodItem')
+    FoodItem.objects.update(
+        search_vector=SearchVector('name', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english')
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS fooditem_search_vector_gin')
+    schema_editor.execute('DROP INDEX IF EXISTS fooditem_name_trgm_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0004_updated_at'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='fooditem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:23
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    FoodItem = apps.get_model('foods', 'FoodItem')
+    Review = apps.get_model('foods', 'Review')
+    reviews = Review.objects.filter(food_item=OuterRef('pk')).order_by().values('food_item')
+    count = Coalesce(Subquery(reviews.annotate(n=Count('pk')).values('n')), Value(0))
+    total = Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), Value(0))
+    FoodItem.objects.update(rating_count=count, rating_sum=total)
+    FoodItem.objects.filter(rating_count__gt=0).update(
+        rating_avg=Cast('rating_sum', FloatField()) / Cast('rating_count', FloatField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0005_fooditem_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['-rating_avg', '-rating_count', 'id'], name='fooditem_rating_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
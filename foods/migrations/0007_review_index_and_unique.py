@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+# The racy existence check let customers review an item twice; keep each customer's first review
+# and refresh the rating aggregates of the items that lost duplicates
+def drop_duplicate_reviews(apps, schema_editor):
+    Review = apps.get_model('foods', 'Review')
+    FoodItem = apps.get_model('foods', 'FoodItem')
+    duplicates = (
+        Review.objects.values('customer', 'food_item')
+        .annotate(n=Count('pk'), first=Min('pk'))
+        .filter(n__gt=1)
+    )
+    touched = set()
+    for row in duplicates:
+        Review.objects.filter(customer=row['customer'], food_item=row['food_item']).exclude(pk=row['first']).delete()
+        touched.add(row['food_item'])
+    for food_item_id in touched:
+        totals = Review.objects.filter(food_item=food_item_id).aggregate(n=Count('pk'), s=Sum('rating'))
+        FoodItem.objects.filter(pk=food_item_id).update(
+            rating_count=totals['n'], rating_sum=totals['s'] or 0,
+            rating_avg=(totals['s'] or 0) / totals['n'] if totals['n'] else 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0006_fooditem_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_reviews, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['food_item', '-created_at', '-id'], name='review_item_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('customer', 'food_item'), name='unique_review_per_customer'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+# Racing get_or_create() calls could add the same item to a cart twice; fold each set of
+# duplicate lines into the first one, keeping the combined quantity
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model('foods', 'CartItem')
+    duplicates = (
+        CartItem.objects.values('user', 'food_item')
+        .annotate(n=Count('pk'), first=Min('pk'), total=Sum('quantity'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        CartItem.objects.filter(user=row['user'], food_item=row['food_item']).exclude(pk=row['first']).delete()
+        CartItem.objects.filter(pk=row['first']).update(quantity=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foods', '0008_fooditem_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'food_item'), name='unique_cart_item'),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 
 from django.utils.text import slugify
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=120, unique=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -24,11 +26,32 @@ class FoodItem(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2)
     pre_discount_price = models.DecimalField(max_digits=6, decimal_places=2, blank=True, null=True)
     image = models.ImageField(upload_to="food_images/", blank=True, null=True)
+    # Sized WebP/AVIF renditions of `image` (see foods/images.py): {'source', 'hash', 'widths', 'formats'}
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
     is_special = models.BooleanField(default=False)  # For "Specials" section
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)  # Maintained on save, GIN-indexed on Postgres
+    # Denormalized review aggregates, maintained by foods.services.add_rating and `manage.py rebuild_ratings`
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating_avg', '-rating_count', 'id'], name='fooditem_rating_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+# Order QuerySet: loads everything OrderSerializer touches in a fixed number of queries
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        return self.select_related('customer').prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.select_related('food_item__category'))
+        )
+
+
 # Order Model
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -44,10 +67,37 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Pending")
     created_at = models.DateTimeField(auto_now_add=True)
     estimated_delivery_time = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Back keyset pagination of the admin listing and each customer's history
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.customer.username}"
 
+# One status change of an order, appended by foods.order_status.transition()
+class OrderStatusEvent(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="status_events")
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)  # None for gateway callbacks
+    source = models.CharField(max_length=20, blank=True)  # 'admin', 'customer', 'gateway', ...
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_status_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status} -> {self.to_status}"
+
 # OrderItem Model (Many-to-Many relation between Orders and FoodItems)
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
@@ -65,14 +115,33 @@ class Review(models.Model):
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Backs keyset pagination of an item's reviews, newest first
+            models.Index(fields=['food_item', '-created_at', '-id'], name='review_item_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'food_item'], name='unique_review_per_customer'),
+        ]
+
     def __str__(self):
         return f"Review by {self.customer.username} for {self.food_item.name}"
 
 
 class CartItem(models.Model):
+    # Most of one item a line holds; requests asking for more are refused and increments stop here, so the
+    # quantity can never overflow the integer column
+    MAX_QUANTITY = 999
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cart")
     food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            # One line per item; foods.services.add_to_cart upserts against it
+            models.UniqueConstraint(fields=['user', 'food_item'], name='unique_cart_item'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.food_item.name} in {self.user.username}'s cart"
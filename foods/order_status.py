@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, OrderStatusEvent
+
+# Legal moves between Order.STATUS_CHOICES. Delivered and Cancelled are final.
+TRANSITIONS = {
+    'Pending': {'Paid', 'Processing', 'Cancelled'},
+    'Paid': {'Processing', 'Delivered', 'Cancelled'},
+    'Processing': {'Delivered', 'Cancelled'},
+    'Delivered': set(),
+    'Cancelled': set(),
+}
+
+# Re-reads allowed when another writer changes the status between our read and our UPDATE
+MAX_ATTEMPTS = 3
+
+
+class IllegalTransition(Exception):
+    def __init__(self, current, target):
+        super().__init__(f"An order cannot go from {current} to {target}")
+        self.current = current
+        self.target = target
+
+
+# The order was not in the status the caller expected (or kept changing under us)
+class StatusConflict(Exception):
+    def __init__(self, expected, current):
+        super().__init__(f"Expected the order to be {expected}, but it is {current}")
+        self.expected = expected
+        self.current = current
+
+
+def current_status(order_id):
+    return Order.objects.filter(pk=order_id).values_list('status', flat=True).first()
+
+
+# Move order `order_id` to `target` with optimistic concurrency: the status is read without a lock and
+# written with UPDATE ... WHERE status=<what we read>, which touches only status, updated_at and `fields`.
+# If another writer got there first, the new status is re-read and the move re-validated against it, so
+# concurrent transitions serialize on the row without losing updates or holding locks.
+# `expected` restricts the move to one starting status (raises StatusConflict otherwise). Returns the
+# OrderStatusEvent appended to the history, or None when the order already was in `target`.
+def transition(order_id, target, expected=None, actor=None, source='', **fields):
+    if target not in TRANSITIONS:
+        raise IllegalTransition(None, target)
+    for _ in range(MAX_ATTEMPTS):
+        current = current_status(order_id)
+        if current is None:
+            raise Order.DoesNotExist(f"Order {order_id} does not exist")
+        if current == target:
+            return None
+        if expected is not None and current != expected:
+            raise StatusConflict(expected, current)
+        if target not in TRANSITIONS[current]:
+            raise IllegalTransition(current, target)
+
+        with transaction.atomic():
+            updated = Order.objects.filter(pk=order_id, status=current).update(
+                status=target, updated_at=timezone.now(), **fields
+            )
+            if updated:
+                return OrderStatusEvent.objects.create(
+                    order_id=order_id, from_status=current, to_status=target,
+                    actor=actor if actor is not None and actor.is_authenticated else None, source=source,
+                )
+    raise StatusConflict(expected or current, current_status(order_id))
@@ -0,0 +1,208 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import F, Q
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .cache import get_menu_cache
+from .models import FoodItem
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+# Weighted document vector kept in FoodItem.search_vector: names outrank descriptions
+def food_item_search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('name', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english')
+    )
+
+
+# Postgres backend: prefix tsquery against the GIN-indexed search_vector column,
+# topped up with pg_trgm similarity on the name so typos still find something.
+# The `%` (trigram_similar) operator keeps the fuzzy arm on the trigram GIN index.
+class PostgresSearchBackend:
+    def search(self, query, category_slug=None):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        ts_query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config='english')
+        similarity = TrigramSimilarity('name', query)
+
+        food_items = FoodItem.objects.all()
+        if category_slug:
+            food_items = food_items.filter(category__slug=category_slug)
+        return (
+            food_items
+            .filter(Q(search_vector=ts_query) | Q(name__trigram_similar=query))
+            .annotate(rank=SearchRank(F('search_vector'), ts_query) + similarity)
+            .order_by('-rank', 'pk')
+            .values_list('pk', flat=True)
+        )
+
+    def update(self, food_item):
+        FoodItem.objects.filter(pk=food_item.pk).update(search_vector=food_item_search_vector())
+
+
+# One immutable build of the inverted index. A rebuild makes a new one and swaps it in with a single
+# assignment, so a concurrent search keeps reading a consistent snapshot.
+SearchIndex = namedtuple('SearchIndex', ['version', 'postings', 'vocabulary', 'deletions', 'categories', 'idf'])
+
+EMPTY_INDEX = SearchIndex(None, {}, [], {}, {}, {})
+
+
+# In-process inverted index with prefix and one-typo matching, for SQLite and tests.
+# The index is rebuilt lazily whenever the menu version changes.
+class InvertedIndexSearchBackend:
+    field_weights = {'name': 2.0, 'description': 1.0}
+    prefix_factor = 0.8
+    fuzzy_factor = 0.6
+    fuzzy_min_length = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = EMPTY_INDEX
+
+    def search(self, query, category_slug=None):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        index = self._ensure_index()
+
+        scores = None
+        for token in tokens:
+            token_scores = defaultdict(float)
+            for term, factor in self._expand(index, token):
+                idf = index.idf[term]
+                for pk, weight in index.postings[term].items():
+                    token_scores[pk] = max(token_scores[pk], weight * idf * factor)
+            # Every query token has to match, like the '&' in the Postgres tsquery
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores}
+            if not scores:
+                return []
+
+        if category_slug:
+            scores = {pk: score for pk, score in scores.items() if index.categories.get(pk) == category_slug}
+        return [pk for pk, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))]
+
+    def update(self, food_item):
+        # The version bump from the menu signals already schedules a rebuild
+        pass
+
+    # The index for the current menu version, rebuilt first when it is stale
+    def _ensure_index(self):
+        version = get_menu_cache().version()
+        index = self._index
+        if index.version == version:
+            return index
+        with self._lock:
+            if self._index.version != version:
+                self._index = self._build(version)
+            return self._index
+
+    def _build(self, version):
+        postings = defaultdict(dict)
+        categories = {}
+        rows = FoodItem.objects.values_list('pk', 'name', 'description', 'category__slug')
+        for pk, name, description, category_slug in rows.iterator():
+            categories[pk] = category_slug
+            for field, text in (('name', name), ('description', description)):
+                tokens = tokenize(text)
+                for token in tokens:
+                    # Field weight dampened by document length so short names rank above long blurbs
+                    weight = self.field_weights[field] / math.sqrt(len(tokens))
+                    postings[token][pk] = max(postings[token].get(pk, 0.0), weight)
+
+        deletions = defaultdict(set)
+        for term in postings:
+            for variant in self._deletion_variants(term):
+                deletions[variant].add(term)
+
+        total = max(len(categories), 1)
+        return SearchIndex(
+            version=version,
+            postings=dict(postings),
+            vocabulary=sorted(postings),
+            deletions=dict(deletions),
+            categories=categories,
+            idf={term: 1.0 + math.log(total / len(docs)) for term, docs in postings.items()},
+        )
+
+    # Terms matching `token` exactly, by prefix, or within one edit, with their score factor
+    def _expand(self, index, token):
+        matches = {}
+        start = bisect.bisect_left(index.vocabulary, token)
+        for term in index.vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            matches[term] = 1.0 if term == token else self.prefix_factor
+
+        if len(token) >= self.fuzzy_min_length:
+            candidates = set()
+            for variant in self._deletion_variants(token):
+                candidates |= index.deletions.get(variant, set())
+            for term in candidates:
+                if term not in matches and self._within_one_edit(token, term):
+                    matches[term] = self.fuzzy_factor
+        return matches.items()
+
+    @staticmethod
+    def _deletion_variants(term):
+        return {term} | {term[:i] + term[i + 1:] for i in range(len(term))}
+
+    @staticmethod
+    def _within_one_edit(a, b):
+        if abs(len(a) - len(b)) > 1:
+            return False
+        if len(a) == len(b):
+            diffs = [i for i in range(len(a)) if a[i] != b[i]]
+            # One substitution, or one adjacent transposition
+            return len(diffs) <= 1 or (
+                len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+            )
+        if len(a) > len(b):
+            a, b = b, a
+        i = 0
+        while i < len(a) and a[i] == b[i]:
+            i += 1
+        return a[i:] == b[i + 1:]
+
+
+_search_backend = None
+
+
+def get_search_backend():
+    global _search_backend
+    if _search_backend is None:
+        path = getattr(settings, 'FOOD_SEARCH_BACKEND', 'auto')
+        if path == 'auto':
+            backend_class = PostgresSearchBackend if connection.vendor == 'postgresql' else InvertedIndexSearchBackend
+        else:
+            backend_class = import_string(path)
+        _search_backend = backend_class()
+    return _search_backend
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    global _search_backend
+    if setting == 'FOOD_SEARCH_BACKEND':
+        _search_backend = None
@@ -1,6 +1,17 @@
 from rest_framework import serializers
+from .images import srcset
 from .models import Category, FoodItem, Order, OrderItem, Review, CartItem
 
+# {format: srcset string} of the sized variants of a food item's image, from its variant manifest
+class ImageSrcsetField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, manifest):
+        return srcset(manifest)
+
+
 # Category Serializer
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,10 +22,13 @@ class CategorySerializer(serializers.ModelSerializer):
 class FoodItemSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)  # Nested serializer to show category details
     # category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())  # Allow category ID for write operations
+    average_rating = serializers.FloatField(source='rating_avg', read_only=True)  # Denormalized, no extra query
+    image_srcset = ImageSrcsetField(source='image_variants')
 
     class Meta:
         model = FoodItem
-        fields = ['id', 'category', 'name', 'description', 'price', 'pre_discount_price','image', 'is_special']
+        fields = ['id', 'category', 'name', 'description', 'price', 'pre_discount_price','image', 'image_srcset', 'is_special', 'rating_count', 'average_rating']
+        read_only_fields = ['rating_count']
 
 # Order Item Serializer
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -50,7 +64,17 @@ class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ['id', 'food_item', 'quantity']
-        
-        
-        
 
+
+# One step of a PATCH /api/cart/ batch: add to an item's quantity, set it (0 removes the line) or remove the line
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'])
+    food_item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, max_value=CartItem.MAX_QUANTITY, required=False)
+
+    def validate(self, data):
+        if data['op'] == 'add' and data.get('quantity', 1) < 1:
+            raise serializers.ValidationError({'quantity': 'add needs a quantity of at least 1'})
+        if data['op'] == 'set' and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': 'set needs a quantity'})
+        return data
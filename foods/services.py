@@ -0,0 +1,193 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import (
+    Case, Count, DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Coalesce
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import invalidate_menu
+from .fast_serializers import cart_item_plan
+from .models import CartItem, FoodItem, Order, OrderItem, Review
+
+
+# Place an order for `customer` from (food_item_id, quantity) pairs.
+# Every referenced food item is fetched with one in_bulk() query and the lines are written with one bulk_create(),
+# so the cost does not depend on how many lines the order has.
+def place_order(customer, lines, status="Pending"):
+    lines = [(int(food_item_id), int(quantity)) for food_item_id, quantity in lines]
+
+    with transaction.atomic():
+        food_items = FoodItem.objects.in_bulk({food_item_id for food_item_id, _ in lines})
+        missing = [food_item_id for food_item_id, _ in lines if food_item_id not in food_items]
+        if missing:
+            raise Http404('No FoodItem matches the given query.')
+
+        total_price = sum(food_items[food_item_id].price * quantity for food_item_id, quantity in lines)
+        order = Order.objects.create(customer=customer, total_price=total_price, status=status)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, food_item=food_items[food_item_id], quantity=quantity)
+            for food_item_id, quantity in lines
+        ])
+    return order
+
+
+# Turn the user's cart into an order and empty the cart, all in one transaction.
+# Returns None when the cart is empty.
+def checkout_cart(user, status="Pending"):
+    with transaction.atomic():
+        cart_items = CartItem.objects.filter(user=user)
+        lines = list(cart_items.values_list('food_item_id', 'quantity'))
+        if not lines:
+            return None
+        order = place_order(user, lines, status=status)
+        cart_items.delete()
+    return order
+
+
+# Undo checkout_cart() for an order that was never paid for: its lines go back into the cart and the order
+# (with its items) is deleted, in one transaction
+def restore_cart(user, order):
+    with transaction.atomic():
+        add_to_cart(user, order.items.values_list('food_item_id', 'quantity'))
+        order.delete()
+
+
+# Fold one new rating into the item's aggregates with a single UPDATE.
+# The F() expressions are evaluated by the database, so concurrent reviews cannot lose counts.
+def add_rating(food_item_id, rating):
+    FoodItem.objects.filter(pk=food_item_id).update(
+        rating_count=F('rating_count') + 1,
+        rating_sum=F('rating_sum') + rating,
+        rating_avg=Cast(F('rating_sum') + rating, FloatField()) / Cast(F('rating_count') + 1, FloatField()),
+        updated_at=timezone.now(),  # update() skips auto_now, and the menu's Last-Modified is read from it
+    )
+    # update() skips the model signals, so invalidate the cached menu ourselves
+    invalidate_menu()
+
+
+# Recompute the aggregates of every item (or of `food_items`) from the reviews table in two UPDATE statements
+def rebuild_ratings(food_items=None):
+    food_items = FoodItem.objects.all() if food_items is None else food_items
+    reviews = Review.objects.filter(food_item=OuterRef('pk')).order_by().values('food_item')
+    with transaction.atomic():
+        updated = food_items.update(
+            rating_count=Coalesce(Subquery(reviews.annotate(n=Count('pk')).values('n')), Value(0)),
+            rating_sum=Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), Value(0)),
+            rating_avg=Value(0.0),
+            updated_at=timezone.now(),
+        )
+        food_items.filter(rating_count__gt=0).update(
+            rating_avg=Cast('rating_sum', FloatField()) / Cast('rating_count', FloatField())
+        )
+    invalidate_menu()
+    return updated
+
+
+# Add (food_item_id, quantity) lines to the user's cart with one INSERT ... ON CONFLICT statement: new items
+# are inserted and items already in the cart have their quantity incremented by the database, so concurrent
+# adds of the same item can neither create a second row (unique_cart_item) nor lose an increment.
+# Quantities are capped at CartItem.MAX_QUANTITY. Returns {food_item_id: cart_item_id}.
+def add_to_cart(user, lines):
+    quantities = Counter()
+    for food_item_id, quantity in lines:
+        # One row per item: ON CONFLICT cannot touch a row twice
+        quantities[int(food_item_id)] = min(quantities[int(food_item_id)] + int(quantity), CartItem.MAX_QUANTITY)
+    if not quantities:
+        return {}
+
+    qn = connection.ops.quote_name
+    table = qn(CartItem._meta.db_table)
+    total, cap = f"{table}.{qn('quantity')} + EXCLUDED.{qn('quantity')}", CartItem.MAX_QUANTITY
+    sql = (
+        f"INSERT INTO {table} ({qn('user_id')}, {qn('food_item_id')}, {qn('quantity')}) "
+        f"VALUES {', '.join(['(%s, %s, %s)'] * len(quantities))} "
+        f"ON CONFLICT ({qn('user_id')}, {qn('food_item_id')}) "
+        f"DO UPDATE SET {qn('quantity')} = CASE WHEN {total} > {cap} THEN {cap} ELSE {total} END "
+        f"RETURNING {qn('food_item_id')}, {qn('id')}"
+    )
+    params = [value for food_item_id, quantity in quantities.items() for value in (user.pk, food_item_id, quantity)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
+# Apply a batch of cart operations ({'op': 'add'|'set'|'remove', 'food_item_id', 'quantity'}), in order, in one
+# transaction. They are first folded into one net change per item, which then takes at most three statements
+# however long the batch is: a single DELETE for removals, a bulk upsert for absolute quantities and one
+# add_to_cart() for increments.
+def apply_cart_operations(user, operations):
+    changes = {}  # food_item_id -> ('add', n) | ('set', n); a set to 0 is a removal
+    for operation in operations:
+        food_item_id, quantity = operation['food_item_id'], operation.get('quantity', 1)
+        if operation['op'] == 'remove':
+            changes[food_item_id] = ('set', 0)
+        elif operation['op'] == 'set':
+            changes[food_item_id] = ('set', quantity)
+        else:
+            kind, current = changes.get(food_item_id, ('add', 0))
+            # A set folded with later adds is written as-is by the upsert, so it is capped here
+            changes[food_item_id] = (kind, min(current + quantity, CartItem.MAX_QUANTITY))
+
+    with transaction.atomic():
+        added = {pk for pk, (kind, quantity) in changes.items() if kind == 'add' or quantity}
+        if len(FoodItem.objects.filter(pk__in=added).values_list('pk', flat=True)) != len(added):
+            raise Http404('No FoodItem matches the given query.')
+
+        removed = [pk for pk, (kind, quantity) in changes.items() if kind == 'set' and not quantity]
+        if removed:
+            CartItem.objects.filter(user=user, food_item__in=removed).delete()
+        CartItem.objects.bulk_create(
+            [
+                CartItem(user=user, food_item_id=pk, quantity=quantity)
+                for pk, (kind, quantity) in changes.items() if kind == 'set' and quantity
+            ],
+            update_conflicts=True, unique_fields=['user', 'food_item'], update_fields=['quantity'],
+        )
+        add_to_cart(user, [(pk, quantity) for pk, (kind, quantity) in changes.items() if kind == 'add'])
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+money = serializers.DecimalField(max_digits=12, decimal_places=2).to_representation
+
+CART_TOTALS = ('subtotal', 'line_savings', 'cart_quantity', 'cart_total', 'cart_savings')
+
+
+# The user's cart lines with per-line subtotal and savings (from pre_discount_price) computed by the database,
+# and the cart-wide sums attached to every row by window functions, so the whole summary is one SELECT
+def cart_lines(user):
+    price = F('food_item__price')
+    savings = Case(
+        When(food_item__pre_discount_price__gt=price, then=F('quantity') * (F('food_item__pre_discount_price') - price)),
+        default=Value(Decimal('0')), output_field=MONEY,
+    )
+    return CartItem.objects.filter(user=user).order_by('pk').annotate(
+        subtotal=ExpressionWrapper(F('quantity') * price, output_field=MONEY), line_savings=savings,
+    ).annotate(
+        cart_quantity=Window(Sum('quantity')),
+        cart_total=Window(Sum('subtotal'), output_field=MONEY),
+        cart_savings=Window(Sum('line_savings'), output_field=MONEY),
+    )
+
+
+def build_cart_summary(rows):
+    items = []
+    quantity, total, savings = 0, Decimal('0'), Decimal('0')
+    for data, (subtotal, line_savings, quantity, total, savings) in rows:
+        data['subtotal'] = money(subtotal)
+        data['savings'] = money(line_savings)
+        items.append(data)
+    return {'items': items, 'item_count': quantity, 'total': money(total), 'savings': money(savings)}
+
+
+# {'items': [...CartItemSerializer fields, 'subtotal', 'savings'], 'item_count', 'total', 'savings'} in one query
+def cart_summary(user):
+    return build_cart_summary(cart_item_plan().rows(cart_lines(user), *CART_TOTALS))
+
+
+async def acart_summary(user):
+    return build_cart_summary([row async for row in cart_item_plan().arows(cart_lines(user), *CART_TOTALS)])
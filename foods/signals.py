@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_menu
+from .images import schedule_variants
+from .models import Category, FoodItem
+from .search import get_search_backend
+
+
+# Deleting an item changes its category's listing, so move the category's updated_at forward
+# to keep Last-Modified on the menu endpoints honest. Registered first so it lands before the version bump.
+@receiver(post_delete, sender=FoodItem)
+def touch_category(sender, instance, **kwargs):
+    Category.objects.filter(pk=instance.category_id).update(updated_at=timezone.now())
+
+
+# Keep the stored search document in step with the row (a no-op for the in-process index)
+@receiver(post_save, sender=FoodItem)
+def update_search_document(sender, instance, **kwargs):
+    get_search_backend().update(instance)
+
+
+# A new or replaced image gets its variants planned and rendered once the upload has committed.
+# Robust, so a corrupt upload is logged rather than failing the request that saved it.
+@receiver(post_save, sender=FoodItem)
+def generate_image_variants(sender, instance, **kwargs):
+    manifest = instance.image_variants
+    if not instance.image:
+        if manifest:
+            FoodItem.objects.filter(pk=instance.pk).update(image_variants=None)
+            instance.image_variants = None
+    elif not manifest or manifest['source'] != instance.image.name:
+        transaction.on_commit(lambda: schedule_variants(instance), robust=True)
+
+
+# Any change to the menu invalidates every cached menu response
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def bump_menu_version(sender, **kwargs):
+    invalidate_menu()
@@ -1,3 +1,987 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from foodstore.benchmark import BenchmarkRunner, build_scenarios, compare, percentile, server_errors, serializer_microbenchmark
+from foodstore.db import connection_settings
+from foodstore.profiling import fingerprint, registry
+from foodstore.routers import read_from_replica
+
+from .cache import LocMemMenuBackend, MenuCache, RedisMenuBackend, get_menu_cache
+from .fast_serializers import CompactJSONRenderer, RowPlan, cart_item_data, food_item_data, order_item_data
+from .management.commands.seed_benchmark import seed
+from .models import CartItem, Category, FoodItem, Order, OrderItem, Review
+from .order_status import IllegalTransition, StatusConflict, transition
+from .search import InvertedIndexSearchBackend
+from .serializers import CartItemSerializer, FoodItemSerializer, OrderItemSerializer, ReviewSerializer
+from .services import add_to_cart, place_order, rebuild_ratings
+
+
+class FoodsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice', password='secret', email='alice@example.com')
+        cls.category = Category.objects.create(name='Burgers')
+        cls.burger = FoodItem.objects.create(category=cls.category, name='Beef Burger', price='8.50')
+        cls.fries = FoodItem.objects.create(category=cls.category, name='Fries', price='3.00')
+
+    def setUp(self):
+        self.client = APIClient()
+        get_menu_cache().clear()
+
+    def create_order(self, customer=None, lines=2):
+        order = Order.objects.create(customer=customer or self.user, total_price='0.00')
+        for i in range(lines):
+            OrderItem.objects.create(order=order, food_item=self.burger if i % 2 else self.fries, quantity=i + 1)
+        return order
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    # Asserts that `request` issues the same number of queries no matter how many orders exist
+    def assertConstantQueries(self, request, grow, times=5):
+        before = self.count_queries(request)
+        for _ in range(times):
+            grow()
+        after = self.count_queries(request)
+        self.assertEqual(before, after, 'query count grew from %d to %d' % (before, after))
+
+
+class OrderQueryCountTests(FoodsTestCase):
+    def test_all_orders_constant_queries(self):
+        self.create_order()
+        other = User.objects.create_user(username='bob', password='secret')
+        self.assertConstantQueries(
+            lambda: self.client.get('/api/admin/orders/'),
+            lambda: self.create_order(customer=other, lines=3),
+        )
+
+    def test_customer_order_history_constant_queries(self):
+        self.client.force_authenticate(self.user)
+        self.create_order()
+        self.assertConstantQueries(
+            lambda: self.client.get('/api/orders/'),
+            lambda: self.create_order(lines=4),
+        )
+
+    def test_order_detail_constant_queries(self):
+        small = self.create_order(lines=1)
+        large = self.create_order(lines=10)
+        self.client.get('/api/orders/%d/' % small.pk)  # Warm the cached menu Last-Modified
+        self.assertEqual(
+            self.count_queries(lambda: self.client.get('/api/orders/%d/' % small.pk)),
+            self.count_queries(lambda: self.client.get('/api/orders/%d/' % large.pk)),
+        )
+
+    def test_order_payload_unchanged(self):
+        order = self.create_order(lines=2)
+        response = self.client.get('/api/admin/orders/')
+        self.assertEqual(response.status_code, 200)
+        result = response.data['results'][0]
+        self.assertEqual(result['id'], order.pk)
+        self.assertEqual(result['customer'], 'alice')
+        self.assertEqual(len(result['items']), 2)
+        self.assertEqual(result['items'][0]['food_item']['category']['slug'], 'burgers')
+
+
+class OrderPaginationTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = [self.create_order(lines=1) for _ in range(7)]
+        # Share a timestamp between several orders so ties are broken by id
+        Order.objects.filter(pk__in=[o.pk for o in self.orders[2:5]]).update(created_at=self.orders[2].created_at)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_cover_every_order_once_newest_first(self):
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/admin/orders/?page_size=3'), expected)
+
+    def test_previous_cursor_returns_prior_page(self):
+        first = self.client.get('/api/admin/orders/?page_size=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [o['id'] for o in back.data['results']],
+            [o['id'] for o in first.data['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_customer_history_is_paginated(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/orders/?page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(self.walk('/api/orders/?page_size=5')), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/admin/orders/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class PlaceOrderTests(FoodsTestCase):
+    def test_query_count_independent_of_line_count(self):
+        extra = [FoodItem.objects.create(category=self.category, name='Item %d' % i, price='1.25') for i in range(20)]
+        one = self.count_queries(lambda: place_order(self.user, [(self.burger.pk, 1)]))
+        many = self.count_queries(lambda: place_order(self.user, [(item.pk, 2) for item in extra]))
+        self.assertEqual(one, many)
+
+    def test_total_price_and_lines(self):
+        order = place_order(self.user, [(self.burger.pk, 2), (self.fries.pk, 3)])
+        self.assertEqual(str(order.total_price), '26.00')
+        self.assertEqual(sorted(order.items.values_list('food_item_id', 'quantity')),
+                         sorted([(self.burger.pk, 2), (self.fries.pk, 3)]))
+
+    def test_unknown_food_item_creates_nothing(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/orders/', {'items': [{'food_item': self.burger.pk}, {'food_item': 999999}]}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Order.objects.exists())
+
+    def test_malformed_items_rejected(self):
+        self.client.force_authenticate(self.user)
+        for items in (
+            [{'quantity': 2}],
+            [{'food_item': 'abc', 'quantity': 1}],
+            [{'food_item': self.burger.pk, 'quantity': -1}],
+            [{'food_item': self.burger.pk, 'quantity': 0}],
+            [{'food_item': self.burger.pk, 'quantity': 'two'}],
+            [{'food_item': self.burger.pk, 'quantity': CartItem.MAX_QUANTITY + 1}],
+            [{'food_item': self.burger.pk, 'quantity': 10 ** 12}],
+        ):
+            response = self.client.post('/api/orders/', {'items': items}, format='json')
+            self.assertEqual(response.status_code, 400, items)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_converts_cart(self):
+        CartItem.objects.create(user=self.user, food_item=self.burger, quantity=2)
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=1)
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/checkout/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_price'], '20.00')
+        self.assertEqual(len(response.data['items']), 2)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_checkout_empty_cart(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/checkout/')
+        self.assertEqual(response.status_code, 400)
+
+
+class CartTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        FoodItem.objects.filter(pk=self.burger.pk).update(pre_discount_price='10.00')
+
+    def test_summary_totals_come_from_one_query(self):
+        CartItem.objects.create(user=self.user, food_item=self.burger, quantity=2)
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=3)
+        other = User.objects.create_user(username='bob', password='secret')
+        CartItem.objects.create(user=other, food_item=self.burger, quantity=7)
+
+        with CaptureQueriesContext(connection) as ctx:
+            summary = self.client.get('/api/cart/').json()
+        self.assertEqual(len([q for q in ctx.captured_queries if 'foods_cartitem' in q['sql']]), 1)
+        self.assertEqual([(i['food_item']['name'], i['subtotal'], i['savings']) for i in summary['items']], [
+            ('Beef Burger', '17.00', '3.00'), ('Fries', '9.00', '0.00'),
+        ])
+        self.assertEqual((summary['item_count'], summary['total'], summary['savings']), (5, '26.00', '3.00'))
+
+    def test_empty_cart(self):
+        self.assertEqual(self.client.get('/api/cart/').json(), {'items': [], 'item_count': 0, 'total': '0.00', 'savings': '0.00'})
+
+    def test_adding_an_item_again_increments_the_same_line(self):
+        first = self.client.post('/api/cart/', {'food_item_id': self.burger.pk, 'quantity': 2}, format='json')
+        second = self.client.post('/api/cart/', {'food_item_id': self.burger.pk, 'quantity': 3}, format='json')
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(second.data['quantity'], 5)
+        self.assertEqual(CartItem.objects.filter(user=self.user).count(), 1)
+
+    def test_add_to_cart_merges_lines_in_one_statement(self):
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=1)
+        with CaptureQueriesContext(connection) as ctx:
+            ids = add_to_cart(self.user, [(self.burger.pk, 1), (self.fries.pk, 2), (self.burger.pk, 4)])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        quantities = dict(CartItem.objects.filter(pk__in=ids.values()).values_list('food_item', 'quantity'))
+        self.assertEqual(quantities, {self.burger.pk: 5, self.fries.pk: 3})
+
+    def test_increments_stop_at_the_maximum_quantity(self):
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=CartItem.MAX_QUANTITY - 1)
+        add_to_cart(self.user, [(self.fries.pk, 5), (self.burger.pk, CartItem.MAX_QUANTITY), (self.burger.pk, 2 ** 40)])
+        self.assertEqual(set(CartItem.objects.values_list('quantity', flat=True)), {CartItem.MAX_QUANTITY})
+        response = self.patch(*[{'op': 'add', 'food_item_id': self.fries.pk, 'quantity': CartItem.MAX_QUANTITY}] * 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['item_count'], 2 * CartItem.MAX_QUANTITY)
+        self.assertEqual(self.patch({'op': 'set', 'food_item_id': self.fries.pk, 'quantity': 2 ** 40}).status_code, 400)
+
+    def test_set_then_add_stops_at_the_maximum_quantity(self):
+        response = self.patch(
+            {'op': 'set', 'food_item_id': self.burger.pk, 'quantity': CartItem.MAX_QUANTITY},
+            {'op': 'add', 'food_item_id': self.burger.pk, 'quantity': CartItem.MAX_QUANTITY},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CartItem.objects.get(user=self.user, food_item=self.burger).quantity, CartItem.MAX_QUANTITY)
+
+    def test_invalid_additions_are_rejected(self):
+        for quantity in (0, -1, 'two', None, CartItem.MAX_QUANTITY + 1, 2 ** 40):
+            response = self.client.post('/api/cart/', {'food_item_id': self.burger.pk, 'quantity': quantity}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/cart/', {'food_item_id': 999, 'quantity': 1}, format='json').status_code, 404)
+        self.assertFalse(CartItem.objects.exists())
+
+    def patch(self, *operations):
+        return self.client.patch('/api/cart/', {'operations': list(operations)}, format='json')
+
+    def test_batch_operations_apply_in_order_and_return_the_summary(self):
+        salad = FoodItem.objects.create(category=self.category, name='Salad', price='5.00')
+        CartItem.objects.create(user=self.user, food_item=self.burger, quantity=1)
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=4)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.patch(
+                {'op': 'add', 'food_item_id': self.burger.pk, 'quantity': 2},
+                {'op': 'remove', 'food_item_id': self.fries.pk},
+                {'op': 'set', 'food_item_id': salad.pk, 'quantity': 1},
+                {'op': 'add', 'food_item_id': salad.pk, 'quantity': 2},
+                {'op': 'add', 'food_item_id': self.burger.pk},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(i['food_item']['name'], i['quantity']) for i in response.data['items']], [
+            ('Beef Burger', 4), ('Salad', 3),
+        ])
+        self.assertEqual(response.data['total'], '49.00')
+        # Lookup, delete, upsert, increment and summary, regardless of batch size
+        self.assertEqual(len([q for q in ctx.captured_queries if 'foods_' in q['sql']]), 5)
+
+    def test_set_to_zero_removes_the_line(self):
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=4)
+        self.assertEqual(self.patch({'op': 'set', 'food_item_id': self.fries.pk, 'quantity': 0}).data['items'], [])
+
+    def test_invalid_batches_change_nothing(self):
+        CartItem.objects.create(user=self.user, food_item=self.fries, quantity=4)
+        for operations in (
+            [],
+            [{'op': 'add', 'food_item_id': self.burger.pk, 'quantity': 0}],
+            [{'op': 'set', 'food_item_id': self.burger.pk}],
+            [{'op': 'replace', 'food_item_id': self.burger.pk, 'quantity': 1}],
+        ):
+            self.assertEqual(self.patch(*operations).status_code, 400, operations)
+        for body in ([{'op': 'remove', 'food_item_id': self.fries.pk}], 'operations'):
+            self.assertEqual(self.client.patch('/api/cart/', body, format='json').status_code, 400, body)
+        response = self.patch({'op': 'remove', 'food_item_id': self.fries.pk}, {'op': 'add', 'food_item_id': 999})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(list(CartItem.objects.values_list('quantity', flat=True)), [4])
+
+
+class OrderStatusTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        self.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+
+    def test_transition_writes_only_the_status_and_appends_history(self):
+        before = Order.objects.get(pk=self.order.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            event = transition(self.order.pk, 'Processing', actor=self.admin, source='admin')
+        update = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE'))
+        self.assertIn('"status" = ', update)
+        self.assertNotIn('total_price', update)
+        self.assertIn("\"status\" = 'Pending'", update.split('WHERE')[1])
+
+        self.assertEqual((event.from_status, event.to_status, event.actor, event.source), ('Pending', 'Processing', self.admin, 'admin'))
+        after = Order.objects.get(pk=self.order.pk)
+        self.assertEqual(after.status, 'Processing')
+        self.assertGreater(after.updated_at, before.updated_at)
+
+        self.assertIsNone(transition(self.order.pk, 'Processing'))
+        self.assertEqual(self.order.status_events.count(), 1)
+
+    def test_illegal_and_unexpected_transitions_are_refused(self):
+        transition(self.order.pk, 'Cancelled')
+        with self.assertRaises(IllegalTransition):
+            transition(self.order.pk, 'Paid')
+        with self.assertRaises(StatusConflict):
+            transition(self.order.pk, 'Delivered', expected='Processing')
+        with self.assertRaises(Order.DoesNotExist):
+            transition(0, 'Paid')
+
+    def test_a_concurrent_change_is_revalidated_not_overwritten(self):
+        # Another writer moved the order to Processing between our read and our UPDATE
+        Order.objects.filter(pk=self.order.pk).update(status='Processing')
+        with mock.patch('foods.order_status.current_status', side_effect=['Pending', 'Processing']):
+            self.assertIsNone(transition(self.order.pk, 'Processing'))
+        with mock.patch('foods.order_status.current_status', side_effect=['Pending', 'Processing']):
+            event = transition(self.order.pk, 'Cancelled')
+        self.assertEqual((event.from_status, event.to_status), ('Processing', 'Cancelled'))
+
+    def test_admin_updates(self):
+        self.client.force_authenticate(self.admin)
+        url = f'/api/admin/orders/{self.order.pk}/'
+        response = self.client.put(url, {'status': 'Paid', 'estimated_delivery_time': '2030-01-01T12:00:00Z'}, format='json')
+        self.assertEqual(response.data['status'], 'Paid')
+        self.assertTrue(response.data['estimated_delivery_time'].startswith('2030-01-01T12:00:00'))
+        self.assertEqual(self.client.put(url, {'status': 'Pending'}, format='json').status_code, 409)
+        self.assertEqual(self.client.put(url, {'estimated_delivery_time': '2031-01-01T12:00:00Z'}, format='json').status_code, 200)
+        self.assertEqual(self.order.status_events.count(), 1)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b'0')) + 1).encode()
+        return int(self.data[key])
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class MenuCacheTests(FoodsTestCase):
+    def test_cached_listing_skips_database(self):
+        first = self.client.get('/api/food-items/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.count_queries(lambda: self.client.get('/api/food-items/')), 0)
+        self.assertEqual(self.client.get('/api/food-items/').content, first.content)
+
+    def test_menu_changes_invalidate(self):
+        self.client.get('/api/specials/')
+        self.client.get('/api/categories/')
+        FoodItem.objects.create(category=self.category, name='Special Pizza', price='12.00', is_special=True)
+        specials = self.client.get('/api/specials/').json()
+        self.assertEqual([item['name'] for item in specials], ['Special Pizza'])
+
+        self.category.name = 'Grill'
+        self.category.save()
+        self.assertEqual(self.client.get('/api/categories/').json()[0]['name'], 'Grill')
+
+        self.fries.delete()
+        names = [item['name'] for item in self.client.get('/api/categories/burgers/food-items/').json()]
+        self.assertNotIn('Fries', names)
+
+    def test_search_and_category_keys_are_distinct(self):
+        Category.objects.create(name='Drinks')
+        self.assertEqual(self.client.get('/api/food-items/?search=FRIES').json()['count'], 1)
+        self.assertEqual(self.client.get('/api/food-items/?search=burger').json()['count'], 1)
+        self.assertEqual(len(self.client.get('/api/food-items/?category=drinks').json()), 0)
+        self.assertEqual(len(self.client.get('/api/food-items/').json()), 2)
+
+    def test_unknown_category_not_cached(self):
+        self.assertEqual(self.client.get('/api/categories/drinks/food-items/').status_code, 404)
+        Category.objects.create(name='Drinks')
+        self.assertEqual(self.client.get('/api/categories/drinks/food-items/').status_code, 200)
+
+    def test_redis_backend(self):
+        cache = MenuCache(RedisMenuBackend(client=FakeRedis()), timeout=60)
+        builds = []
+        build = lambda: builds.append(1) or b'[]'
+        self.assertEqual(cache.get_or_build(('specials',), build), b'[]')
+        self.assertEqual(cache.get_or_build(('specials',), build), b'[]')
+        self.assertEqual(len(builds), 1)
+        cache.bump()
+        cache.get_or_build(('specials',), build)
+        self.assertEqual(len(builds), 2)
+
+    def test_etag_is_hash_of_body(self):
+        # Two processes with their own versions agree on the tag exactly when they serve the same bytes
+        first, second = MenuCache(LocMemMenuBackend()), MenuCache(LocMemMenuBackend())
+        second.bump()
+        etag, body = first.get_or_render(('specials',), lambda: b'[1]')
+        self.assertEqual(second.get_or_render(('specials',), lambda: b'[1]'), (etag, body))
+        self.assertEqual(first.get_or_render(('specials',), lambda: b'[2]'), (etag, b'[1]'))
+        first.bump()
+        self.assertNotEqual(first.get_or_render(('specials',), lambda: b'[2]')[0], etag)
+
+
+class ConditionalGetTests(FoodsTestCase):
+    def test_menu_etag_returns_not_modified(self):
+        first = self.client.get('/api/food-items/')
+        self.assertTrue(first['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', first)
+        response = self.client.get('/api/food-items/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_menu_etag_changes_with_menu_and_query(self):
+        etag = self.client.get('/api/specials/')['ETag']
+        self.assertNotEqual(self.client.get('/api/food-items/')['ETag'], etag)
+        self.burger.is_special = True
+        self.burger.save()
+        response = self.client.get('/api/specials/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_menu_if_modified_since(self):
+        last_modified = self.client.get('/api/categories/')['Last-Modified']
+        response = self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_review_changes_last_modified(self):
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        FoodItem.objects.update(updated_at=an_hour_ago)
+        Category.objects.update(updated_at=an_hour_ago)
+        last_modified = self.client.get('/api/food-items/')['Last-Modified']
+
+        self.client.force_authenticate(self.user)
+        self.client.post('/api/food-items/%d/reviews/' % self.burger.pk, {'rating': 5, 'comment': 'ok'})
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/food-items/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(1, [item['rating_count'] for item in response.json()])
+
+    def test_order_not_modified_skips_serialization(self):
+        order = self.create_order(lines=3)
+        etag = self.client.get('/api/orders/%d/' % order.pk)['ETag']
+        queries = self.count_queries(
+            lambda: self.assertEqual(
+                self.client.get('/api/orders/%d/' % order.pk, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        )
+        self.assertEqual(queries, 1)
+
+    def test_order_etag_changes_on_update(self):
+        order = self.create_order()
+        etag = self.client.get('/api/orders/%d/' % order.pk)['ETag']
+        order.status = 'Processing'
+        order.save()
+        response = self.client.get('/api/orders/%d/' % order.pk, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'Processing')
+
+    def test_missing_order(self):
+        self.assertEqual(self.client.get('/api/orders/999999/').status_code, 404)
+
+
+class SearchTests(FoodsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        pizza = Category.objects.create(name='Pizza')
+        FoodItem.objects.create(category=pizza, name='Margherita Pizza', price='9.00',
+                                description='Tomato, mozzarella and basil')
+        FoodItem.objects.create(category=pizza, name='Pepperoni Pizza', price='10.00',
+                                description='Spicy pepperoni with mozzarella')
+        FoodItem.objects.create(category=cls.category, name='Chicken Burger', price='7.50',
+                                description='Grilled chicken, served with a side of pizza sauce')
+
+    def search(self, query, category_slug=None):
+        return [FoodItem.objects.get(pk=pk).name
+                for pk in InvertedIndexSearchBackend().search(query, category_slug=category_slug)]
+
+    def test_name_matches_outrank_description_matches(self):
+        self.assertEqual(self.search('pizza')[-1], 'Chicken Burger')
+        self.assertEqual(set(self.search('pizza')[:2]), {'Margherita Pizza', 'Pepperoni Pizza'})
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search('pepp mozz'), ['Pepperoni Pizza'])
+        self.assertEqual(self.search('burg'), ['Beef Burger', 'Chicken Burger'])
+
+    def test_typo_tolerance(self):
+        self.assertEqual(self.search('margerita'), ['Margherita Pizza'])
+        self.assertEqual(self.search('chikcen'), ['Chicken Burger'])
+        self.assertEqual(self.search('xyzzy'), [])
+
+    def test_category_filter(self):
+        self.assertEqual(self.search('pizza', category_slug='burgers'), ['Chicken Burger'])
+
+    def test_index_follows_menu_changes(self):
+        backend = InvertedIndexSearchBackend()
+        self.assertEqual(backend.search('calzone'), [])
+        item = FoodItem.objects.create(category=self.category, name='Calzone', price='8.00')
+        self.assertEqual(backend.search('calzone'), [item.pk])
+
+    def test_rebuild_swaps_in_a_new_index(self):
+        # A search that already holds the old index keeps a complete snapshot while a rebuild runs
+        backend = InvertedIndexSearchBackend()
+        old = backend._ensure_index()
+        FoodItem.objects.create(category=self.category, name='Calzone', price='8.00')
+        new = backend._ensure_index()
+        self.assertIsNot(new, old)
+        self.assertNotIn('calzone', old.postings)
+        self.assertNotIn('calzone', old.vocabulary)
+        self.assertIn('calzone', new.idf)
+
+    def test_endpoint_is_ranked_and_paginated(self):
+        response = self.client.get('/api/food-items/?search=pizza&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIn('Pizza', data['results'][0]['name'])
+        last = self.client.get(data['next']).json()
+        self.assertEqual([item['name'] for item in last['results']], ['Chicken Burger'])
+
+
+class RatingAggregateTests(FoodsTestCase):
+    def review(self, username, food_item, rating):
+        user = User.objects.create_user(username=username, password='secret')
+        self.client.force_authenticate(user)
+        return self.client.post('/api/food-items/%d/reviews/' % food_item.pk, {'rating': rating, 'comment': 'ok'})
+
+    def test_reviews_update_aggregates(self):
+        self.assertEqual(self.review('bob', self.burger, 5).status_code, 201)
+        self.assertEqual(self.review('carol', self.burger, 2).status_code, 201)
+        self.burger.refresh_from_db()
+        self.assertEqual((self.burger.rating_count, self.burger.rating_sum), (2, 7))
+        self.assertAlmostEqual(self.burger.rating_avg, 3.5)
+
+    def test_serializer_exposes_ratings_without_queries(self):
+        self.review('bob', self.fries, 4)
+        self.client.force_authenticate(None)
+        food_items = {item['name']: item for item in self.client.get('/api/food-items/').json()}
+        self.assertEqual(food_items['Fries']['rating_count'], 1)
+        self.assertEqual(food_items['Fries']['average_rating'], 4.0)
+        self.assertEqual(food_items['Beef Burger']['average_rating'], 0.0)
+        get_menu_cache().clear()
+        self.assertEqual(self.count_queries(lambda: self.client.get('/api/specials/')), 3)
+
+    def test_sort_by_rating(self):
+        self.review('bob', self.fries, 5)
+        self.review('carol', self.burger, 3)
+        self.client.force_authenticate(None)
+        names = [item['name'] for item in self.client.get('/api/food-items/?sort=rating').json()]
+        self.assertEqual(names, ['Fries', 'Beef Burger'])
+        names = [item['name'] for item in self.client.get('/api/categories/burgers/food-items/?sort=price').json()]
+        self.assertEqual(names, ['Fries', 'Beef Burger'])
+
+    def test_rebuild_ratings(self):
+        bob = User.objects.create_user(username='bob', password='secret')
+        Review.objects.create(customer=bob, food_item=self.burger, rating=4)
+        Review.objects.create(customer=self.user, food_item=self.burger, rating=1)
+        FoodItem.objects.filter(pk=self.fries.pk).update(rating_count=9, rating_sum=9, rating_avg=1)
+        rebuild_ratings()
+        self.burger.refresh_from_db()
+        self.fries.refresh_from_db()
+        self.assertEqual((self.burger.rating_count, self.burger.rating_sum, self.burger.rating_avg), (2, 5, 2.5))
+        self.assertEqual((self.fries.rating_count, self.fries.rating_sum, self.fries.rating_avg), (0, 0, 0))
+
+
+class ReviewListingTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            user = User.objects.create_user(username='reviewer%d' % i, password='secret')
+            Review.objects.create(customer=user, food_item=self.burger, rating=i + 1)
+
+    def test_newest_first_and_paginated(self):
+        response = self.client.get('/api/food-items/%d/reviews/?page_size=2' % self.burger.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['customer'] for r in response.data['results']], ['reviewer4', 'reviewer3'])
+        self.assertEqual(response.data['results'][0]['food_item'], 'Beef Burger')
+        rest = self.client.get(response.data['next'])
+        self.assertEqual(len(rest.data['results']), 2)
+
+    def test_constant_queries(self):
+        url = '/api/food-items/%d/reviews/' % self.burger.pk
+        self.assertConstantQueries(
+            lambda: self.client.get(url),
+            lambda: Review.objects.create(
+                customer=User.objects.create_user(username='extra%d' % Review.objects.count(), password='x'),
+                food_item=self.burger, rating=3),
+        )
+
+    def test_second_review_rejected_without_double_counting(self):
+        self.client.force_authenticate(self.user)
+        url = '/api/food-items/%d/reviews/' % self.fries.pk
+        self.assertEqual(self.client.post(url, {'rating': 4}).status_code, 201)
+        response = self.client.post(url, {'rating': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'You have already reviewed this item')
+        self.fries.refresh_from_db()
+        self.assertEqual((self.fries.rating_count, self.fries.rating_sum), (1, 4))
+
+
+class ConnectionSettingsTests(TestCase):
+    def test_modes(self):
+        self.assertEqual(connection_settings('per-request'), {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}})
+        persistent = connection_settings('persistent', conn_max_age=60, transaction_pooler=True)
+        self.assertEqual((persistent['CONN_MAX_AGE'], persistent['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertTrue(persistent['DISABLE_SERVER_SIDE_CURSORS'])
+        with self.assertRaises(ImproperlyConfigured):
+            connection_settings('forever')
+
+    def test_pool_mode(self):
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            with self.assertRaises(ImproperlyConfigured):
+                connection_settings('pool')
+            return
+        config = connection_settings('pool', pool_max_size=4, transaction_pooler=True)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 4)
+        self.assertIsNone(config['OPTIONS']['prepare_threshold'])
+
+    def test_health_check(self):
+        response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+        error = OperationalError('could not connect to server at "db.internal" (user "foodstore")')
+        with mock.patch('django.db.backends.utils.CursorWrapper.execute', side_effect=error):
+            with self.assertLogs('foodstore.health', 'ERROR'):
+                response = self.client.get('/api/health/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'unavailable'})
+
+
+# Needs two databases: python manage.py test foods.tests.ReplicaRoutingTests --settings=foodstore.settings_replicas
+# Nothing replicates between them, so each response shows which database served it.
+@skipUnless('replica' in settings.DATABASES, "needs the 'replica' database from foodstore.settings_replicas")
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret')
+        self.burger = FoodItem.objects.create(category=Category.objects.create(name='Burgers'), name='Burger', price='8.50')
+        Category.objects.using('replica').create(name='Replica only')
+        self.forget_pins()
+
+    def forget_pins(self):
+        caches['default'].clear()
+        get_menu_cache().clear()
+
+    def category_names(self):
+        return [category['name'] for category in APIClient().get('/api/categories/').json()]
+
+    def test_menu_reads_go_to_the_replica(self):
+        self.assertEqual(self.category_names(), ['Replica only'])
+
+    def test_menu_changes_pin_menu_reads_to_the_primary(self):
+        Category.objects.create(name='Sides')
+        self.assertEqual(self.category_names(), ['Burgers', 'Sides'])
+        self.forget_pins()
+        self.assertEqual(self.category_names(), ['Replica only'])
+
+    def test_a_users_writes_pin_their_reads_to_the_primary(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/orders/', {'items': [{'food_item': self.burger.pk, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.using('replica').count(), 0)
+
+        self.assertEqual(len(client.get('/api/admin/orders/').data['results']), 1)
+        self.assertEqual(len(APIClient().get('/api/admin/orders/').data['results']), 0)
+
+    def test_writes_always_go_to_the_primary(self):
+        category = Category.objects.using('replica').get(name='Replica only')
+        with read_from_replica():
+            self.assertEqual(Category.objects.get(pk=category.pk).name, 'Replica only')
+            category.name = 'Renamed'
+            category.save()
+        self.assertEqual(Category.objects.using('replica').get(pk=category.pk).name, 'Replica only')
+        self.assertTrue(Category.objects.filter(name='Renamed').exists())
+
+
+class FoodItemCreateTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='secret', is_staff=True))
+
+    def test_creates_the_item_in_the_given_category(self):
+        response = self.client.post('/api/food-items/create/', {
+            'name': 'Cheese Burger', 'price': '9.00', 'category': self.category.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['category']['id'], self.category.pk)
+        self.assertEqual(FoodItem.objects.get(name='Cheese Burger').category, self.category)
+
+    def test_missing_or_unknown_category_is_rejected(self):
+        for category in (None, 'burgers', 999):
+            data = {'name': 'Cheese Burger', 'price': '9.00'}
+            if category is not None:
+                data['category'] = category
+            response = self.client.post('/api/food-items/create/', data, format='json')
+            self.assertEqual(response.status_code, 400, category)
+            self.assertIn('category', response.data)
+        self.assertFalse(FoodItem.objects.filter(name='Cheese Burger').exists())
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/food-items/create/', {'name': 'X', 'price': '1.00', 'category': self.category.pk})
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(PROFILING_ENABLED=True)
+class ProfilingMiddlewareTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/admin/orders/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_per_route_report_is_admin_only(self):
+        order = self.create_order()
+        self.client.get('/api/orders/%d/' % order.pk)
+        self.client.get('/api/orders/%d/' % order.pk)
+        self.assertEqual(self.client.get('/api/admin/profiling/').status_code, 403)
+
+        admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        self.client.force_authenticate(admin)
+        report = self.client.get('/api/admin/profiling/').json()
+        stats = report['GET /api/orders/<int:pk>/']
+        self.assertEqual(stats['count'], 2)
+        self.assertGreater(stats['avg_queries'], 0)
+        self.assertEqual(sum(stats['histogram_ms'].values()), 2)
+
+    @override_settings(PROFILING_QUERY_BUDGET=2)
+    def test_over_budget_requests_log_repeated_statements(self):
+        # The customer listing still lazy-loads each customer's user: exactly what the budget log should surface
+        for name in ('bob', 'carol', 'dave'):
+            Customer.objects.create(user=User.objects.create_user(username=name))
+        with self.assertLogs('foodstore.profiling', level='WARNING') as logs:
+            self.client.get('/customer/list/')
+        self.assertIn('GET /customer/list/', logs.output[0])
+        self.assertIn('auth_user', logs.output[0])
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            fingerprint('SELECT * FROM t  WHERE id IN (%s) LIMIT 5'),
+        )
+
+
+class AsyncViewTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_order()
+        CartItem.objects.create(user=self.user, food_item=self.burger, quantity=2)
+        self.token = Token.objects.create(user=self.user)
+
+    def test_same_payloads_and_validators_as_sync_views(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        for sync_path, async_path in [
+            ('/api/categories/', '/api/async/categories/'),
+            ('/api/food-items/?sort=-price', '/api/async/food-items/?sort=-price'),
+            ('/api/specials/', '/api/async/specials/'),
+            ('/api/orders/%d/' % self.order.pk, '/api/async/orders/%d/' % self.order.pk),
+            ('/api/cart/', '/api/async/cart/'),
+        ]:
+            sync_response = self.client.get(sync_path, **auth)
+            async_response = self.client.get(async_path, **auth)
+            self.assertEqual(async_response.status_code, 200, async_path)
+            self.assertEqual(async_response.content, sync_response.content, async_path)
+            self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'), async_path)
+
+    def test_conditional_get(self):
+        etag = self.client.get('/api/async/food-items/')['ETag']
+        self.assertEqual(self.client.get('/api/async/food-items/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        etag = self.client.get('/api/async/orders/%d/' % self.order.pk, **auth)['ETag']
+        response = self.client.get('/api/async/orders/%d/' % self.order.pk, HTTP_IF_NONE_MATCH=etag, **auth)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cart_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/async/cart/').status_code, 403)
+        self.assertEqual(self.client.get('/api/async/cart/', HTTP_AUTHORIZATION='Token nope').status_code, 401)
+
+    def test_missing_order(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.assertEqual(self.client.get('/api/async/orders/999999/', **auth).status_code, 404)
+
+    def test_orders_are_only_visible_to_their_customer(self):
+        path = '/api/async/orders/%d/' % self.order.pk
+        self.assertEqual(self.client.get(path).status_code, 403)
+        other = Token.objects.create(user=User.objects.create_user(username='mallory'))
+        self.assertEqual(self.client.get(path, HTTP_AUTHORIZATION=f'Token {other.key}').status_code, 404)
+
+    def test_search_falls_back_to_sync_search(self):
+        response = self.client.get('/api/async/food-items/?search=burger')
+        self.assertEqual([item['name'] for item in response.json()['results']], ['Beef Burger'])
+
+
+class FastSerializerTests(FoodsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        drinks = Category.objects.create(name='Drinks é ☃')
+        FoodItem.objects.create(
+            category=drinks, name='Lassi     "quoted" \\ \u2028', description=None, price='0.50',
+            pre_discount_price='1234.05', image='food_images/burger.png', is_special=True,
+            rating_count=3, rating_sum=2, rating_avg=2 / 3,
+        )
+        FoodItem.objects.create(category=drinks, name='Tea', description='', price='9999.99', image='')
+        FoodItem.objects.filter(pk=cls.fries.pk).update(rating_count=1, rating_sum=5, rating_avg=5)
+        FoodItem.objects.filter(name__startswith='Lassi').update(image_variants={
+            'source': 'food_images/burger.png', 'hash': 'ab' * 16, 'widths': [160, 320], 'formats': ['avif', 'webp'],
+        })
+
+    def assertSameBytes(self, slow, fast):
+        self.assertEqual(CompactJSONRenderer().render(fast), JSONRenderer().render(slow))
+
+    def test_food_items(self):
+        food_items = FoodItem.objects.order_by('pk')
+        self.assertSameBytes(FoodItemSerializer(food_items, many=True).data, food_item_data(food_items))
+        self.assertEqual(self.count_queries(lambda: food_item_data(food_items)), 1)
+
+    def test_cart_items(self):
+        for food_item in FoodItem.objects.all():
+            CartItem.objects.create(user=self.user, food_item=food_item, quantity=food_item.pk)
+        cart_items = CartItem.objects.order_by('pk')
+        self.assertSameBytes(CartItemSerializer(cart_items, many=True).data, cart_item_data(cart_items))
+        self.assertEqual(self.count_queries(lambda: cart_item_data(cart_items)), 1)
+
+    def test_order_items(self):
+        order = self.create_order(lines=4)
+        order_items = OrderItem.objects.filter(order=order).order_by('pk')
+        self.assertSameBytes(OrderItemSerializer(order_items, many=True).data, order_item_data(order_items))
+
+    def test_empty_and_indented_output(self):
+        self.assertEqual(CompactJSONRenderer().render([]), b'[]')
+        self.assertEqual(CompactJSONRenderer().render(None), b'')
+        data = food_item_data(FoodItem.objects.order_by('pk'))
+        self.assertEqual(
+            CompactJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_unsupported_serializer_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            RowPlan(ReviewSerializer)
+
+
+def png_upload(name='dish.png', size=(400, 200), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(IMAGE_VARIANTS={'WIDTHS': (160, 320, 640), 'FORMATS': ('webp', 'jpeg'), 'EAGER': True})
+class ImageVariantTests(FoodsTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self, food_item, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            food_item.image = png_upload(**kwargs)
+            food_item.save()
+        food_item.refresh_from_db()
+        return food_item.image_variants
+
+    def test_upload_renders_variants_capped_at_the_original_width(self):
+        manifest = self.upload(self.burger)
+        self.assertEqual(manifest['widths'], [160, 320, 400])
+        self.assertEqual(manifest['formats'], ['webp', 'jpeg'])
+        for width in manifest['widths']:
+            with default_storage.open(f"food_images/variants/{manifest['hash']}/{width}.webp") as variant:
+                self.assertEqual(Image.open(variant).size, (width, width // 2))
+
+        item = next(i for i in self.client.get('/api/food-items/').json() if i['id'] == self.burger.pk)
+        base = f"/api/images/{manifest['hash']}"
+        self.assertEqual(item['image_srcset']['webp'], f"{base}/160.webp 160w, {base}/320.webp 320w, {base}/400.webp 400w")
+        self.assertIsNone(next(i for i in self.client.get('/api/food-items/').json() if i['id'] == self.fries.pk)['image_srcset'])
+
+    def test_variants_are_served_immutable_and_regenerated_on_demand(self):
+        manifest = self.upload(self.burger)
+        path = f"food_images/variants/{manifest['hash']}/160.jpeg"
+        default_storage.delete(path)
+
+        response = self.client.get(f"/api/images/{manifest['hash']}/160.jpeg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).size, (160, 80))
+        self.assertTrue(default_storage.exists(path))
+
+        for url in (f"{manifest['hash']}/161.jpeg", f"{manifest['hash']}/160.gif", f"{'0' * 32}/160.webp"):
+            self.assertEqual(self.client.get(f"/api/images/{url}").status_code, 404)
+
+    def test_replacing_or_clearing_the_image_updates_the_manifest(self):
+        first = self.upload(self.burger)
+        second = self.upload(self.burger, color='blue')
+        self.assertNotEqual(first['hash'], second['hash'])
+        self.assertEqual(second['source'], self.burger.image.name)
+
+        self.burger.image = None
+        self.burger.save()
+        self.burger.refresh_from_db()
+        self.assertIsNone(self.burger.image_variants)
+
+    def test_backfill_command_renders_in_the_process_pool(self):
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        FoodItem.objects.filter(pk=self.burger.pk).update(
+            image=default_storage.save('food_images/a.png', png_upload()), updated_at=an_hour_ago,
+        )
+        with override_settings(IMAGE_VARIANTS={'WIDTHS': (100,), 'FORMATS': ('webp',), 'WORKERS': 1}):
+            call_command('generate_image_variants', stdout=io.StringIO())
+        burger = FoodItem.objects.get(pk=self.burger.pk)
+        self.assertTrue(default_storage.exists(f"food_images/variants/{burger.image_variants['hash']}/100.webp"))
+        # The new srcset reaches If-Modified-Since clients
+        self.assertGreater(burger.updated_at, an_hour_ago)
+
+
+class BenchmarkTests(TestCase):
+    def test_every_scenario_runs_against_a_seeded_database(self):
+        seed(categories=2, food_items=10, users=3, orders=6, items_per_order=2, reviews=8, cart_items=2)
+        scenarios = build_scenarios()
+        results = BenchmarkRunner(iterations=2, warmup=0).run(scenarios)
+        self.assertEqual(list(results), [scenario.name for scenario in scenarios])
+        self.assertEqual(server_errors(results), [])
+        self.assertEqual(results['food-item-create']['status'], 201)
+        # The redelivered IPN is answered from the lookup, without settling anything
+        self.assertLess(results['payment-ipn']['queries'], results['payment-fail']['queries'])
+        self.assertEqual(results['order-detail']['status'], 200)
+        self.assertGreater(results['order-detail']['queries'], 0)
+        # Writes are rolled back, so the seeded cart is still there afterwards
+        self.assertEqual(CartItem.objects.filter(user__username='bench0').count(), 2)
+
+    def test_serializer_microbenchmark_checks_output(self):
+        seed(categories=2, food_items=10, users=3, orders=6, items_per_order=2, reviews=8, cart_items=2)
+        results = serializer_microbenchmark(rounds=1)
+        self.assertEqual(results['food-items']['rows'], 10)
+        self.assertEqual(results['order-items']['rows'], 12)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'menu': {'status': 200, 'queries': 2, 'p95_ms': 10.0, 'peak_memory_kb': 100.0}}
+        same = {'menu': {'status': 200, 'queries': 2, 'p95_ms': 11.0, 'peak_memory_kb': 110.0}}
+        self.assertEqual(compare(same, baseline), [])
+        worse = {'menu': {'status': 500, 'queries': 3, 'p95_ms': 20.0, 'peak_memory_kb': 200.0}}
+        self.assertEqual(len(compare(worse, baseline)), 4)
+        self.assertEqual(compare({'new': worse['menu']}, baseline), [])
+        self.assertEqual(server_errors(worse), ['menu: status 500'])
@@ -5,7 +5,10 @@ from .views import (
     OrderListCreateAPIView, OrderDetailAPIView, AllOrderAPIView,
     ReviewListCreateAPIView, FoodItemsByCategoryAPIView,
     CartAPIView, CartItemDetailAPIView,
-    CheckoutAPIView, SpecialsListAPIView
+    CheckoutAPIView, SpecialsListAPIView, ImageVariantView
+)
+from .async_views import (
+    AsyncCategoryListView, AsyncFoodItemListView, AsyncSpecialsListView, AsyncOrderDetailView, AsyncCartView
 )
 
 urlpatterns = [
@@ -43,4 +46,14 @@ urlpatterns = [
 
     # Specials URL
     path('specials/', SpecialsListAPIView.as_view(), name='specials-list'),
+
+    # Sized WebP/AVIF variants of food item images, as listed in each item's image_srcset
+    path('images/<slug:digest>/<int:width>.<slug:fmt>', ImageVariantView.as_view(), name='image-variant'),
+
+    # Async-native versions of the read-heavy endpoints, for ASGI deployments (foodstore/asgi.py)
+    path('async/categories/', AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('async/food-items/', AsyncFoodItemListView.as_view(), name='async-food-item-list'),
+    path('async/specials/', AsyncSpecialsListView.as_view(), name='async-specials-list'),
+    path('async/orders/<int:pk>/', AsyncOrderDetailView.as_view(), name='async-order-detail'),
+    path('async/cart/', AsyncCartView.as_view(), name='async-cart'),
 ]
\ No newline at end of file
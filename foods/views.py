@@ -4,45 +4,133 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from .models import Category, FoodItem, Order, OrderItem, Review, CartItem
-from .serializers import CategorySerializer, FoodItemSerializer, OrderSerializer, ReviewSerializer, CartItemSerializer
+from .serializers import CategorySerializer, FoodItemSerializer, OrderSerializer, ReviewSerializer, CartItemSerializer, CartOperationSerializer
+from .pagination import KeysetPagination
+from .services import place_order, checkout_cart, add_rating, add_to_cart, apply_cart_operations, cart_summary
+from django.db import IntegrityError, transaction
+from .search import get_search_backend
+from rest_framework.pagination import PageNumberPagination
+from .cache import get_menu_cache
+from .fast_serializers import CompactJSONRenderer, cart_item_data, food_item_data
+from django.http import FileResponse, Http404, HttpResponse
+from django.views import View
+from .images import ensure_variant, variant_storage
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from foodstore.routers import replica_reads
+from django.utils import timezone
+from .order_status import IllegalTransition, StatusConflict, transition
+
+
+# Attach validators so clients can revalidate with If-None-Match / If-Modified-Since
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+# ETag and Last-Modified of an order detail response
+def order_validators(pk, updated_at, menu_version, menu_last_modified):
+    etag = '"order-%s-%d-v%s"' % (pk, int(updated_at.timestamp() * 1000000), menu_version)
+    return etag, max(int(updated_at.timestamp()), menu_last_modified or 0)
+
+
+# Serve a menu listing from the menu cache as pre-rendered JSON, building it with `build()` on a miss.
+# The ETag is the hash of the cached body, so a conditional request on a hit is answered with 304
+# without serializing anything.
+def cached_menu_response(request, parts, build):
+    cache = get_menu_cache()
+    version = cache.version()
+    last_modified = cache.last_modified(version=version)
+    etag, body = cache.get_or_render(parts, lambda: CompactJSONRenderer().render(build()), version=version)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json', status=status.HTTP_200_OK)
+    return set_validators(response, etag, last_modified)
 
 # Category List View
 class CategoryListAPIView(APIView):
+    @replica_reads('menu')
     def get(self, request):
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        def build():
+            categories = Category.objects.all()
+            return CategorySerializer(categories, many=True).data
+        return cached_menu_response(request, ('categories',), build)
+
+# Orderings accepted by ?sort= on the menu listings; 'rating' is served by fooditem_rating_idx
+MENU_SORTS = {
+    'rating': ('-rating_avg', '-rating_count', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', 'id'),
+}
+
+
+# Takes a DRF or a plain Django request, so the async views can share it
+def menu_sort(request):
+    sort = request.GET.get('sort', "")
+    return sort if sort in MENU_SORTS else ""
+
+
+def sort_food_items(food_items, sort):
+    return food_items.order_by(*MENU_SORTS[sort]) if sort else food_items
 
 # Food Item List and Detail Views
-from django.db.models import Q
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 class FoodItemListAPIView(APIView):
+    @replica_reads('menu')
     def get(self, request):
-        food_items = FoodItem.objects.all()
-        category_slug = request.query_params.get('category')
-        search_query = request.query_params.get('search', "")  # Get search query
+        category_slug = request.query_params.get('category') or ""
+        sort = menu_sort(request)
+        search_query = request.query_params.get('search', "").strip().lower()  # Get search query
 
-        if category_slug:
-            food_items = food_items.filter(category__slug=category_slug)
+        if search_query:  # Ranked, paginated results from the search backend
+            return self.search(request, category_slug, search_query)
 
-        if search_query:  # Apply search filter if search_query exists
-            food_items = food_items.filter(
-                Q(name__icontains=search_query) | Q(description__icontains=search_query)
-            )
+        def build():
+            food_items = FoodItem.objects.all()
 
-        serializer = FoodItemSerializer(food_items, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+            if category_slug:
+                food_items = food_items.filter(category__slug=category_slug)
+
+            food_items = sort_food_items(food_items, sort)
+            return food_item_data(food_items)
+        return cached_menu_response(request, ('food-items', category_slug, sort), build)
+
+    def search(self, request, category_slug, search_query):
+        paginator = SearchPagination()
+        page_number = request.query_params.get(paginator.page_query_param, 1)
+        page_size = paginator.get_page_size(request)
+
+        def build():
+            ranked = get_search_backend().search(search_query, category_slug=category_slug or None)
+            page_ids = list(paginator.paginate_queryset(ranked, request, view=self))
+            rows = {row['id']: row for row in food_item_data(FoodItem.objects.filter(pk__in=page_ids))}
+            page = [rows[pk] for pk in page_ids if pk in rows]
+            return paginator.get_paginated_response(page).data
+        parts = ('food-items', category_slug, search_query, page_number, page_size, request.get_host())
+        return cached_menu_response(request, parts, build)
 
     
 class FoodItemsByCategoryAPIView(APIView):
+    @replica_reads('menu')
     def get(self, request, category_slug):
-        category = get_object_or_404(Category, slug=category_slug)
-        food_items = FoodItem.objects.filter(category=category)
-        serializer = FoodItemSerializer(food_items, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        sort = menu_sort(request)
+
+        def build():
+            category = get_object_or_404(Category, slug=category_slug)
+            food_items = sort_food_items(FoodItem.objects.filter(category=category), sort)
+            return food_item_data(food_items)
+        return cached_menu_response(request, ('category', category_slug, sort), build)
 
 
 class FoodItemDetailAPIView(APIView):
+    @replica_reads('menu')
     def get(self, request, pk):
         # Handle GET request (retrieve food item details)
         food_item = get_object_or_404(FoodItem, pk=pk)
@@ -76,27 +164,30 @@ class OrderListCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        orders = Order.objects.filter(customer=request.user).order_by('-created_at')
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        orders = Order.objects.with_details().filter(customer=request.user)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         items = request.data.get('items', [])
         if not items:
             return Response({'error': 'Order must contain at least one item'}, status=status.HTTP_400_BAD_REQUEST)
 
-        total_price = 0
-        order = Order.objects.create(customer=request.user, total_price=0)
-
-        for item in items:
-            food_item = get_object_or_404(FoodItem, id=item['food_item'])
-            quantity = int(item.get('quantity', 1))
-            OrderItem.objects.create(order=order, food_item=food_item, quantity=quantity)
-            total_price += food_item.price * quantity
+        try:
+            lines = [(int(item['food_item']), int(item.get('quantity', 1))) for item in items]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return Response({'error': 'Each item needs a food_item and a numeric quantity'}, status=status.HTTP_400_BAD_REQUEST)
+        # Same bound as a cart line, so a line's quantity and price always fit their columns
+        if any(not 1 <= quantity <= CartItem.MAX_QUANTITY for _, quantity in lines):
+            return Response(
+                {'error': f'Quantities must be from 1 to {CartItem.MAX_QUANTITY}'}, status=status.HTTP_400_BAD_REQUEST
+            )
 
-        order.total_price = total_price
-        order.save()
+        order = place_order(request.user, lines)
 
+        order = Order.objects.with_details().get(pk=order.pk)
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -105,7 +196,7 @@ class OrderDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        order = get_object_or_404(Order, id=pk, customer=request.user)
+        order = get_object_or_404(Order.objects.with_details(), id=pk, customer=request.user)
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -121,50 +212,68 @@ class ReviewListCreateAPIView(APIView):
     #permission_classes = [IsAuthenticated]
 
     def get(self, request, food_item_id):
-        reviews = Review.objects.filter(food_item_id=food_item_id)
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        reviews = Review.objects.select_related('customer', 'food_item').filter(food_item_id=food_item_id)
+        paginator = KeysetPagination()  # Newest first, backed by review_item_created_idx
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = ReviewSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, food_item_id):
         food_item = get_object_or_404(FoodItem, id=food_item_id)
-        existing_review = Review.objects.filter(customer=request.user, food_item=food_item).first()
-        if existing_review:
-            return Response({'error': 'You have already reviewed this item'}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(customer=request.user, food_item=food_item)
+            # unique_review_per_customer rejects a second review, even from concurrent requests
+            try:
+                with transaction.atomic():
+                    review = serializer.save(customer=request.user, food_item=food_item)
+                    add_rating(food_item.pk, review.rating)
+            except IntegrityError:
+                return Response({'error': 'You have already reviewed this item'}, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+MAX_CART_OPERATIONS = 500
+
+
 class CartAPIView(APIView):
     #permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        cart_items = CartItem.objects.filter(user=request.user)
-        serializer = CartItemSerializer(cart_items, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Lines, subtotals, grand total and savings from one query
+        return Response(cart_summary(request.user), status=status.HTTP_200_OK)
 
     def post(self, request):
         food_item_id = request.data.get("food_item_id")
-        quantity = request.data.get("quantity")
-        print(food_item_id, quantity)
+        try:
+            quantity = int(request.data.get("quantity", 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if not 1 <= quantity <= CartItem.MAX_QUANTITY:
+            return Response(
+                {"error": f"quantity must be an integer from 1 to {CartItem.MAX_QUANTITY}"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         food_item = get_object_or_404(FoodItem, id=food_item_id)
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user, food_item=food_item,
-            defaults={"quantity": quantity}  # Set quantity when creating
+        # Inserts the line or adds to its quantity in one statement, safe against concurrent adds
+        cart_item_ids = add_to_cart(request.user, [(food_item.pk, quantity)])
+
+        data = cart_item_data(CartItem.objects.filter(pk=cart_item_ids[food_item.pk]))[0]
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        # Sync a whole cart in one request: {"operations": [{"op": "add"|"set"|"remove", "food_item_id", "quantity"}]}
+        if not isinstance(request.data, dict):
+            return Response({"error": "expected an object with an operations list"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CartOperationSerializer(
+            data=request.data.get('operations'), many=True, allow_empty=False, max_length=MAX_CART_OPERATIONS
         )
-
-        if not created:
-            cart_item.quantity += int(quantity)
-            print(cart_item.quantity)
-            cart_item.save()
-
-        serializer = CartItemSerializer(cart_item)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        apply_cart_operations(request.user, serializer.validated_data)
+        return Response(cart_summary(request.user), status=status.HTTP_200_OK)
 
 
 class CartItemDetailAPIView(APIView):
@@ -186,40 +295,27 @@ class CheckoutAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        # Fetch all cart items for the logged-in user
-        cart_items = CartItem.objects.filter(user=request.user)
+        # Turn the cart into an order and clear it in one transaction
+        order = checkout_cart(request.user)
 
-        if not cart_items:
+        if order is None:
             return Response({"error": "Your cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create a new order
-        order = Order.objects.create(customer=request.user, total_price=0)
-
-        # Calculate total price and add items to the order
-        total_price = 0
-        for cart_item in cart_items:
-            food_item = cart_item.food_item
-            quantity = cart_item.quantity
-            OrderItem.objects.create(order=order, food_item=food_item, quantity=quantity)
-            total_price += food_item.price * quantity
-
-        # Update the order's total price
-        order.total_price = total_price
-        order.save()
-
-        # Clear the user's cart after placing the order
-        cart_items.delete()
-
         # Return the created order details
+        order = Order.objects.with_details().get(pk=order.pk)
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class SpecialsListAPIView(APIView):
+    @replica_reads('menu')
     def get(self, request):
-        specials = FoodItem.objects.filter(is_special=True)
-        serializer = FoodItemSerializer(specials, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        sort = menu_sort(request)
+
+        def build():
+            specials = sort_food_items(FoodItem.objects.filter(is_special=True), sort)
+            return food_item_data(specials)
+        return cached_menu_response(request, ('specials', sort), build)
 
 
 
@@ -263,9 +359,14 @@ class FoodItemCreateAPIView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
     def post(self, request):
+        # The serializer nests the category read-only, so the new item's category is sent as an id
+        try:
+            category = Category.objects.get(pk=int(request.data.get('category')))
+        except (Category.DoesNotExist, TypeError, ValueError):
+            return Response({"category": ["A valid category id is required."]}, status=status.HTTP_400_BAD_REQUEST)
         serializer = FoodItemSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(category=category)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -283,45 +384,77 @@ from datetime import datetime
 class AllOrderAPIView(APIView):
     # permission_classes = [IsAuthenticated, IsAdminUser]  # Only admins can access this view
 
+    @replica_reads()
     def get(self, request):
         # Retrieve all orders from all users
-        orders = Order.objects.all().order_by('-created_at')  # Sort by most recent
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        orders = Order.objects.with_details()
+        paginator = KeysetPagination()  # Most recent first, one page at a time
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 # View for handling individual orders
 class OrderDetailAPIView(APIView):
     # permission_classes = [IsAuthenticated, IsAdminUser]  # Only admins can access this view
 
     def get(self, request, pk):
+        # Answer conditional requests from the order's updated_at before loading anything else.
+        # The payload nests food items, so the menu version is part of the validator too.
+        updated_at = Order.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            raise Http404
+        cache = get_menu_cache()
+        version = cache.version()
+        etag, last_modified = order_validators(pk, updated_at, version, cache.last_modified(version=version))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
         # Retrieve a single order by ID
-        order = get_object_or_404(Order, pk=pk)
+        order = get_object_or_404(Order.objects.with_details(), pk=pk)
         serializer = OrderSerializer(order)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(Response(serializer.data, status=status.HTTP_200_OK), etag, last_modified)
 
     def put(self, request, pk):
         # Update the status or estimated_delivery_time of a specific order
-        order = get_object_or_404(Order, pk=pk)
+        if not Order.objects.filter(pk=pk).exists():
+            raise Http404
         new_status = request.data.get('status')
         new_estimated_delivery_time = request.data.get('estimated_delivery_time')
-
-        # Validate and update status
-        if new_status:
-            if new_status not in dict(Order.STATUS_CHOICES).keys():
-                return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
-            order.status = new_status
+        fields = {}
 
         # Validate and update estimated_delivery_time
         if new_estimated_delivery_time:
             try:
                 # Parse the datetime string (e.g., "2023-10-15T14:30:00Z")
-                parsed_time = datetime.strptime(new_estimated_delivery_time, "%Y-%m-%dT%H:%M:%SZ")
-                order.estimated_delivery_time = parsed_time
+                fields['estimated_delivery_time'] = datetime.strptime(new_estimated_delivery_time, "%Y-%m-%dT%H:%M:%SZ")
             except ValueError:
                 return Response({'error': 'Invalid datetime format. Use "YYYY-MM-DDTHH:MM:SSZ".'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Save the updated order
-        order.save()
-
+        # Validate and apply the status change; only the changed columns are written
+        if new_status:
+            if new_status not in dict(Order.STATUS_CHOICES).keys():
+                return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                event = transition(pk, new_status, actor=request.user, source='admin', **fields)
+            except (IllegalTransition, StatusConflict) as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+            if event is not None:
+                fields = {}
+        if fields:
+            Order.objects.filter(pk=pk).update(updated_at=timezone.now(), **fields)
+
+        order = Order.objects.with_details().get(pk=pk)
         serializer = OrderSerializer(order)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+# Serve a sized image variant (see foods/images.py), rendering it first if the pool has not yet.
+# The URL names the original's content hash, so the response never changes and can be cached forever.
+class ImageVariantView(View):
+    def get(self, request, digest, width, fmt):
+        path = ensure_variant(digest, width, fmt)
+        if path is None:
+            raise Http404
+        response = FileResponse(variant_storage().open(path, 'rb'), content_type=f'image/{fmt}')
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+
+# How a logged-in user is recognised on later requests, picked by AUTH_MODE in settings.py:
+#   'db-session'     login() writes a row to the session table, which every request carrying the cookie reads
+#   'signed-cookie'  the session lives in a signed cookie; checking it needs the SECRET_KEY, not the database
+#   'jwt'            login also returns a short-lived access token and a refresh token ("Authorization: Bearer");
+#                    the user is rebuilt from the access token's claims, so authenticating costs no query.
+#                    Needs djangorestframework-simplejwt.
+# API tokens ("Authorization: Token ...") work in every mode.
+AUTH_MODES = ('db-session', 'signed-cookie', 'jwt')
+
+SESSION_ENGINES = {
+    'db-session': 'django.contrib.sessions.backends.db',
+    'signed-cookie': 'django.contrib.sessions.backends.signed_cookies',
+    'jwt': 'django.contrib.sessions.backends.signed_cookies',  # For the admin site
+}
+
+
+# Settings for `mode`: SESSION_ENGINE, REST_FRAMEWORK's DEFAULT_AUTHENTICATION_CLASSES and, for 'jwt', SIMPLE_JWT.
+# SessionAuthentication stays first so unauthenticated requests keep getting 403 rather than 401.
+# 'jwt' requires its own `signing_key`: the tokens' staff and superuser claims are trusted as signed, and
+# SECRET_KEY is committed to the repository, so signing with it would let anyone mint admin tokens.
+def auth_settings(mode, access_lifetime=300, refresh_lifetime=86400, signing_key=None):
+    if mode not in AUTH_MODES:
+        raise ImproperlyConfigured(f"AUTH_MODE must be one of {', '.join(AUTH_MODES)}, not {mode!r}")
+
+    config = {
+        'SESSION_ENGINE': SESSION_ENGINES[mode],
+        'AUTHENTICATION_CLASSES': [
+            'rest_framework.authentication.SessionAuthentication',
+            'customers.authentication.CachedTokenAuthentication',
+        ],
+    }
+    if mode == 'jwt':
+        try:
+            import rest_framework_simplejwt  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured("AUTH_MODE='jwt' needs pip install djangorestframework-simplejwt")
+        if not signing_key:
+            raise ImproperlyConfigured("AUTH_MODE='jwt' needs a JWT_SIGNING_KEY environment variable")
+        config['AUTHENTICATION_CLASSES'].append('customers.tokens.StatelessJWTAuthentication')
+        config['SIMPLE_JWT'] = {
+            # Claims (and so revoked staff rights or a deactivation) are refreshed from the database this often
+            'ACCESS_TOKEN_LIFETIME': timedelta(seconds=access_lifetime),
+            'REFRESH_TOKEN_LIFETIME': timedelta(seconds=refresh_lifetime),
+            'SIGNING_KEY': signing_key,
+            'AUTH_HEADER_TYPES': ('Bearer',),
+            'UPDATE_LAST_LOGIN': False,
+        }
+    return config
@@ -0,0 +1,553 @@
+import asyncio
+import json
+import math
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection, reset_queries, transaction
+from django.db.models import Count
+from django.db import DEFAULT_DB_ALIAS
+from django.test import AsyncClient
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from foods.cache import get_menu_cache
+from foods.models import CartItem, Category, FoodItem, Order
+from payments.fake_gateway import FakeGatewayServer
+from payments.models import PaymentTransaction
+
+# Defaults for comparing a run against the stored baseline
+LATENCY_TOLERANCE = 0.25   # p95 may grow by this fraction...
+LATENCY_NOISE_MS = 2.0     # ...and by at least this many ms before it counts as a regression
+MEMORY_TOLERANCE = 0.25
+
+
+class Scenario:
+    def __init__(self, name, method, path, user=None, data=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.user = user
+        self.data = data
+
+
+# A throwaway test database for the length of the block, seeded by `seed_benchmark.seed(**seed_options)`.
+# Yields the seeded row counts.
+@contextmanager
+def seeded_database(**seed_options):
+    from foods.management.commands.seed_benchmark import seed
+
+    setup_test_environment()
+    old_config = setup_databases(0, False, aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set())
+    try:
+        yield seed(**seed_options)
+    finally:
+        teardown_databases(old_config, 0)
+        teardown_test_environment()
+
+
+# One scenario per route (and per interesting query string) in foods/, customers/ and payments/urls.py,
+# all pointing at rows that `seed()` created
+def build_scenarios():
+    customer = User.objects.get(username='bench0')
+    admin = User.objects.get(username='bench-admin')
+    category = Category.objects.order_by('pk').first()
+    food_item = FoodItem.objects.order_by('pk').first()
+    most_reviewed = FoodItem.objects.annotate(n=Count('reviews')).order_by('-n', 'pk').first()
+    unreviewed = FoodItem.objects.exclude(reviews__customer=customer).order_by('pk').first()
+    order = Order.objects.filter(customer=customer).order_by('-created_at', '-id').first()
+    pending_order = Order.objects.filter(status='Pending').order_by('pk').first()
+    cart_item = CartItem.objects.filter(user=customer).order_by('pk').first()
+    payment, _ = PaymentTransaction.objects.get_or_create(
+        tran_id='BENCH0', defaults={'order': pending_order, 'amount': pending_order.total_price},
+    )
+    # Already settled outside the rolled-back request transactions, so every IPN iteration is a redelivery
+    settled_payment, _ = PaymentTransaction.objects.get_or_create(
+        tran_id='BENCH1', defaults={
+            'order': pending_order, 'amount': pending_order.total_price, 'status': 'Failed',
+            'processed_at': timezone.now(),
+        },
+    )
+    profile = Customer.objects.get(user=customer)
+    uid = urlsafe_base64_encode(force_bytes(customer.pk))
+    activation_token = default_token_generator.make_token(customer)
+    search_term = food_item.name.split()[0].lower()
+
+    return [
+        # foods/urls.py
+        Scenario('category-list', 'get', '/api/categories/'),
+        Scenario('category-create', 'post', '/api/categories/create/', admin, {'name': 'Benchmark Category'}),
+        Scenario('category-update', 'put', f'/api/categories/{category.pk}/', admin, {'name': 'Renamed', 'slug': 'renamed'}),
+        Scenario('category-delete', 'delete', f'/api/categories/{category.pk}/', admin),
+        Scenario('food-item-list', 'get', '/api/food-items/'),
+        Scenario('food-item-list-by-rating', 'get', '/api/food-items/?sort=rating'),
+        Scenario('food-item-search', 'get', f'/api/food-items/?search={search_term}'),
+        Scenario('food-item-create', 'post', '/api/food-items/create/', admin, {
+            'name': 'Benchmark Burger', 'price': '9.99', 'category': category.pk,
+        }),
+        Scenario('food-item-detail', 'get', f'/api/food-items/{food_item.pk}/'),
+        Scenario('food-item-update', 'put', f'/api/food-items/{food_item.pk}/', admin, {'name': 'Renamed', 'price': '5.00'}),
+        Scenario('food-item-delete', 'delete', f'/api/food-items/{food_item.pk}/', admin),
+        Scenario('food-items-by-category', 'get', f'/api/categories/{category.slug}/food-items/'),
+        Scenario('order-list', 'get', '/api/orders/', customer),
+        Scenario('order-create', 'post', '/api/orders/', customer, {'items': [
+            {'food_item': pk, 'quantity': 2} for pk in FoodItem.objects.order_by('pk').values_list('pk', flat=True)[:5]
+        ]}),
+        Scenario('order-detail', 'get', f'/api/orders/{order.pk}/', customer),
+        Scenario('admin-order-list', 'get', '/api/admin/orders/', admin),
+        Scenario('admin-order-detail', 'get', f'/api/admin/orders/{order.pk}/', admin),
+        Scenario('admin-order-update', 'put', f'/api/admin/orders/{pending_order.pk}/', admin, {'status': 'Processing'}),
+        Scenario('review-list', 'get', f'/api/food-items/{most_reviewed.pk}/reviews/'),
+        Scenario('review-create', 'post', f'/api/food-items/{unreviewed.pk}/reviews/', customer, {'rating': 4, 'comment': 'Good'}),
+        Scenario('cart', 'get', '/api/cart/', customer),
+        Scenario('cart-add', 'post', '/api/cart/', customer, {'food_item_id': food_item.pk, 'quantity': 1}),
+        Scenario('cart-sync', 'patch', '/api/cart/', customer, {'operations': [
+            {'op': 'add', 'food_item_id': pk, 'quantity': 1} for pk in FoodItem.objects.order_by('pk').values_list('pk', flat=True)[:20]
+        ] + [{'op': 'remove', 'food_item_id': cart_item.food_item_id}]}),
+        Scenario('cart-item-update', 'put', f'/api/cart/{cart_item.pk}/', customer, {'quantity': 5}),
+        Scenario('cart-item-delete', 'delete', f'/api/cart/{cart_item.pk}/', customer),
+        Scenario('checkout', 'post', '/api/checkout/', customer),
+        Scenario('specials', 'get', '/api/specials/'),
+        # customers/urls.py
+        Scenario('customer-api-root', 'get', '/customer/'),
+        Scenario('customer-list', 'get', '/customer/list/'),
+        Scenario('customer-detail', 'get', f'/customer/list/{profile.pk}/'),
+        Scenario('register', 'post', '/customer/register/', data={
+            'username': 'newcomer', 'first_name': 'New', 'last_name': 'Comer', 'email': 'newcomer@example.com',
+            'password': 'benchmark-password', 'confirm_password': 'benchmark-password',
+            'phone': '01700000000', 'address': '1 New Street',
+        }),
+        Scenario('login', 'post', '/customer/login/', data={'username': 'bench0', 'password': 'benchmark-password'}),
+        Scenario('logout', 'get', '/customer/logout/', customer),
+        Scenario('activate', 'get', f'/customer/active/{uid}/{activation_token}/'),
+        Scenario('user-profile', 'get', f'/customer/details/{customer.pk}/'),
+        # payments/urls.py
+        Scenario('payment-api-root', 'get', '/'),
+        Scenario('payment-create', 'post', '/payment/create_payment/', customer),
+        Scenario('payment-success', 'post', f'/payment/success/?tran_id={payment.tran_id}', customer),
+        Scenario('payment-cancel', 'post', f'/payment/cancel/?tran_id={payment.tran_id}', customer),
+        Scenario('payment-fail', 'post', f'/payment/fail/?tran_id={payment.tran_id}', customer),
+        # A redelivered notification for an already settled payment
+        Scenario('payment-ipn', 'post', '/payment/ipn/', data={'tran_id': settled_payment.tran_id, 'status': 'FAILED'}),
+    ]
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, q):
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class BenchmarkRunner:
+    def __init__(self, iterations=20, warmup=2):
+        self.iterations = iterations
+        self.warmup = warmup
+
+    def client_for(self, user):
+        client = APIClient(raise_request_exception=False)
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {user.auth_token.key}')
+        return client
+
+    # Every request runs inside a transaction that is rolled back afterwards, so writes (orders, checkout,
+    # deletes) see the same seeded rows on every iteration. Menu cache invalidation is deferred to
+    # on_commit, so rolled-back writes leave the cache warm as well.
+    def request(self, client, scenario):
+        with transaction.atomic():
+            client.cookies.clear()
+            extra = {} if scenario.method == 'get' else {'format': 'json'}
+            response = getattr(client, scenario.method)(scenario.path, scenario.data, **extra)
+            transaction.set_rollback(True)
+        return response
+
+    def run_scenario(self, scenario):
+        client = self.client_for(scenario.user)
+        for _ in range(self.warmup):
+            self.request(client, scenario)
+
+        timings = []
+        queries = 0
+        for _ in range(self.iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = self.request(client, scenario)
+                timings.append((time.perf_counter() - start) * 1000)
+            # Includes the wrapping transaction's BEGIN/ROLLBACK, a constant that cancels out against the baseline
+            queries = max(queries, len(ctx.captured_queries))
+
+        # tracemalloc slows every allocation down, so peak memory gets a pass of its own
+        tracemalloc.start()
+        try:
+            self.request(client, scenario)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'method': scenario.method.upper(),
+            'path': scenario.path,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'queries': queries,
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    # create_payment talks to a local fake SSLCommerz rather than benchmarking somebody else's server
+    def run(self, scenarios, only=None):
+        get_menu_cache().clear()
+        with FakeGatewayServer() as gateway:
+            with override_settings(SSLCOMMERZ=dict(getattr(settings, 'SSLCOMMERZ', {}), BASE_URL=gateway.url)):
+                return {
+                    scenario.name: self.run_scenario(scenario)
+                    for scenario in scenarios
+                    if not only or scenario.name in only
+                }
+
+
+# Compare `results` with a stored baseline and return one message per regression.
+# Query counts are deterministic, so any increase is a regression; latency and memory get a tolerance.
+def compare(results, baseline, latency_tolerance=LATENCY_TOLERANCE, latency_noise_ms=LATENCY_NOISE_MS,
+            memory_tolerance=MEMORY_TOLERANCE):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['status'] != base['status']:
+            regressions.append(f"{name}: status {base['status']} -> {result['status']}")
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: queries {base['queries']} -> {result['queries']}")
+        if (result['p95_ms'] > base['p95_ms'] * (1 + latency_tolerance)
+                and result['p95_ms'] - base['p95_ms'] > latency_noise_ms):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result['peak_memory_kb'] > base['peak_memory_kb'] * (1 + memory_tolerance):
+            regressions.append(f"{name}: peak memory {base['peak_memory_kb']}KB -> {result['peak_memory_kb']}KB")
+    return regressions
+
+
+# One message per result the server answered with a 5xx, which no scenario should ever get
+def server_errors(results):
+    return [f"{name}: status {result['status']}" for name, result in results.items() if result['status'] >= 500]
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+# (name, sync path, async path, headers) for the endpoints that have an async-native view in foods/async_views.py
+def build_async_pairs():
+    customer = User.objects.select_related('auth_token').get(username='bench0')
+    order = Order.objects.filter(customer=customer).order_by('-created_at', '-id').first()
+    auth = {'Authorization': f'Token {customer.auth_token.key}'}
+    return [
+        ('categories', '/api/categories/', '/api/async/categories/', None),
+        ('food-items', '/api/food-items/', '/api/async/food-items/', None),
+        ('specials', '/api/specials/', '/api/async/specials/', None),
+        ('order-detail', f'/api/orders/{order.pk}/', f'/api/async/orders/{order.pk}/', auth),
+        ('cart', '/api/cart/', '/api/async/cart/', auth),
+    ]
+
+
+# Fire `requests` requests (GETs, or `method` with JSON `data`) at `path` through the ASGI handler, `concurrency`
+# at a time, and report throughput and latency. Sync views run in the thread pool exactly as they would under an ASGI server.
+async def load_test(path, requests, concurrency, headers=None, method='get', data=None):
+    client = AsyncClient(raise_request_exception=False)
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            if method == 'get':
+                response = await client.get(path, headers=headers)
+            else:
+                response = await getattr(client, method)(path, data, content_type='application/json', headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    return {
+        'requests_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'errors': errors,
+    }
+
+
+# Load-test the sync and async version of each endpoint in build_async_pairs()
+async def compare_async(pairs, requests=500, concurrency=50):
+    get_menu_cache().clear()
+    results = {}
+    for name, sync_path, async_path, headers in pairs:
+        results[name] = {
+            'sync': await load_test(sync_path, requests, concurrency, headers),
+            'async': await load_test(async_path, requests, concurrency, headers),
+        }
+    return results
+
+
+# DRF serializer + JSONRenderer against the fast path in foods/fast_serializers.py, both including the query.
+# Each case is checked for byte-identical output before it is timed.
+def serializer_microbenchmark(rounds=20, limit=1000):
+    from rest_framework.renderers import JSONRenderer
+
+    from foods.fast_serializers import CompactJSONRenderer, cart_item_data, food_item_data, order_item_data
+    from foods.models import OrderItem
+    from foods.serializers import CartItemSerializer, FoodItemSerializer, OrderItemSerializer
+
+    cases = [
+        ('food-items', FoodItem.objects.order_by('pk')[:limit], FoodItemSerializer, food_item_data, 'category'),
+        ('cart-items', CartItem.objects.order_by('pk')[:limit], CartItemSerializer, cart_item_data, 'food_item__category'),
+        ('order-items', OrderItem.objects.order_by('pk')[:limit], OrderItemSerializer, order_item_data, 'food_item__category'),
+    ]
+
+    results = {}
+    for name, queryset, serializer_class, fast_data, related in cases:
+        def slow():
+            return JSONRenderer().render(serializer_class(queryset.select_related(related), many=True).data)
+
+        def fast():
+            return CompactJSONRenderer().render(fast_data(queryset))
+
+        if slow() != fast():
+            raise AssertionError(f"{name}: fast path output differs from the serializer's")
+        timings = {}
+        for label, func in (('serializer', slow), ('fast_path', fast)):
+            samples = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                func()
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            timings[label] = percentile(samples, 0.5)
+        results[name] = {
+            'rows': queryset.count(),
+            'serializer_p50_ms': round(timings['serializer'], 3),
+            'fast_path_p50_ms': round(timings['fast_path'], 3),
+            'speedup': round(timings['serializer'] / timings['fast_path'], 2),
+        }
+    return results
+
+
+# Per-request connection overhead under each DB_CONNECTION_MODE (see foodstore/db.py): `requests` sequential
+# GETs of `path`, each wrapped in the close_old_connections() calls that request_started/request_finished make
+# in production (the test client switches those off). `connect_delay` (seconds) is added to every new connection
+# to stand in for the TCP + TLS + auth handshake with a remote server, which a local SQLite file does not have.
+def connection_benchmark(modes, requests=200, path='/api/health/', connect_delay=0.0):
+    from django.db import close_old_connections, connections
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+
+    from foodstore.db import connection_settings
+
+    conn = connections[DEFAULT_DB_ALIAS]
+    original = {key: conn.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+    connects = []
+
+    def on_connect(**kwargs):
+        connects.append(1)
+        if connect_delay:
+            time.sleep(connect_delay)
+
+    client = Client()
+    results = {}
+    connection_created.connect(on_connect, weak=False)
+    try:
+        for mode in modes:
+            conn.close()
+            conn.settings_dict.update(connection_settings(mode))
+            connects.clear()
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                close_old_connections()
+                response = client.get(path)
+                close_old_connections()
+                samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise AssertionError(f"{mode}: GET {path} returned {response.status_code}")
+            if mode == 'pool':
+                conn.close_pool()
+            samples.sort()
+            results[mode] = {
+                'requests': requests,
+                'connections': len(connects),
+                'mean_ms': round(sum(samples) / len(samples), 3),
+                'p50_ms': round(percentile(samples, 0.5), 3),
+                'p95_ms': round(percentile(samples, 0.95), 3),
+            }
+    finally:
+        connection_created.disconnect(on_connect)
+        conn.close()
+        conn.settings_dict.update(original)
+    return results
+
+
+# Middleware that settings.py used to list twice, for comparing against the old stack
+DUPLICATED_MIDDLEWARE = [
+    'django.middleware.common.CommonMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+]
+
+
+# Cost of logging in and of recognising a logged-in user under each AUTH_MODE (see foodstore/auth.py): `logins`
+# logins as `username`, then `requests` sequential GETs of `path` carrying the session cookie, or the access
+# token in 'jwt' mode. `legacy` adds a run of 'db-session' with the duplicated middleware stack we used to have.
+# Reports latency and, per request, all queries and those against the session and user tables. Login latency
+# is mostly password hashing, so the time of one check_password() is reported next to it.
+def auth_benchmark(modes, username, password, requests=200, path='/api/cart/', legacy=True, logins=10):
+    from unittest import mock
+
+    from django.test import Client
+    from django.utils.module_loading import import_string
+    from rest_framework.views import APIView
+
+    from foodstore.auth import auth_settings
+
+    runs = [(mode, mode, settings.MIDDLEWARE) for mode in modes]
+    if legacy:
+        runs.insert(0, ('db-session+duplicate-middleware', 'db-session', settings.MIDDLEWARE + DUPLICATED_MIDDLEWARE))
+
+    results = {}
+    for name, mode, middleware in runs:
+        # Tokens minted here only live as long as the throwaway database
+        config = auth_settings(mode, signing_key='benchmark-signing-key')
+        overrides = {
+            'AUTH_MODE': mode,
+            'SESSION_ENGINE': config['SESSION_ENGINE'],
+            'MIDDLEWARE': middleware,
+            'REST_FRAMEWORK': dict(settings.REST_FRAMEWORK, DEFAULT_AUTHENTICATION_CLASSES=config['AUTHENTICATION_CLASSES']),
+        }
+        if 'SIMPLE_JWT' in config:
+            overrides['SIMPLE_JWT'] = config['SIMPLE_JWT']
+        # APIView reads its authentication classes once, at import
+        classes = [import_string(path) for path in config['AUTHENTICATION_CLASSES']]
+        with override_settings(**overrides), mock.patch.object(APIView, 'authentication_classes', classes):
+            client = Client()
+            login_samples = []
+            for attempt in range(logins + 1):
+                reset_queries()  # The client's request_started does this too, and would empty the capture
+                with CaptureQueriesContext(connection) as login_queries:
+                    start = time.perf_counter()
+                    response = client.post('/customer/login/', {'username': username, 'password': password},
+                                           content_type='application/json')
+                if attempt:  # The first login also creates the API token
+                    login_samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise AssertionError(f"{name}: login returned {response.status_code}")
+            headers = {'Authorization': f"Bearer {response.json()['access']}"} if mode == 'jwt' else {}
+
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.get(path, headers=headers)
+                samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise AssertionError(f"{name}: GET {path} returned {response.status_code}")
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(path, headers=headers)
+        samples.sort()
+        login_samples.sort()
+        statements = [query['sql'] for query in queries.captured_queries]
+        results[name] = {
+            'login_p50_ms': round(percentile(login_samples, 0.5), 3),
+            'login_p95_ms': round(percentile(login_samples, 0.95), 3),
+            'login_queries': len(login_queries.captured_queries),
+            'requests': requests,
+            'mean_ms': round(sum(samples) / len(samples), 3),
+            'p50_ms': round(percentile(samples, 0.5), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'queries': len(statements),
+            'session_queries': sum('django_session' in sql for sql in statements),
+            'user_queries': sum('FROM "auth_user"' in sql for sql in statements),
+        }
+
+    user = User.objects.get(username=username)
+    hash_samples = []
+    for _ in range(max(logins, 1)):
+        start = time.perf_counter()
+        user.check_password(password)
+        hash_samples.append((time.perf_counter() - start) * 1000)
+    hash_samples.sort()
+    results['password_hash_ms'] = round(percentile(hash_samples, 0.5), 3)
+    return results
+
+
+# Cores this process may run on
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Login throughput at each PBKDF2 iteration count (see customers/hashers.py). For each count:
+#   - the time of one hash, and so the logins/sec a single core can verify
+#   - `hashes` verifications through the hashing pool with `workers` threads, per core used
+#   - `requests` logins as `username` through the ASGI handler, `concurrency` at a time, to the sync view
+#     (hashing on the request thread) and to the async view (hashing in the pool)
+# The user's password is rehashed at each count first, so no login pays for a rehash.
+def hashing_benchmark(iteration_counts, username, password, workers=None, hashes=40, requests=40, concurrency=8):
+    from django.contrib.auth.hashers import check_password, make_password
+
+    from customers.hashers import HashingPool
+
+    workers = workers or available_cores()
+    credentials = {'username': username, 'password': password}
+    results = {'cores': available_cores(), 'workers': workers}
+    for iterations in iteration_counts:
+        with override_settings(PASSWORD_HASHING=dict(getattr(settings, 'PASSWORD_HASHING', {}), ITERATIONS=iterations)):
+            encoded = make_password(password)
+            User.objects.filter(username=username).update(password=encoded)
+
+            samples = []
+            for _ in range(5):
+                start = time.perf_counter()
+                check_password(password, encoded)
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            hash_ms = percentile(samples, 0.5)
+
+            pool = HashingPool(workers, hashes)
+
+            async def verify_all():
+                await asyncio.gather(*(pool.run(check_password, password, encoded) for _ in range(hashes)))
+
+            start = time.perf_counter()
+            asyncio.run(verify_all())
+            pool_rate = hashes / (time.perf_counter() - start)
+            pool.shutdown()
+
+            results[str(iterations)] = {
+                'hash_ms': round(hash_ms, 3),
+                'logins_per_sec_per_core': round(1000 / hash_ms, 1),
+                'pool_logins_per_sec': round(pool_rate, 1),
+                'pool_logins_per_sec_per_core': round(pool_rate / min(workers, available_cores()), 1),
+                'sync_view': asyncio.run(load_test('/customer/login/', requests, concurrency, method='post', data=credentials)),
+                'async_view': asyncio.run(load_test('/customer/async/login/', requests, concurrency, method='post', data=credentials)),
+            }
+    return results
@@ -0,0 +1,40 @@
+from django.core.exceptions import ImproperlyConfigured
+
+# How DATABASES['default'] holds on to its connections, picked by DB_CONNECTION_MODE in settings.py:
+#   'per-request'  connect and disconnect around every request (Django's default, CONN_MAX_AGE=0)
+#   'persistent'   keep each worker's connection for `conn_max_age` seconds, health-checked before reuse, so
+#                  warm serverless invocations and WSGI workers skip the TCP + TLS + auth handshake
+#   'pool'         one psycopg 3 connection pool per process, for long-lived ASGI or threaded workers
+#                  serving concurrent requests. Needs psycopg[pool] and Postgres.
+CONNECTION_MODES = ('per-request', 'persistent', 'pool')
+
+
+# Keys to merge into a DATABASES entry. `transaction_pooler` is for servers behind a transaction-mode pooler
+# (Supabase on port 6543, PgBouncer): consecutive transactions may run on different server connections,
+# so neither server-side cursors nor prepared statements can be kept between them.
+def connection_settings(mode, conn_max_age=300, pool_min_size=2, pool_max_size=10, pool_timeout=10,
+                        transaction_pooler=False):
+    if mode not in CONNECTION_MODES:
+        raise ImproperlyConfigured(f"DB_CONNECTION_MODE must be one of {', '.join(CONNECTION_MODES)}, not {mode!r}")
+
+    config = {
+        'CONN_MAX_AGE': conn_max_age if mode == 'persistent' else 0,  # Django's pool requires 0
+        'CONN_HEALTH_CHECKS': mode == 'persistent',
+        'OPTIONS': {},
+    }
+    if transaction_pooler:
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    if mode == 'pool':
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            raise ImproperlyConfigured("DB_CONNECTION_MODE='pool' needs psycopg 3: pip install 'psycopg[binary,pool]'")
+        config['OPTIONS']['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,  # Seconds a request waits for a free connection before failing
+            'check': ConnectionPool.check_connection,  # Health-check each connection as it is handed out
+        }
+        if transaction_pooler:
+            config['OPTIONS']['prepare_threshold'] = None  # psycopg 3 prepares repeated queries by default
+    return config
@@ -0,0 +1,30 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
+from django.views import View
+
+logger = logging.getLogger(__name__)
+
+
+# Liveness and database check for load balancers and uptime monitors. Deliberately a plain Django view
+# with one round trip, so its latency is the cost of getting a connection plus one query.
+class HealthCheckView(View):
+    def get(self, request):
+        start = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        except DatabaseError:
+            # The driver's message can name hosts or credentials, and this endpoint is public: log it, don't return it
+            logger.exception("Health check could not reach the database")
+            return JsonResponse({'status': 'unavailable'}, status=503)
+        return JsonResponse({
+            'status': 'ok',
+            'database': connection.vendor,
+            'connection_mode': getattr(settings, 'DB_CONNECTION_MODE', 'per-request'),
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+        })
@@ -0,0 +1,200 @@
+import bisect
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_SPACE_RE = re.compile(r'\s+')
+
+
+# Collapse parameter lists and literals so the same query shape always has the same fingerprint
+def fingerprint(sql):
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.statements = []
+
+    # connection.execute_wrapper hook: time every statement run while the request is in flight
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements.append(sql)
+
+    def duplicates(self):
+        counts = Counter(fingerprint(sql) for sql in self.statements)
+        return {sql: count for sql, count in counts.most_common() if count > 1}
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.total_time = 0.0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.queries = 0
+        self.max_queries = 0
+
+    def add(self, profile, total_time):
+        self.count += 1
+        self.buckets[bisect.bisect_left(BUCKETS_MS, total_time * 1000)] += 1
+        self.total_time += total_time
+        self.db_time += profile.db_time
+        self.serializer_time += profile.serializer_time
+        self.queries += profile.queries
+        self.max_queries = max(self.max_queries, profile.queries)
+
+    # Upper bound of the bucket holding the q-th quantile; None when it falls in the open bucket
+    def quantile(self, q):
+        target = q * self.count
+        seen = 0
+        for bound, hits in zip(BUCKETS_MS, self.buckets):
+            seen += hits
+            if seen >= target:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'avg_ms': round(self.total_time * 1000 / self.count, 3),
+            'avg_db_ms': round(self.db_time * 1000 / self.count, 3),
+            'avg_serializer_ms': round(self.serializer_time * 1000 / self.count, 3),
+            'avg_queries': round(self.queries / self.count, 2),
+            'max_queries': self.max_queries,
+            'histogram_ms': dict(zip([str(bound) for bound in BUCKETS_MS] + ['+Inf'], self.buckets)),
+        }
+
+
+class ProfileRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, profile, total_time):
+        with self._lock:
+            self._routes.setdefault(route, RouteStats()).add(profile, total_time)
+
+    def report(self):
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = ProfileRegistry()
+
+
+# Time top-level serializer.data evaluations. Nested serializers go through to_representation,
+# and the depth counter keeps Serializer.data -> BaseSerializer.data from being counted twice.
+def _install_serializer_timer():
+    original = serializers.BaseSerializer.data
+    if getattr(original, 'profiled', False):
+        return
+
+    def data(self):
+        profile = _current.get()
+        if profile is None:
+            return original.fget(self)
+        profile.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            profile.serializer_depth -= 1
+            if profile.serializer_depth == 0:
+                profile.serializer_time += time.perf_counter() - start
+
+    prop = property(data)
+    prop.fget.profiled = True
+    serializers.BaseSerializer.data = prop
+
+
+# Records query count, DB time, serializer time and wall time per request, aggregates them per route
+# into `registry`, and reports them in a Server-Timing header. Requests over PROFILING_QUERY_BUDGET
+# are logged together with the statements they repeated.
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = getattr(settings, 'PROFILING_QUERY_BUDGET', 50)
+        self.server_timing = getattr(settings, 'PROFILING_SERVER_TIMING', True)
+        _install_serializer_timer()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_time = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        route = f"{request.method} /{match.route}" if match and match.route else f"{request.method} <unmatched>"
+        registry.record(route, profile, total_time)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={profile.db_time * 1000:.2f};desc="{profile.queries} queries", '
+                f'serialize;dur={profile.serializer_time * 1000:.2f}, '
+                f'total;dur={total_time * 1000:.2f}'
+            )
+        if profile.queries > self.query_budget:
+            logger.warning(
+                "%s issued %d queries (budget %d); repeated statements: %s",
+                route, profile.queries, self.query_budget, profile.duplicates(),
+            )
+        return response
+
+
+class ProfilingReportAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(registry.report(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
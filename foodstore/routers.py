@@ -0,0 +1,134 @@
+import contextvars
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica = contextvars.ContextVar('read_replica', default=None)
+
+# Read-replica routing. Reads are only sent to a replica inside read_from_replica(), which the menu and
+# admin order listing views enter through @replica_reads; everything else, and every write, uses 'default'.
+# A replica lags the primary, so:
+#   - a user whose write went to /api/orders/, /api/cart/ or /api/checkout/ (ReplicaPinningMiddleware)
+#     reads from the primary for STICKY_SECONDS afterwards, and sees their own writes
+#   - any menu change pins the 'menu' scope the same way, so a rebuilt menu payload is never built from,
+#     and cached with, pre-change data
+# Pins live in the CACHE alias, which must be shared by all workers (e.g. Redis) for stickiness across processes.
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 10,
+    'CACHE': 'default',
+    'STICKY_PATHS': ('/api/orders/', '/api/cart/', '/api/checkout/'),
+}
+
+
+def routing_setting(name):
+    return getattr(settings, 'REPLICA_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+def pin_key(scope):
+    return f'replica-pin:{scope}'
+
+
+def user_scope(user):
+    return f'user:{user.pk}' if user is not None and user.is_authenticated else None
+
+
+# Send `scope`'s reads to the primary for the next STICKY_SECONDS
+def pin_primary(scope):
+    if routing_setting('REPLICAS'):
+        seconds = routing_setting('STICKY_SECONDS')
+        caches[routing_setting('CACHE')].set(pin_key(scope), time.time() + seconds, seconds)
+
+
+def pin_keys(scopes):
+    return [pin_key(scope) for scope in scopes if scope]
+
+
+def pick_replica(pins):
+    if any(until > time.time() for until in pins.values()):
+        return None
+    return random.choice(routing_setting('REPLICAS'))
+
+
+def choose_replica(scopes):
+    # Inside a transaction, reads must see its writes
+    if not routing_setting('REPLICAS') or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return pick_replica(caches[routing_setting('CACHE')].get_many(pin_keys(scopes)))
+
+
+async def achoose_replica(scopes):
+    if not routing_setting('REPLICAS') or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return pick_replica(await caches[routing_setting('CACHE')].aget_many(pin_keys(scopes)))
+
+
+# Route this block's reads to a replica, unless one of `scopes` is pinned to the primary
+@contextmanager
+def read_from_replica(*scopes):
+    token = _replica.set(choose_replica(scopes))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+# read_from_replica() for async views; the async ORM's worker threads inherit the context
+@asynccontextmanager
+async def aread_from_replica(*scopes):
+    token = _replica.set(await achoose_replica(scopes))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+# For APIView handlers: read from a replica, with the requesting user's own pin and `scopes` honoured
+def replica_reads(*scopes):
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            with read_from_replica(user_scope(request.user), *scopes):
+                return handler(self, request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    # Explicit, so saving an instance that was read from a replica still writes to the primary
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    # Replicas hold the same rows as the primary
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+# Pins a user to the primary after a successful write to one of the STICKY_PATHS. It runs after the
+# view, so request.user is whoever DRF authenticated, token users included.
+class ReplicaPinningMiddleware:
+    def __init__(self, get_response):
+        if not routing_setting('REPLICAS'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400
+            and request.path.startswith(tuple(routing_setting('STICKY_PATHS')))
+        ):
+            scope = user_scope(getattr(request, 'user', None))
+            if scope:
+                pin_primary(scope)
+        return response
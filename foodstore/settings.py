@@ -1,5 +1,8 @@
 from pathlib import Path
 
+from .auth import auth_settings
+from .db import connection_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -21,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
@@ -33,6 +37,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     
     'corsheaders.middleware.CorsMiddleware',
+    'foodstore.profiling.QueryProfilingMiddleware',
+    'foodstore.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -41,10 +47,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    
 ]
 
 ROOT_URLCONF = 'foodstore.urls'
@@ -138,6 +140,32 @@ import environ
 env = environ.Env()
 environ.Env.read_env()
 
+# Database connection handling (see foodstore/db.py). 'persistent' suits the serverless deployment and WSGI
+# workers; long-lived ASGI workers can use 'pool'. `manage.py benchmark_connections` compares the modes.
+# The default database is reached through Supabase's transaction-mode pooler (port 6543).
+DB_CONNECTION_MODE = env('DB_CONNECTION_MODE', default='persistent')
+DATABASES['default'].update(connection_settings(
+    DB_CONNECTION_MODE,
+    conn_max_age=env.int('DB_CONN_MAX_AGE', default=300),
+    pool_min_size=env.int('DB_POOL_MIN_SIZE', default=2),
+    pool_max_size=env.int('DB_POOL_MAX_SIZE', default=10),
+    pool_timeout=env.int('DB_POOL_TIMEOUT', default=10),
+    transaction_pooler=DATABASES['default']['PORT'] == '6543',
+))
+
+# Read replicas (see foodstore/routers.py): menu and admin order listing reads go to one of REPLICAS,
+# given as database URLs in DB_REPLICA_URLS. Pins need a cache shared by all workers when there are several.
+DATABASE_ROUTERS = ['foodstore.routers.ReplicaRouter']
+REPLICA_ROUTING = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': env.int('DB_REPLICA_STICKY_SECONDS', default=10),
+    'CACHE': 'default',
+}
+for index, url in enumerate(env.list('DB_REPLICA_URLS', default=[])):
+    alias = f'replica{index}'
+    DATABASES[alias] = {**env.db_url_config(url), **connection_settings(DB_CONNECTION_MODE)}
+    REPLICA_ROUTING['REPLICAS'].append(alias)
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_USE_TLS = True
@@ -150,17 +178,110 @@ REST_FRAMEWORK = {
 
 CORS_ALLOW_ALL_ORIGINS = True
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# How logins are remembered (see foodstore/auth.py): 'signed-cookie' sessions need no session table,
+# 'jwt' adds stateless Bearer tokens, 'db-session' is the old session table. `manage.py benchmark_auth` compares them.
+AUTH_MODE = env('AUTH_MODE', default='signed-cookie')
+AUTH = auth_settings(
+    AUTH_MODE,
+    access_lifetime=env.int('JWT_ACCESS_LIFETIME', default=300),
+    refresh_lifetime=env.int('JWT_REFRESH_LIFETIME', default=86400),
+    signing_key=env('JWT_SIGNING_KEY', default=None),
+)
+SESSION_ENGINE = AUTH['SESSION_ENGINE']
+if 'SIMPLE_JWT' in AUTH:
+    SIMPLE_JWT = AUTH['SIMPLE_JWT']
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': AUTH['AUTHENTICATION_CLASSES'],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
 }
 
+# Password hashing (see customers/hashers.py). Changing ITERATIONS rehashes each password at its owner's
+# next login. WORKERS and QUEUE bound the hashing pool behind /customer/async/login/.
+PASSWORD_HASHERS = [
+    'customers.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASHING = {
+    'ITERATIONS': env.int('PASSWORD_HASH_ITERATIONS', default=None),
+    'WORKERS': env.int('PASSWORD_HASHING_WORKERS', default=4),
+    'QUEUE': env.int('PASSWORD_HASHING_QUEUE', default=64),
+}
+
+# Loads the customer row and API token along with the user at login (see customers/profiles.py)
+AUTHENTICATION_BACKENDS = ['customers.profiles.ProfileBackend']
+
+# Cache of /customer/details/ documents: CACHE names a CACHES alias, None leaves it off
+PROFILE_CACHE = {
+    'CACHE': None,
+    'TIMEOUT': 300,
+}
+
+# Token authentication cache (see customers/authentication.py). SHARED_CACHE names a CACHES alias shared by
+# all workers, e.g. Redis; TTL bounds how long another worker may still accept a token revoked here.
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 30,
+    'SHARED_CACHE': None,
+    'SHARED_TTL': 300,
+}
+
+# Per-request query/latency profiling (see foodstore/profiling.py). Per-route stats are served at /api/admin/profiling/.
+PROFILING_ENABLED = DEBUG
+PROFILING_QUERY_BUDGET = 30
+PROFILING_SERVER_TIMING = True
+
+# Menu response cache. LocMemMenuBackend is per process: with more than one worker, swap BACKEND for
+# 'foods.cache.RedisMenuBackend' with OPTIONS={'url': ...} so a menu change reaches every worker at once.
+MENU_CACHE = {
+    'BACKEND': 'foods.cache.LocMemMenuBackend',
+    'TIMEOUT': 300,
+    'OPTIONS': {},
+}
+
+# Food search engine: 'auto' uses Postgres full-text + trigram search on Postgres
+# and the in-process inverted index everywhere else
+FOOD_SEARCH_BACKEND = 'auto'
+
+# Outgoing email queue (see customers/outbox.py), drained by `manage.py send_queued_email --loop`
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,
+    'LEASE': 300,
+}
+
+# SSLCommerz payment gateway client (see payments/gateway.py). Set BASE_URL to a
+# `manage.py fake_sslcommerz` server to exercise payments offline.
+SSLCOMMERZ = {
+    'STORE_ID': 'maste679cfa8ec592d',
+    'STORE_PASS': 'maste679cfa8ec592d@ssl',
+    'SANDBOX': True,
+    'BASE_URL': None,
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'POOL_SIZE': 10,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30,
+}
+
+# Sized image variants of FoodItem.image (see foods/images.py), rendered in a process pool on upload.
+# `manage.py generate_image_variants` backfills existing images.
+IMAGE_VARIANTS = {
+    'WIDTHS': (160, 320, 640, 1280),
+    'FORMATS': ('avif', 'webp'),
+    'QUALITY': 80,
+    'WORKERS': 2,
+    'EAGER': False,
+}
+
+# Default page size for keyset-paginated order listings (?page_size= can override up to 100)
+KEYSET_PAGE_SIZE = 20
+
 SESSION_COOKIE_AGE = 86400  
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
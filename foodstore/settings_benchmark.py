@@ -0,0 +1,13 @@
+# Settings for `manage.py benchmark`: the production settings on a local SQLite database,
+# which the benchmark replaces with a throwaway test database and seeds itself.
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'benchmark.sqlite3',
+    }
+}
+
+# The benchmark measures queries itself; the profiling middleware would only add its own overhead
+PROFILING_ENABLED = False
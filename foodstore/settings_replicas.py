@@ -0,0 +1,17 @@
+# Settings for exercising read-replica routing locally: the primary and a "replica" on two separate
+# SQLite databases, with no replication between them, so the tests can tell which one served a read.
+#   python manage.py test foods.tests.ReplicaRoutingTests --settings=foodstore.settings_replicas
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    },
+}
+
+REPLICA_ROUTING = {**REPLICA_ROUTING, 'REPLICAS': ['replica']}  # noqa: F405
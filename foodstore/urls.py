@@ -18,9 +18,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from foodstore.health import HealthCheckView
+from foodstore.profiling import ProfilingReportAPIView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/health/', HealthCheckView.as_view(), name='health'),
+    path('api/admin/profiling/', ProfilingReportAPIView.as_view(), name='profiling-report'),
     path('api/', include('foods.urls')),
     path('customer/', include('customers.urls')),
     path('', include('payments.urls')),
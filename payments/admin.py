@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PaymentTransaction
+
+
+@admin.register(PaymentTransaction)
+class PaymentTransactionAdmin(admin.ModelAdmin):
+    list_display = ('tran_id', 'order', 'amount', 'status', 'created_at', 'processed_at')
+    list_filter = ('status',)
+    search_fields = ('tran_id', 'val_id')
@@ -0,0 +1,122 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .gateway import SESSION_API_PATH, VALIDATION_API_PATH
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real gateway
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.count_and_delay():
+            return
+
+        if self.path != SESSION_API_PATH:
+            return self.reply(404, {'status': 'FAILED', 'failedreason': 'Unknown endpoint'})
+
+        data = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        if not data.get('store_id') or not data.get('store_passwd'):
+            return self.reply(200, {'status': 'FAILED', 'failedreason': 'Store Credential Error Or Store is De-active'})
+        with server.lock:
+            server.sessions[data.get('tran_id')] = data.get('total_amount')
+        session_key = uuid.uuid4().hex.upper()
+        host = f"http://{self.headers.get('Host', 'localhost')}"
+        return self.reply(200, {
+            'status': 'SUCCESS',
+            'sessionkey': session_key,
+            'GatewayPageURL': f"{host}/gwprocess/v4/gw.php?Q=pay&SESSIONKEY={session_key}",
+            'tran_id': data.get('tran_id'),
+        })
+
+    # Validation API: a payment made through a session created here is VALID under server.val_id(tran_id)
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        if not self.count_and_delay():
+            return
+        if url.path != VALIDATION_API_PATH:
+            return self.reply(404, {'status': 'FAILED', 'failedreason': 'Unknown endpoint'})
+
+        val_id = parse_qs(url.query).get('val_id', [''])[0]
+        tran_id = val_id.removeprefix('VAL')
+        with server.lock:
+            amount = server.sessions.get(tran_id)
+        if not val_id.startswith('VAL') or amount is None:
+            return self.reply(200, {'status': 'INVALID_TRANSACTION'})
+        return self.reply(200, {
+            'status': 'VALID', 'val_id': val_id, 'tran_id': tran_id, 'amount': amount, 'currency': 'BDT',
+        })
+
+    # Count the request and apply the simulated latency and error rate; False when a 500 was sent instead
+    def count_and_delay(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.delay:
+            time.sleep(server.delay)
+        if server.error_rate and random.random() < server.error_rate:
+            self.reply(500, {'status': 'FAILED', 'failedreason': 'Simulated gateway error'})
+            return False
+        return True
+
+    def reply(self, status_code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# Local stand-in for the SSLCommerz session API, for testing throughput and failure handling offline.
+# `delay` slows every reply down and `error_rate` is the fraction of requests answered with a 500.
+# Sessions are remembered, so the validation API can confirm payments made through them (see val_id()).
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0, error_rate=0.0, verbose=False):
+        super().__init__((host, port), FakeGatewayHandler)
+        self.delay = delay
+        self.error_rate = error_rate
+        self.verbose = verbose
+        self.requests = 0
+        self.sessions = {}  # tran_id -> total_amount
+        self.lock = threading.Lock()
+        self._thread = None
+
+    # The val_id SSLCommerz would post to the callbacks after a successful payment of `tran_id`
+    @staticmethod
+    def val_id(tran_id):
+        return f'VAL{tran_id}'
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,160 @@
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+DEFAULTS = {
+    'STORE_ID': '',
+    'STORE_PASS': '',
+    'SANDBOX': True,
+    'BASE_URL': None,           # Overrides the sandbox/securepay host, e.g. to point at `manage.py fake_sslcommerz`
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'POOL_SIZE': 10,            # Keep-alive connections kept open to the gateway
+    'FAILURE_THRESHOLD': 5,     # Consecutive failures that open the circuit
+    'RESET_TIMEOUT': 30,        # Seconds the circuit stays open before one trial request is let through
+}
+
+SESSION_API_PATH = '/gwprocess/v4/api.php'
+VALIDATION_API_PATH = '/validator/api/validationserverAPI.php'
+
+
+class GatewayError(Exception):
+    pass
+
+
+class GatewayUnavailable(GatewayError):
+    pass
+
+
+# Stops calling a gateway that keeps failing: after `failure_threshold` consecutive failures every call
+# is refused for `reset_timeout` seconds, then a single trial call decides whether to close it again.
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    # Whether allow() would let a call out now, without claiming the trial. False while a half-open trial is in flight.
+    def available(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            return self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout
+
+    # Whether a call may go out now; moves an expired open circuit to half-open and admits exactly one trial
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+# SSLCommerz session API client. Unlike sslcommerz_lib, it reuses one pooled keep-alive HTTP session,
+# bounds every call with connect/read timeouts and sits behind a circuit breaker, so a slow or
+# failing gateway costs a worker a few seconds at most rather than tying it up indefinitely.
+class SSLCommerzGateway:
+    def __init__(self, store_id, store_pass, sandbox=True, base_url=None, connect_timeout=3.05, read_timeout=10,
+                 pool_size=10, failure_threshold=5, reset_timeout=30):
+        self.store_id = store_id
+        self.store_pass = store_pass
+        host = base_url or f"https://{'sandbox' if sandbox else 'securepay'}.sslcommerz.com"
+        self.session_url = host.rstrip('/') + SESSION_API_PATH
+        self.validation_url = host.rstrip('/') + VALIDATION_API_PATH
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+
+    def available(self):
+        return self.breaker.available()
+
+    # Create a payment session and return SSLCommerz's JSON reply. Raises GatewayUnavailable while the
+    # circuit is open and GatewayError when the call fails or times out.
+    def create_session(self, post_body):
+        data = dict(post_body, store_id=self.store_id, store_passwd=self.store_pass)
+        return self._call('post', self.session_url, "Payment session", data=data)
+
+    # Ask SSLCommerz's validation API about the payment behind a callback's `val_id`. The reply's status
+    # is VALID or VALIDATED (already validated once) for a genuine payment, with its tran_id and amount.
+    def validate(self, val_id):
+        params = {'val_id': val_id, 'store_id': self.store_id, 'store_passwd': self.store_pass, 'format': 'json'}
+        return self._call('get', self.validation_url, "Payment validation", params=params)
+
+    def _call(self, method, url, description, **kwargs):
+        if not self.breaker.allow():
+            raise GatewayUnavailable("Payment gateway is unavailable")
+        try:
+            response = self.http.request(method, url, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as error:
+            self.breaker.record_failure()
+            raise GatewayError(f"{description} request failed: {error}") from error
+        self.breaker.record_success()
+        return payload
+
+    def close(self):
+        self.http.close()
+
+
+_gateway = None
+
+
+def gateway_setting(name):
+    return getattr(settings, 'SSLCOMMERZ', {}).get(name, DEFAULTS[name])
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        _gateway = SSLCommerzGateway(
+            store_id=gateway_setting('STORE_ID'),
+            store_pass=gateway_setting('STORE_PASS'),
+            sandbox=gateway_setting('SANDBOX'),
+            base_url=gateway_setting('BASE_URL'),
+            connect_timeout=gateway_setting('CONNECT_TIMEOUT'),
+            read_timeout=gateway_setting('READ_TIMEOUT'),
+            pool_size=gateway_setting('POOL_SIZE'),
+            failure_threshold=gateway_setting('FAILURE_THRESHOLD'),
+            reset_timeout=gateway_setting('RESET_TIMEOUT'),
+        )
+    return _gateway
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    global _gateway
+    if setting == 'SSLCOMMERZ' and _gateway is not None:
+        _gateway.close()
+        _gateway = None
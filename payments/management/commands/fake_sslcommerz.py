@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from payments.fake_gateway import FakeGatewayServer
+
+
+class Command(BaseCommand):
+    help = "Serve a fake SSLCommerz session API locally; point SSLCOMMERZ['BASE_URL'] at it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before every reply")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with a 500")
+        parser.add_argument('--verbose', action='store_true', help="Log every request")
+
+    def handle(self, *args, **options):
+        server = FakeGatewayServer(
+            options['host'], options['port'], delay=options['delay'], error_rate=options['error_rate'],
+            verbose=options['verbose'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fake SSLCommerz gateway listening on {server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,3 +1,27 @@
 from django.db import models
 
-# Create your models here.
+from foods.models import Order
+
+
+# One SSLCommerz payment attempt for an order. tran_id is unique, so every callback for it finds the row
+# with one index lookup, and the status only ever leaves Initiated once (see payments/services.py).
+class PaymentTransaction(models.Model):
+    STATUS_CHOICES = [
+        ("Initiated", "Initiated"),
+        ("Paid", "Paid"),
+        ("Failed", "Failed"),
+        ("Cancelled", "Cancelled"),
+    ]
+
+    tran_id = models.CharField(max_length=30, unique=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="payments")
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default="BDT")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="Initiated")
+    val_id = models.CharField(max_length=64, blank=True)
+    gateway_payload = models.JSONField(default=dict, blank=True)  # The callback (and validation reply) that settled it
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.tran_id} ({self.status}) for Order {self.order_id}"
@@ -0,0 +1,91 @@
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from foods.order_status import IllegalTransition, StatusConflict, transition
+
+from .gateway import get_gateway
+from .models import PaymentTransaction
+
+logger = logging.getLogger(__name__)
+
+# What a settled payment does to its order. Only a Pending order moves, so a late failure cannot
+# cancel an order that another callback already marked paid.
+ORDER_STATUS = {'Paid': 'Paid', 'Failed': 'Cancelled', 'Cancelled': 'Cancelled'}
+
+VALID_STATUSES = ('VALID', 'VALIDATED')
+
+
+# The callback's transaction, from one lookup on the tran_id unique index. Raises PaymentTransaction.DoesNotExist.
+def find_payment(tran_id):
+    payment = PaymentTransaction.objects.filter(tran_id=tran_id or '').only('pk', 'order_id', 'status', 'amount', 'val_id').first()
+    if payment is None:
+        raise PaymentTransaction.DoesNotExist(f"No payment with tran_id {tran_id!r}")
+    return payment
+
+
+# Move `payment` out of Initiated exactly once. The claim is a conditional UPDATE ... WHERE status='Initiated':
+# of any number of concurrent or repeated callbacks, one updates the row and applies the outcome to the order,
+# and the others update nothing. Returns 'processed' or 'duplicate'.
+def settle(payment, outcome, payload, val_id=''):
+    if payment.status != 'Initiated':
+        return 'duplicate'
+    with transaction.atomic():
+        claimed = PaymentTransaction.objects.filter(pk=payment.pk, status='Initiated').update(
+            status=outcome, gateway_payload=payload, val_id=val_id, processed_at=timezone.now(),
+        )
+        if not claimed:
+            return 'duplicate'
+        try:
+            transition(payment.order_id, ORDER_STATUS[outcome], expected='Pending', source='gateway')
+        except (IllegalTransition, StatusConflict) as exc:
+            logger.warning("Payment %s settled as %s but its order did not move: %s", payment.pk, outcome, exc)
+    return 'processed'
+
+
+# A success callback or IPN claiming `tran_id` was paid. Duplicates are answered from the lookup alone;
+# only the first is checked with SSLCommerz's validation API (outside any transaction, so no lock is held
+# across the HTTP call) and must match the transaction and its amount. Returns 'processed', 'duplicate',
+# 'reconcile' (see record_late_payment) or 'rejected' (nothing changes). Raises GatewayError when the
+# gateway cannot be asked.
+def confirm_payment(tran_id, val_id, payload):
+    payment = find_payment(tran_id)
+    if payment.val_id:
+        return 'duplicate'
+    if not val_id:
+        return 'rejected'
+
+    validation = get_gateway().validate(val_id)
+    try:
+        amount = Decimal(str(validation.get('amount')))
+    except (InvalidOperation, ValueError):
+        amount = None
+    if validation.get('status') not in VALID_STATUSES or validation.get('tran_id') != tran_id or amount != payment.amount:
+        logger.warning("Payment %s failed validation: %s", tran_id, validation)
+        return 'rejected'
+    if payment.status == 'Initiated':
+        if settle(payment, 'Paid', {'callback': payload, 'validation': validation}, val_id=val_id) == 'processed':
+            return 'processed'
+        # Settled by another callback while the gateway was being asked
+        payment = find_payment(tran_id)
+        if payment.val_id:
+            return 'duplicate'
+    return record_late_payment(payment, validation, val_id)
+
+
+# The gateway confirms a payment that an unverified fail/cancel callback already settled, so the customer
+# was charged for a cancelled order. The validation is kept next to the payload that settled it, and the
+# error log is the cue to refund or reconcile by hand. Returns 'reconcile'.
+def record_late_payment(payment, validation, val_id):
+    with transaction.atomic():
+        payment = PaymentTransaction.objects.select_for_update().get(pk=payment.pk)
+        payment.gateway_payload = dict(payment.gateway_payload or {}, late_validation=validation)
+        payment.val_id = val_id
+        payment.save(update_fields=['gateway_payload', 'val_id'])
+    logger.error(
+        "Payment %s was validated as paid after being settled as %s; refund or reconcile order %s",
+        payment.tran_id, payment.status, payment.order_id,
+    )
+    return 'reconcile'
@@ -1,3 +1,212 @@
-from django.test import TestCase
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from foods.models import CartItem, Category, FoodItem, Order
+
+from .fake_gateway import FakeGatewayServer
+from .gateway import CircuitBreaker, GatewayError, GatewayUnavailable, SSLCommerzGateway, get_gateway
+from .models import PaymentTransaction
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_half_opens_after_timeout(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.assertFalse(breaker.available())
+
+        clock.now = 10
+        self.assertTrue(breaker.available())
+        self.assertTrue(breaker.allow())   # The one trial call
+        self.assertFalse(breaker.allow())  # Others wait for its outcome
+        self.assertFalse(breaker.available())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+
+class GatewayTests(SimpleTestCase):
+    def gateway(self, server, **kwargs):
+        gateway = SSLCommerzGateway('store', 'secret', base_url=server.url, **kwargs)
+        self.addCleanup(gateway.close)
+        return gateway
+
+    def test_create_session(self):
+        with FakeGatewayServer() as server:
+            response = self.gateway(server).create_session({'tran_id': 'T1', 'total_amount': 10})
+        self.assertEqual(response['status'], 'SUCCESS')
+        self.assertEqual(response['tran_id'], 'T1')
+        self.assertIn('GatewayPageURL', response)
+
+    def test_read_timeout_fails_fast(self):
+        with FakeGatewayServer(delay=0.5) as server:
+            gateway = self.gateway(server, read_timeout=0.1)
+            start = time.monotonic()
+            with self.assertRaises(GatewayError):
+                gateway.create_session({'tran_id': 'T1'})
+            self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_open_circuit_stops_calling_the_gateway(self):
+        with FakeGatewayServer(error_rate=1.0) as server:
+            gateway = self.gateway(server, failure_threshold=2)
+            for _ in range(2):
+                with self.assertRaises(GatewayError):
+                    gateway.create_session({'tran_id': 'T1'})
+            with self.assertRaises(GatewayUnavailable):
+                gateway.create_session({'tran_id': 'T1'})
+            self.assertEqual(server.requests, 2)
+
+
+class CreatePaymentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='secret', email='alice@example.com')
+        category = Category.objects.create(name='Burgers')
+        burger = FoodItem.objects.create(category=category, name='Beef Burger', price='8.50')
+        CartItem.objects.create(user=self.user, food_item=burger, quantity=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.server = FakeGatewayServer().start()
+        self.addCleanup(self.server.stop)
+
+    def test_returns_gateway_url(self):
+        with override_settings(SSLCOMMERZ={'STORE_ID': 'store', 'STORE_PASS': 'secret', 'BASE_URL': self.server.url}):
+            response = self.client.post('/payment/create_payment/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['url'].startswith(self.server.url))
+        self.assertEqual(Order.objects.get().status, 'Pending')
+        payment = PaymentTransaction.objects.get()
+        self.assertEqual((payment.order, payment.amount, payment.status), (Order.objects.get(), Decimal('17.00'), 'Initiated'))
+        self.assertEqual(self.server.sessions, {payment.tran_id: '17.00'})
+
+    def test_open_circuit_leaves_the_cart_alone(self):
+        with override_settings(SSLCOMMERZ={'STORE_ID': 'store', 'STORE_PASS': 'secret', 'BASE_URL': self.server.url,
+                                           'FAILURE_THRESHOLD': 1}):
+            get_gateway().breaker.record_failure()
+            response = self.client.post('/payment/create_payment/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, 0)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_half_open_circuit_leaves_the_cart_alone(self):
+        with override_settings(SSLCOMMERZ={'STORE_ID': 'store', 'STORE_PASS': 'secret', 'BASE_URL': self.server.url,
+                                           'FAILURE_THRESHOLD': 1, 'RESET_TIMEOUT': 0}):
+            breaker = get_gateway().breaker
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())  # Another request's trial call is in flight
+            response = self.client.post('/payment/create_payment/')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_failed_session_gives_the_cart_back(self):
+        self.server.error_rate = 1.0
+        with override_settings(SSLCOMMERZ={'STORE_ID': 'store', 'STORE_PASS': 'secret', 'BASE_URL': self.server.url}):
+            response = self.client.post('/payment/create_payment/')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(PaymentTransaction.objects.exists())
+        self.assertEqual(list(CartItem.objects.values_list('user', 'quantity')), [(self.user.pk, 2)])
+
+
+class GatewayCallbackTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='alice', password='secret')
+        self.order = Order.objects.create(customer=user, total_price='10.00')
+        self.payment = PaymentTransaction.objects.create(tran_id='T1', order=self.order, amount='10.00')
+        self.client = APIClient()
+        self.server = FakeGatewayServer().start()
+        self.addCleanup(self.server.stop)
+        # The gateway knows about the session create_payment would have opened
+        self.server.sessions['T1'] = '10.00'
+        settings = override_settings(SSLCOMMERZ={'STORE_ID': 'store', 'STORE_PASS': 'secret', 'BASE_URL': self.server.url})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def callback(self, outcome, tran_id='T1', **data):
+        return self.client.post(f'/payment/{outcome}/?tran_id={tran_id}', data)
+
+    def ipn(self, **data):
+        return self.client.post('/payment/ipn/', dict({'tran_id': 'T1', 'status': 'VALID', 'val_id': FakeGatewayServer.val_id('T1')}, **data))
+
+    def test_success_marks_the_order_paid_once(self):
+        self.assertEqual(self.callback('success', val_id='VALT1').status_code, 302)
+        self.assertEqual(self.callback('success', val_id='VALT1').status_code, 302)  # Browser retry
+        self.assertEqual(self.ipn().json()['result'], 'duplicate')
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.order.status, 'Paid')
+        self.assertEqual((self.payment.status, self.payment.val_id), ('Paid', 'VALT1'))
+        self.assertEqual(list(self.order.status_events.values_list('to_status', 'source')), [('Paid', 'gateway')])
+        self.assertEqual(self.server.requests, 1)  # Only the first callback was validated
+
+    def test_duplicate_ipn_is_one_query(self):
+        self.assertEqual(self.ipn().json()['result'], 'processed')
+        with self.assertNumQueries(1):
+            response = self.ipn()
+        self.assertEqual(response.json(), {'tran_id': 'T1', 'result': 'duplicate'})
+
+    def test_forged_or_mismatched_success_is_rejected(self):
+        self.callback('success', val_id='VALT2')
+        self.callback('success')  # No val_id at all
+        self.server.sessions['T1'] = '1.00'  # Paid a different amount
+        self.assertEqual(self.ipn().json()['result'], 'rejected')
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, 'Initiated')
+        self.assertEqual(self.order.status, 'Pending')
+
+    def test_gateway_outage_leaves_the_payment_for_a_retry(self):
+        self.server.error_rate = 1.0
+        self.assertEqual(self.ipn().status_code, 503)
+        self.server.error_rate = 0
+        self.assertEqual(self.ipn().json()['result'], 'processed')
+
+    def test_late_failure_does_not_cancel_a_paid_order(self):
+        self.callback('success', val_id='VALT1')
+        self.assertEqual(self.callback('fail').status_code, 200)
+        self.assertEqual(self.ipn(status='FAILED').json()['result'], 'duplicate')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'Paid')
+
+    def test_validated_payment_after_a_failure_is_kept_for_reconciliation(self):
+        self.assertEqual(self.callback('fail').status_code, 200)
+        with self.assertLogs('payments.services', 'ERROR'):
+            self.assertEqual(self.ipn().json()['result'], 'reconcile')
+        self.assertEqual(self.ipn().json()['result'], 'duplicate')
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual((self.payment.status, self.payment.val_id), ('Failed', FakeGatewayServer.val_id('T1')))
+        self.assertEqual(self.payment.gateway_payload['late_validation']['status'], 'VALID')
+        self.assertEqual(self.order.status, 'Cancelled')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_cancel_and_unknown_payments(self):
+        self.callback('cancel')
+        self.order.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual((self.order.status, self.payment.status), ('Cancelled', 'Cancelled'))
+        self.assertEqual(self.callback('success', tran_id='NOPE', val_id='VALNOPE').status_code, 404)
+        self.assertEqual(self.callback('fail', tran_id='NOPE').status_code, 404)
+        self.assertEqual(self.ipn(tran_id='NOPE').status_code, 404)
 
-# Create your tests here.
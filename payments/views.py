@@ -1,32 +1,32 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from sslcommerz_lib import SSLCOMMERZ
-from foods.models import Order, CartItem, OrderItem
-from foods.serializers import OrderSerializer
+from foods.services import checkout_cart, restore_cart
+from .gateway import GatewayError, get_gateway
+from .models import PaymentTransaction
+from .services import confirm_payment, find_payment, settle
 import uuid
 from rest_framework import status  # Make sure this import is at the top of your file
-from django.conf import settings
 from django.shortcuts import redirect
-from customers.models import Customer
-from django.contrib.auth.models import User
 from django.shortcuts import render	
-from django.shortcuts import get_object_or_404
+from django.http import Http404
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PaymentViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['post'])
     def create_payment(self, request):
-        # SSLCommerz configuration
-        sslcz_settings = {
-            'store_id': 'maste679cfa8ec592d',
-            'store_pass': 'maste679cfa8ec592d@ssl',
-            'issandbox': True
-        }
-        sslcz = SSLCOMMERZ(sslcz_settings)
+        # Shared SSLCommerz client: pooled connections, timeouts and a circuit breaker (see payments/gateway.py)
+        gateway = get_gateway()
+
+        # Refuse before touching the cart while the gateway is known to be down
+        if not gateway.available():
+            return Response({"error": "Payment gateway unavailable, please try again later"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
-        # Generate unique transaction ID
-        tran_id = str(uuid.uuid4())[:10].replace('-', '').upper()
+        # Generate unique transaction ID; every callback for this payment is keyed by it
+        tran_id = uuid.uuid4().hex[:20].upper()
         
         # Extract and set default request data
         # user_id = request.data.get('user')
@@ -44,37 +44,21 @@ class PaymentViewSet(viewsets.ViewSet):
         # state = request.data.get('state', "state")
         
         
-        cart_items = CartItem.objects.filter(user=request.user)
+        # Turn the cart into a pending order and clear it in one transaction
+        order = checkout_cart(request.user, status="Pending")
 
-        if not cart_items:
+        if order is None:
             return Response({"error": "Your cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create a new order
-        order = Order.objects.create(customer=request.user, total_price=0, status="Pending")
-
-        # Calculate total price and add items to the order
-        total_price = 0
-        for cart_item in cart_items:
-            food_item = cart_item.food_item
-            quantity = cart_item.quantity
-            OrderItem.objects.create(order=order, food_item=food_item, quantity=quantity)
-            total_price += food_item.price * quantity
-
-        # Update the order's total price
-        order.total_price = total_price
-        order.save()
+        total_price = order.total_price
+        PaymentTransaction.objects.create(tran_id=tran_id, order=order, amount=total_price)
 
-        # Clear the user's cart after placing the order
-        cart_items.delete()
-
-        # Return the created order details
-        serializer = OrderSerializer(order)
-
-        # Define callback URLs
-        success_url = request.build_absolute_uri(f'/payment/success/?tran_id={tran_id}&order_id={order.id}')
-        
-        fail_url = request.build_absolute_uri('/payment/fail/')
-        cancel_url = request.build_absolute_uri('/payment/cancel/')
+        # Define callback URLs. SSLCommerz posts tran_id (and val_id on success) to each of them; the
+        # query string is a fallback for redirects that drop the body.
+        success_url = request.build_absolute_uri(f'/payment/success/?tran_id={tran_id}')
+        fail_url = request.build_absolute_uri(f'/payment/fail/?tran_id={tran_id}')
+        cancel_url = request.build_absolute_uri(f'/payment/cancel/?tran_id={tran_id}')
+        ipn_url = request.build_absolute_uri('/payment/ipn/')
         # Create payment information payload
         post_body = {
             'total_amount': total_price,
@@ -83,6 +67,7 @@ class PaymentViewSet(viewsets.ViewSet):
             'success_url': success_url,
             'fail_url': fail_url,
             'cancel_url': cancel_url,
+            'ipn_url': ipn_url,
             'emi_option': 0,
             'cus_user' : request.user,
             'cus_name': request.user.username,
@@ -93,66 +78,82 @@ class PaymentViewSet(viewsets.ViewSet):
             'cus_country': "Bangladesh",
             'shipping_method': "NO",
             'multi_card_name': "",
-            'num_of_item': len(cart_items),
+            'num_of_item': order.items.count(),
             'product_name': "Test",
             'product_category': "tasty food",
             'product_profile': "general",
             'order_id': order.id,
         }
-        print(f'customer: {request.user} order: {order.id}')
 
         try:
-            
-            response = sslcz.createSession(post_body)
-            if response.get('status') == 'SUCCESS' and 'GatewayPageURL' in response:
-                return Response({"url": response['GatewayPageURL']})
-            return Response({"error": "Unable to create payment session"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            response = gateway.create_session(post_body)
+        except GatewayError:
+            # No session was opened, so nothing can be paid for: give the customer their cart back
+            restore_cart(request.user, order)
+            return Response({"error": "Payment gateway unavailable, please try again later"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-        except User.DoesNotExist:
-            return Response({"error": "User does not exist"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception:
-            return Response({"error": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if response.get('status') == 'SUCCESS' and 'GatewayPageURL' in response:
+            return Response({"url": response['GatewayPageURL']})
+        return Response({"error": "Unable to create payment session"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # The customer's browser, redirected by SSLCommerz after paying
     @action(detail=False, methods=['post'])
     def success(self, request):
         try:
-            # Extract parameters
-            
-            order_id = request.query_params.get('order_id')
-            # print(f'customer: {customer} order: {order_id}')
-            order = get_object_or_404(Order, id=order_id)
-            if not order:
-                return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-
-            order.status = "Paid"  # Update order status
-            order.save()
-            return redirect('https://foodie-delight-frontend.vercel.app/order.html')
-
-        except User.DoesNotExist:
-            return Response({"error": "User does not exist"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception:
-            return Response({"error": "Internal Server Error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            confirm_payment(callback_value(request, 'tran_id'), callback_value(request, 'val_id'), callback_payload(request))
+        except PaymentTransaction.DoesNotExist:
+            return Response({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+        except GatewayError:
+            # The IPN (or a retried redirect) settles it once the gateway answers again
+            logger.warning("Could not validate payment %s", callback_value(request, 'tran_id'))
+        return redirect('https://foodie-delight-frontend.vercel.app/order.html')
 
     @action(detail=False, methods=['post'])
     def cancel(self, request):
-        order_id = request.query_params.get('order_id')
-            # print(f'customer: {customer} order: {order_id}')
-        order = get_object_or_404(Order, id=order_id)
-        if not order:
-            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        order.status = "Cancelled"  # Update order status
-        order.save()
+        settle_callback(request, "Cancelled")
         return render(request, 'payments/cancel.html')
     
     @action(detail=False, methods=['post'])
     def fail(self, request):
-        order_id = request.query_params.get('order_id')
-            # print(f'customer: {customer} order: {order_id}')
-        order = get_object_or_404(Order, id=order_id)
-        if not order:
-            return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        order.status = "Cancelled"  # Update order status
-        order.save()
-        return render(request, 'payments/fail.html')
\ No newline at end of file
+        settle_callback(request, "Failed")
+        return render(request, 'payments/fail.html')
+
+    # SSLCommerz's server-to-server notification. It is retried until it gets a 2xx, and may arrive before,
+    # after or alongside the success redirect; whichever comes first settles the payment.
+    @action(detail=False, methods=['post'], authentication_classes=[], permission_classes=[])
+    def ipn(self, request):
+        tran_id = callback_value(request, 'tran_id')
+        try:
+            if callback_value(request, 'status') in ('VALID', 'VALIDATED'):
+                result = confirm_payment(tran_id, callback_value(request, 'val_id'), callback_payload(request))
+            else:
+                result = settle(find_payment(tran_id), IPN_OUTCOMES.get(callback_value(request, 'status'), 'Failed'), callback_payload(request))
+        except PaymentTransaction.DoesNotExist:
+            return Response({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+        except GatewayError:
+            # A 5xx makes SSLCommerz retry the notification later
+            return Response({"error": "Payment gateway unavailable"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({"tran_id": tran_id, "result": result})
+
+
+# SSLCommerz IPN statuses other than VALID/VALIDATED
+IPN_OUTCOMES = {'FAILED': 'Failed', 'CANCELLED': 'Cancelled', 'UNATTEMPTED': 'Failed', 'EXPIRED': 'Failed'}
+
+
+# Callback fields arrive in the POST body, with the query string as a fallback
+def callback_value(request, name):
+    return request.data.get(name) or request.query_params.get(name) or ''
+
+
+def callback_payload(request):
+    return {key: request.data.get(key) for key in request.data}
+
+
+# Fail and cancel callbacks settle the payment without asking the gateway: they can only cancel a still
+# Pending order, and a forged one is no worse than the customer abandoning the payment page. A success the
+# gateway later validates anyway is recorded for a refund (see confirm_payment).
+def settle_callback(request, outcome):
+    try:
+        settle(find_payment(callback_value(request, 'tran_id')), outcome, callback_payload(request))
+    except PaymentTransaction.DoesNotExist:
+        raise Http404("Payment not found")